@@ -0,0 +1,65 @@
+"""Ingestion throughput of store.store_bulk on SQLite
+
+Inserts random OHLCV into a temporary SQLite database with the per row
+store and with store_bulk, then stores the same data again to measure
+skipping existing (ticker, date).
+
+python benchmarks/bulk_store.py
+"""
+import os
+import argparse
+import tempfile
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from btbot.database.sql_declarative import Base
+from btbot.database.store import store, store_bulk, OHLCV
+
+
+def make_data(num_rows, seed=0):
+    rng = np.random.RandomState(seed)
+    index = pd.date_range('2017-01-01', periods=num_rows, freq='30min')
+    return pd.DataFrame(rng.rand(num_rows, len(OHLCV)), columns=OHLCV,
+                        index=index)
+
+
+def store_rows(url, ticker, df):
+    session = sessionmaker(bind=create_engine(url))()
+    for date, row in zip(df.index.to_pydatetime(), df.values.tolist()):
+        store(session, ticker, date, *row, table='price30m')
+    session.close()
+
+
+def main(num_rows, num_row_rows, chunk_size):
+    with tempfile.TemporaryDirectory() as dirname:
+        url = 'sqlite:///' + os.path.join(dirname, 'price.db')
+        Base.metadata.create_all(create_engine(url))
+        df = make_data(num_rows)
+
+        start = perf_counter()
+        store_rows(url, 'ROW', df.iloc[:num_row_rows])
+        row_rate = num_row_rows / (perf_counter() - start)
+        print(f'per row store: {row_rate:10.0f} rows/s')
+
+        results = dict()
+        for name in ('bulk insert', 'bulk skip'):
+            start = perf_counter()
+            num_inserted = store_bulk('BULK', df, url=url,
+                                      chunk_size=chunk_size, verbose=False)
+            results[name] = num_rows / (perf_counter() - start)
+            print(f'{name:13s}: {results[name]:10.0f} rows/s, '
+                  f'{num_inserted} inserted')
+        print(f'speedup: {results["bulk insert"] / row_rate:.0f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_rows', type=int, default=200000)
+    parser.add_argument('--num_row_rows', type=int, default=2000)
+    parser.add_argument('--chunk_size', type=int, default=10000)
+    args = parser.parse_args()
+    main(args.num_rows, args.num_row_rows, args.chunk_size)
@@ -0,0 +1,75 @@
+"""Throughput of get_cerebro profiles
+
+Runs a moving average crossover strategy on random walk prices with the
+'full' and 'lean' profiles and reports bars per second with the metrics
+of both, which should agree.
+
+python benchmarks/cerebro_profile.py
+"""
+import argparse
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+import backtrader as bt
+
+from btbot import get_cerebro
+
+
+class CrossOverStrategy(bt.Strategy):
+    params = (
+        ('fast', 10),
+        ('slow', 30),
+    )
+
+    def __init__(self):
+        fast = bt.indicators.SMA(self.data, period=self.p.fast)
+        slow = bt.indicators.SMA(self.data, period=self.p.slow)
+        self.crossover = bt.indicators.CrossOver(fast, slow)
+
+    def next(self):
+        if self.crossover[0] > 0:
+            self.order_target_size(target=1)
+        elif self.crossover[0] < 0:
+            self.order_target_size(target=-1)
+
+
+def make_data(num_bars, seed=0):
+    rng = np.random.RandomState(seed)
+    close = 100 * np.exp(np.cumsum(rng.randn(num_bars) * 0.01))
+    index = pd.date_range('2018-01-01', periods=num_bars, freq='30min')
+    return pd.DataFrame(dict(open=close, high=close * 1.005,
+                             low=close * 0.995, close=close,
+                             volume=np.ones(num_bars)), index=index)
+
+
+def run(df, profile):
+    cerebro = get_cerebro(profile=profile)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df), name='price')
+    cerebro.addstrategy(CrossOverStrategy)
+    start = perf_counter()
+    strategy = cerebro.run()[0]
+    elapsed = perf_counter() - start
+    sharpe = strategy.analyzers.getbyname('sharpe').get_analysis()
+    drawdown = strategy.analyzers.getbyname('drawdown').get_analysis()
+    return elapsed, sharpe['sharperatio'], drawdown.max.drawdown
+
+
+def main(num_bars, num_runs):
+    df = make_data(num_bars)
+    times = dict()
+    for profile in ('full', 'lean'):
+        results = [run(df, profile) for _ in range(num_runs)]
+        times[profile] = min(result[0] for result in results)
+        _, sharpe, drawdown = results[-1]
+        print(f'{profile:5s} {num_bars / times[profile]:10.0f} bars/s  '
+              f'sharpe {sharpe:.6f}  max drawdown {drawdown:.4f} %')
+    print(f'speedup: {times["full"] / times["lean"]:.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_bars', type=int, default=50000)
+    parser.add_argument('--num_runs', type=int, default=3)
+    args = parser.parse_args()
+    main(args.num_bars, args.num_runs)
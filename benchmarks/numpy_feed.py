@@ -0,0 +1,87 @@
+"""Setup time and memory of PandasData and NumpyData feeds
+
+Writes random walk OHLCV columns as .npy files, then preloads them with
+PandasData from a DataFrame, NumpyData with copy and NumpyData without
+copy over the memory-mapped files. Preload time and the peak of Python
+and numpy allocations, traced with tracemalloc, are followed by a full
+lean run of a crossover strategy, whose final values should agree.
+
+python benchmarks/numpy_feed.py --num_bars 2000000
+"""
+import os
+import argparse
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+import backtrader as bt
+
+from btbot import get_cerebro
+from btbot.feeds import NumpyData, read_columns
+
+from cerebro_profile import CrossOverStrategy, make_data
+
+
+def get_feed(name, dirname):
+    if name == 'pandas':
+        columns = read_columns(dirname)
+        df = pd.DataFrame({col: np.array(columns[col]) for col in columns
+                           if col != 'date'},
+                          index=pd.DatetimeIndex(np.array(columns['date'])))
+        return bt.feeds.PandasData(dataname=df)
+    return NumpyData(dataname=dirname, copy=name == 'copy')
+
+
+def preload(name, dirname):
+    data = get_cerebro(profile='lean').adddata(get_feed(name, dirname))
+    data._start()
+    data.preload()
+    return data
+
+
+def measure_preload(name, dirname):
+    start = perf_counter()
+    preload(name, dirname)
+    elapsed = perf_counter() - start
+    # tracemalloc slows down allocations, trace in another pass
+    tracemalloc.start()
+    preload(name, dirname)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+def run(name, dirname):
+    cerebro = get_cerebro(profile='lean')
+    cerebro.adddata(get_feed(name, dirname), name='price')
+    cerebro.addstrategy(CrossOverStrategy)
+    start = perf_counter()
+    strategy = cerebro.run()[0]
+    return perf_counter() - start, strategy.broker.get_value()
+
+
+def main(num_bars, skip_run):
+    df = make_data(num_bars)
+    with tempfile.TemporaryDirectory() as dirname:
+        np.save(os.path.join(dirname, 'date.npy'), df.index.values)
+        for col in df.columns:
+            np.save(os.path.join(dirname, f'{col}.npy'), df[col].values)
+        del df
+        for name in ('pandas', 'copy', 'mmap'):
+            elapsed, peak = measure_preload(name, dirname)
+            line = (f'{name:6s} preload {elapsed:8.3f} s  '
+                    f'peak {peak:8.1f} MiB')
+            if not skip_run:
+                elapsed, value = run(name, dirname)
+                line += f'  run {elapsed:8.2f} s  value {float(value):.6f}'
+            print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_bars', type=int, default=1000000)
+    parser.add_argument('--skip_run', action='store_true')
+    args = parser.parse_args()
+    main(args.num_bars, args.skip_run)
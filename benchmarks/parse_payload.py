@@ -0,0 +1,152 @@
+"""Parse time of exchange responses, row by row and vectorized
+
+Times the previous parsers of database/utils.py against the vectorized
+ones on Bitfinex candles, Kraken OHLC and a Quandl dataset. A recorded
+response can be given with --bitfx, --kraken or --quandl; otherwise a
+payload of --years of bars is synthesized in the format of each API and
+round-tripped through JSON, so the values have the types of a real
+response. --save writes the synthesized payloads to reuse them.
+
+python benchmarks/parse_payload.py --years 5
+"""
+import os
+import json
+import argparse
+from copy import deepcopy
+from collections import defaultdict
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from btbot.database.utils import (seconds2datetime, stock_columns_map,
+                                  _preprocess_bitfx, _preprocess_kraken,
+                                  _preprocess_quandl)
+
+
+def legacy_bitfx(df):
+    date = [seconds2datetime(x / 1000) for x in df[0].values]
+    df_dict = dict(date=date,
+                   open=df[1].values,
+                   close=df[2].values,
+                   high=df[3].values,
+                   low=df[4].values,
+                   volume=df[5].values)
+    return pd.DataFrame(df_dict)
+
+
+def legacy_kraken(data):
+    columns = ["date", "open", "high", "low", "close",
+               "vwap", "volume", "count"]
+    new_data = defaultdict(list)
+    data = deepcopy(data)
+    for x in data:
+        for i, col in enumerate(columns):
+            if i == 0:
+                x[i] = seconds2datetime(x[i])
+            else:
+                x[i] = float(x[i])
+            new_data[col].append(x[i])
+    return pd.DataFrame(new_data)
+
+
+def legacy_quandl(cols, data):
+    data_dict = defaultdict(list)
+    for x in data:
+        for i, col in enumerate(cols):
+            if col in stock_columns_map:
+                col = stock_columns_map[col]
+            data_dict[col].append(x[i])
+    return pd.DataFrame(data_dict)
+
+
+def make_payloads(years, seed=0):
+    rng = np.random.RandomState(seed)
+    num_bars = int(years * 365 * 48)
+    seconds = 1483228800 + 1800 * np.arange(num_bars)
+    prices = np.round(1000 * np.exp(np.cumsum(
+        rng.randn(num_bars) * 1e-3)), 5)
+    volumes = np.round(rng.rand(num_bars) * 100, 8)
+    # Bitfinex returns the latest candle first
+    bitfx = [[int(t) * 1000, p, p, p * 1.01, p * 0.99, v]
+             for t, p, v in zip(seconds[::-1], prices[::-1], volumes[::-1])]
+    kraken = [[int(t), f'{p:.5f}', f'{p * 1.01:.5f}', f'{p * 0.99:.5f}',
+               f'{p:.5f}', f'{p:.5f}', f'{v:.8f}', int(v)]
+              for t, p, v in zip(seconds, prices, volumes)]
+    days = pd.date_range('1990-01-01', periods=int(years * 252),
+                         freq='B').strftime('%Y-%m-%d')
+    cols = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'Ex-Dividend',
+            'Split Ratio', 'Adj. Open', 'Adj. High', 'Adj. Low',
+            'Adj. Close', 'Adj. Volume']
+    quandl = [[day] + [float(x) for x in rng.rand(len(cols) - 1)]
+              for day in days]
+    payloads = dict(bitfx=bitfx, kraken=kraken,
+                    quandl=dict(column_names=cols, data=quandl))
+    return {key: json.loads(json.dumps(value))
+            for key, value in payloads.items()}
+
+
+def load_payload(path, key):
+    with open(path) as f:
+        data = json.load(f)
+    if key == 'kraken' and isinstance(data, dict) and 'result' in data:
+        data = [x for x in data['result'].values() if isinstance(x, list)][0]
+    if key == 'quandl' and 'dataset_data' in data:
+        data = data['dataset_data']
+    return data
+
+
+def measure(func, *args, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func(*args)
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def main(years, paths, save_dir, repeat):
+    payloads = make_payloads(years)
+    for key, path in paths.items():
+        if path is not None:
+            payloads[key] = load_payload(path, key)
+    if save_dir is not None:
+        os.makedirs(save_dir, exist_ok=True)
+        for key, value in payloads.items():
+            with open(os.path.join(save_dir, f'{key}.json'), 'w') as f:
+                json.dump(value, f)
+    quandl = payloads['quandl']
+    cases = [
+        ('bitfx', legacy_bitfx, (pd.DataFrame(payloads['bitfx']),),
+         _preprocess_bitfx, (payloads['bitfx'],)),
+        ('kraken', legacy_kraken, (payloads['kraken'],),
+         _preprocess_kraken, (payloads['kraken'],)),
+        ('quandl', legacy_quandl, (quandl['column_names'], quandl['data']),
+         _preprocess_quandl, (quandl['column_names'], quandl['data'])),
+    ]
+    for name, legacy, legacy_args, func, args in cases:
+        expected = legacy(*legacy_args)
+        result = func(*args)
+        # The previous parsers kept Quandl dates as strings
+        if name == 'quandl':
+            expected['date'] = pd.to_datetime(expected['date'])
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+        legacy_time = measure(legacy, *legacy_args, repeat=repeat)
+        time = measure(func, *args, repeat=repeat)
+        print(f'{name:7s} {len(result):8d} rows  legacy '
+              f'{legacy_time * 1e3:9.1f} ms  vectorized {time * 1e3:8.1f} ms'
+              f'  x{legacy_time / time:6.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--years', type=float, default=5)
+    parser.add_argument('--bitfx', type=str, default=None)
+    parser.add_argument('--kraken', type=str, default=None)
+    parser.add_argument('--quandl', type=str, default=None)
+    parser.add_argument('--save_dir', type=str, default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    main(args.years, dict(bitfx=args.bitfx, kraken=args.kraken,
+                          quandl=args.quandl),
+         args.save_dir, args.repeat)
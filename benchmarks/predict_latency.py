@@ -0,0 +1,59 @@
+"""Per-bar predict latency of SLTPStrategy
+
+Compares the previous DMatrix based prediction with RowPredictor, the
+path used by SLTPStrategy.predict, on a model trained on random features.
+
+python benchmarks/predict_latency.py
+"""
+import argparse
+from time import perf_counter
+
+import numpy as np
+import xgboost as xgb
+from sklearn.preprocessing import StandardScaler
+
+from btbot.configs import xgb_params
+from btbot.strategies.sltp import RowPredictor, train_model
+
+
+def predict_dmatrix(model, scaler, feed):
+    features = scaler.transform(np.array([feed]))
+    return int(model.predict(xgb.DMatrix(features))[0])
+
+
+def measure(func, feeds):
+    times = np.empty(len(feeds))
+    for i, feed in enumerate(feeds):
+        start = perf_counter()
+        func(feed)
+        times[i] = perf_counter() - start
+    return times * 1e6
+
+
+def main(num_data, num_features, num_round, num_calls):
+    rng = np.random.RandomState(0)
+    features = rng.rand(num_data, num_features)
+    labels = rng.randint(0, 3, num_data)
+    model, scaler, _ = train_model(xgb_params, features, labels, num_round,
+                                   StandardScaler())
+    feeds = rng.rand(num_calls, num_features)
+    predictor = RowPredictor(model, scaler)
+    results = dict(
+        dmatrix=measure(lambda x: predict_dmatrix(model, scaler, x), feeds),
+        inplace=measure(predictor, feeds))
+    for name, times in results.items():
+        print(f'{name:8s} mean {times.mean():8.1f} us  '
+              f'p50 {np.percentile(times, 50):8.1f} us  '
+              f'p99 {np.percentile(times, 99):8.1f} us')
+    speedup = results['dmatrix'].mean() / results['inplace'].mean()
+    print(f'speedup: {speedup:.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_data', type=int, default=5000)
+    parser.add_argument('--num_features', type=int, default=20)
+    parser.add_argument('--num_round', type=int, default=50)
+    parser.add_argument('--num_calls', type=int, default=2000)
+    args = parser.parse_args()
+    main(args.num_data, args.num_features, args.num_round, args.num_calls)
@@ -0,0 +1,100 @@
+"""Range query latency of price table layouts
+
+Fills the previous layout without index, price30m with the unique
+(ticker, timeframe, date) index and price30m_narrow with synthetic 30
+minute bars, then times fetch queries of one ticker over one month. The
+default size is 50M rows per table, use --num_bars for a quick run.
+
+python benchmarks/price_table.py --num_tickers 100 --num_bars 500000
+"""
+import os
+import argparse
+import tempfile
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import MetaData, Table, Column, insert
+
+from btbot.database.engine import get_engine
+from btbot.database.fetch import get_price_query
+from btbot.database.sql_declarative import Base, Price30M, NarrowPrice30M
+
+
+def get_legacy_table():
+    # The columns of price30m without the unique index
+    metadata = MetaData()
+    columns = [Column(c.name, c.type, primary_key=c.primary_key,
+                      nullable=c.nullable, default=c.default)
+               for c in Price30M.__table__.c]
+    return metadata, Table('price30m_legacy', metadata, *columns)
+
+
+def fill(engine, table, num_tickers, num_bars, chunk_size=100000):
+    dates = pd.date_range('2000-01-01', periods=num_bars, freq='30min')
+    dates = dates.to_pydatetime()
+    rng = np.random.RandomState(0)
+    has_timeframe = 'timeframe' in table.c
+    for i in range(num_tickers):
+        ticker = f'T{i:03d}'
+        for j in range(0, num_bars, chunk_size):
+            values = rng.rand(len(dates[j:j + chunk_size]), 5).tolist()
+            rows = [dict(ticker=ticker, date=date, open=x[0], high=x[1],
+                         low=x[2], close=x[3], volume=x[4])
+                    for date, x in zip(dates[j:j + chunk_size], values)]
+            if has_timeframe:
+                for row in rows:
+                    row['timeframe'] = '30M'
+            with engine.begin() as conn:
+                conn.execute(insert(table), rows)
+    return dates
+
+
+def measure(engine, table, dates, num_tickers, num_queries, dedupe):
+    rng = np.random.RandomState(1)
+    month = 48 * 30
+    times = []
+    for _ in range(num_queries):
+        ticker = f'T{rng.randint(num_tickers):03d}'
+        i = rng.randint(len(dates) - month)
+        start, end = [f'{x:%Y-%m-%d %H:%M:%S}'
+                      for x in (dates[i], dates[i + month])]
+        query = get_price_query(table, [ticker], start, end, dedupe=dedupe)
+        start_time = perf_counter()
+        with engine.connect() as conn:
+            rows = conn.execute(query).fetchall()
+        times.append(perf_counter() - start_time)
+        assert len(rows) == month
+    return np.array(times) * 1e3
+
+
+def main(url, num_tickers, num_bars, num_queries):
+    with tempfile.TemporaryDirectory() as dirname:
+        url = url or 'sqlite:///' + os.path.join(dirname, 'price.db')
+        engine = get_engine(url)
+        legacy_metadata, legacy = get_legacy_table()
+        legacy_metadata.create_all(engine)
+        Base.metadata.create_all(engine)
+        tables = [('legacy', legacy, True),
+                  ('indexed', Price30M.__table__, False),
+                  ('narrow', NarrowPrice30M.__table__, False)]
+        print(f'{num_tickers * num_bars} rows per table')
+        for name, table, dedupe in tables:
+            start = perf_counter()
+            dates = fill(engine, table, num_tickers, num_bars)
+            elapsed = perf_counter() - start
+            times = measure(engine, table, dates, num_tickers, num_queries,
+                            dedupe)
+            print(f'{name:8s} fill {elapsed:8.1f} s  '
+                  f'query mean {times.mean():8.2f} ms  '
+                  f'p99 {np.percentile(times, 99):8.2f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', type=str, default=None)
+    parser.add_argument('--num_tickers', type=int, default=100)
+    parser.add_argument('--num_bars', type=int, default=500000)
+    parser.add_argument('--num_queries', type=int, default=20)
+    args = parser.parse_args()
+    main(args.url, args.num_tickers, args.num_bars, args.num_queries)
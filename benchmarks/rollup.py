@@ -0,0 +1,84 @@
+"""Fetching 4H bars from rollups against resampling 30 minute bars
+
+Stores random 30 minute bars of several tickers in a temporary SQLite
+database, then compares fetching 30 minute bars and resampling them with
+pandas on every run against reading price_rollup, after measuring the
+initial and an incremental update_rollups.
+
+python benchmarks/rollup.py --num_tickers 10 --num_bars 100000
+"""
+import os
+import argparse
+import tempfile
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from btbot.database.engine import get_engine
+from btbot.database.fetch import fetch_data
+from btbot.database.rollup import update_rollups, volume_bars
+from btbot.database.sql_declarative import Base
+from btbot.database.store import store_bulk, OHLCV
+
+AGG = dict(open='first', high='max', low='min', close='last', volume='sum')
+
+
+def make_data(num_bars, seed=0):
+    rng = np.random.RandomState(seed)
+    close = 100 * np.exp(np.cumsum(rng.randn(num_bars) * 0.01))
+    index = pd.date_range('2015-01-01', periods=num_bars, freq='30min')
+    df = pd.DataFrame(dict(open=close, high=close * 1.005,
+                           low=close * 0.995, close=close,
+                           volume=rng.rand(num_bars) * 10), index=index)
+    return df[OHLCV]
+
+
+def main(num_tickers, num_bars, timeframe, rule):
+    with tempfile.TemporaryDirectory() as dirname:
+        url = 'sqlite:///' + os.path.join(dirname, 'price.db')
+        Base.metadata.create_all(get_engine(url))
+        tickers = [f'T{i:03d}' for i in range(num_tickers)]
+        new_bars = 48
+        for i, ticker in enumerate(tickers):
+            df = make_data(num_bars, seed=i)
+            store_bulk(ticker, df.iloc[:-new_bars], url=url, verbose=False)
+        start = perf_counter()
+        update_rollups(tickers, url=url)
+        print(f'initial rollup     {perf_counter() - start:8.2f} s')
+        for i, ticker in enumerate(tickers):
+            df = make_data(num_bars, seed=i)
+            store_bulk(ticker, df.iloc[-new_bars:], url=url, verbose=False)
+        start = perf_counter()
+        update_rollups(tickers, url=url)
+        print(f'incremental rollup {perf_counter() - start:8.2f} s')
+
+        begin = '1970-01-01 00:00:00'
+        start = perf_counter()
+        data = fetch_data(begin, None, tickers, url=url)
+        resampled = {ticker: df.resample(rule).agg(AGG).dropna()
+                     for ticker, df in data.items()}
+        elapsed = perf_counter() - start
+        print(f'fetch + resample   {elapsed:8.2f} s')
+        start = perf_counter()
+        rollups = fetch_data(begin, None, tickers, url=url,
+                             timeframe=timeframe)
+        elapsed = perf_counter() - start
+        print(f'fetch {timeframe:3s} rollup   {elapsed:8.2f} s')
+        for ticker in tickers:
+            np.testing.assert_allclose(rollups[ticker].values,
+                                       resampled[ticker].values)
+        df = data[tickers[0]]
+        bars = volume_bars(df, threshold=df['volume'].sum() /
+                           len(resampled[tickers[0]]))
+        print(f'volume bars {len(bars)} of {len(df)} 30 minute bars')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--num_tickers', type=int, default=10)
+    parser.add_argument('--num_bars', type=int, default=100000)
+    parser.add_argument('--timeframe', type=str, default='4H')
+    parser.add_argument('--rule', type=str, default='4h')
+    args = parser.parse_args()
+    main(args.num_tickers, args.num_bars, args.timeframe, args.rule)
@@ -1,2 +1,4 @@
 from .cerebro import Cerebro, get_cerebro
-from .trainer import Trainer
\ No newline at end of file
+from .feeds import NumpyData
+from .trainer import Trainer
+from .sweep import run_sweep
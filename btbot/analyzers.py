@@ -0,0 +1,228 @@
+import math
+from array import array
+
+import backtrader as bt
+from backtrader.utils import AutoOrderedDict
+
+
+class StreamingDrawDown(bt.Analyzer):
+    """DrawDown keeping only running maxima
+
+    Same statistics as ``bt.analyzers.DrawDown`` without updating a
+    dictionary every bar. The analysis is filled when the run stops.
+
+    Parameters
+    ----------
+    fund: bool, optional
+        Use fund value instead of net asset value. Autodetected if None
+    """
+    params = (
+        ('fund', None),
+    )
+
+    def start(self):
+        if self.p.fund is None:
+            self._fundmode = self.strategy.broker.fundmode
+        else:
+            self._fundmode = self.p.fund
+        self._value = None
+        self._maxvalue = float('-inf')
+        self._len = 0
+        self._drawdown = 0.0
+        self._moneydown = 0.0
+        self._max_len = 0
+        self._max_drawdown = 0.0
+        self._max_moneydown = 0.0
+
+    def create_analysis(self):
+        self.rets = AutoOrderedDict()
+
+    def notify_fund(self, cash, value, fundvalue, shares):
+        if self._fundmode:
+            value = fundvalue
+        self._value = value
+        if value > self._maxvalue:
+            self._maxvalue = value
+
+    def next(self):
+        self._moneydown = moneydown = self._maxvalue - self._value
+        self._drawdown = drawdown = 100.0 * moneydown / self._maxvalue
+        if moneydown > self._max_moneydown:
+            self._max_moneydown = moneydown
+        if drawdown > self._max_drawdown:
+            self._max_drawdown = drawdown
+        self._len = self._len + 1 if drawdown else 0
+        if self._len > self._max_len:
+            self._max_len = self._len
+
+    def stop(self):
+        r = self.rets
+        r.len = self._len
+        r.drawdown = self._drawdown
+        r.moneydown = self._moneydown
+        r.max.len = self._max_len
+        r.max.drawdown = self._max_drawdown
+        r.max.moneydown = self._max_moneydown
+        r._close()
+
+
+class StreamingSharpe(bt.TimeFrameAnalyzerBase):
+    """Sharpe ratio from running moments of period returns
+
+    Computes the same ratio as ``bt.analyzers.SharpeRatio_A`` without
+    storing the return of every period.
+
+    Parameters
+    ----------
+    timeframe: TimeFrame, (default TimeFrame.Years)
+    compression: int, (default 1)
+    riskfreerate: float, (default 0.01)
+        Annual risk free rate
+    factor: float, optional
+        Periods per year, inferred from timeframe if None
+    convertrate: bool, (default True)
+        Convert riskfreerate to the period rate if True, otherwise
+        convert returns to annual returns
+    annualize: bool, (default True)
+    stddev_sample: bool, (default False)
+        Apply Bessel's correction to the standard deviation
+    fund: bool, optional
+        Use fund value instead of net asset value. Autodetected if None
+    """
+    params = (
+        ('timeframe', bt.TimeFrame.Years),
+        ('compression', 1),
+        ('riskfreerate', 0.01),
+        ('factor', None),
+        ('convertrate', True),
+        ('annualize', True),
+        ('stddev_sample', False),
+        ('fund', None),
+    )
+
+    RATEFACTORS = bt.analyzers.SharpeRatio.RATEFACTORS
+
+    def start(self):
+        if self.p.fund is None:
+            self._fundmode = self.strategy.broker.fundmode
+        else:
+            self._fundmode = self.p.fund
+        if self._fundmode:
+            self._lastvalue = self.strategy.broker.fundvalue
+        else:
+            self._lastvalue = self.strategy.broker.getvalue()
+        self._value = self._lastvalue
+        self._value_start = 0.0
+        self._ret = None
+        self.factor = self.p.factor
+        if self.factor is None:
+            self.factor = self.RATEFACTORS.get(self.p.timeframe)
+        self.rate = self.p.riskfreerate
+        if self.factor is not None and self.p.convertrate:
+            self.rate = pow(1.0 + self.rate, 1.0 / self.factor) - 1.0
+        # Welford's running mean and sum of squared deviations
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def notify_fund(self, cash, value, fundvalue, shares):
+        self._value = fundvalue if self._fundmode else value
+
+    def on_dt_over(self):
+        self._add_return()
+        self._value_start = self._lastvalue
+
+    def next(self):
+        # The last return within a period is the return of the period
+        self._ret = self._value / self._value_start - 1.0
+        self._lastvalue = self._value
+
+    def _add_return(self):
+        if self._ret is None:
+            return
+        ret = self._ret
+        self._ret = None
+        if self.factor is not None and not self.p.convertrate:
+            ret = pow(1.0 + ret, self.factor) - 1.0
+        ret -= self.rate
+        self._count += 1
+        delta = ret - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (ret - self._mean)
+
+    def stop(self):
+        self._add_return()
+        ratio = None
+        num = self._count - self.p.stddev_sample
+        if num > 0:
+            try:
+                ratio = self._mean / math.sqrt(self._m2 / num)
+                if self.factor is not None and self.p.convertrate and \
+                        self.p.annualize:
+                    ratio = math.sqrt(self.factor) * ratio
+            except (ValueError, ZeroDivisionError):
+                ratio = None
+        self.rets['sharperatio'] = ratio
+
+
+class ResultRecorder(bt.Analyzer):
+    """Record equity, positions, orders and closed trades as columns
+
+    Rows are appended to typed arrays, so the cost per bar is a few float
+    appends. See ``btbot.export`` to write them to files.
+    """
+    ORDER_COLUMNS = ('ref', 'data', 'created', 'executed', 'is_buy',
+                     'exectype', 'status', 'size', 'price', 'exec_size',
+                     'exec_price', 'comm')
+    TRADE_COLUMNS = ('ref', 'data', 'dtopen', 'dtclose', 'barlen', 'long',
+                     'price', 'pnl', 'pnlcomm', 'commission')
+
+    def start(self):
+        self._value = self.strategy.broker.getvalue()
+        self._cash = self.strategy.broker.getcash()
+        self.equity = dict(datetime=array('d'), value=array('d'),
+                           cash=array('d'))
+        self.positions = dict()
+        for data in self.datas:
+            self.positions[f'{data._name}_size'] = array('d')
+            self.positions[f'{data._name}_price'] = array('d')
+        self.orders = {name: [] for name in self.ORDER_COLUMNS}
+        self.trades = {name: [] for name in self.TRADE_COLUMNS}
+
+    def notify_fund(self, cash, value, fundvalue, shares):
+        self._cash = cash
+        self._value = value
+
+    def next(self):
+        self.equity['datetime'].append(self.strategy.datetime[0])
+        self.equity['value'].append(self._value)
+        self.equity['cash'].append(self._cash)
+        for data in self.datas:
+            position = self.strategy.getposition(data)
+            self.positions[f'{data._name}_size'].append(position.size)
+            self.positions[f'{data._name}_price'].append(position.price)
+
+    def notify_order(self, order):
+        if order.alive():
+            return
+        row = dict(ref=order.ref, data=order.data._name,
+                   created=order.created.dt,
+                   executed=order.executed.dt or float('nan'),
+                   is_buy=order.isbuy(), exectype=order.exectype,
+                   status=order.status, size=order.created.size,
+                   price=order.created.price or float('nan'),
+                   exec_size=order.executed.size,
+                   exec_price=order.executed.price,
+                   comm=order.executed.comm)
+        for name in self.ORDER_COLUMNS:
+            self.orders[name].append(row[name])
+
+    def notify_trade(self, trade):
+        if not trade.isclosed:
+            return
+        row = dict(ref=trade.ref, data=trade.data._name, dtopen=trade.dtopen,
+                   dtclose=trade.dtclose, barlen=trade.barlen,
+                   long=trade.long, price=trade.price, pnl=trade.pnl,
+                   pnlcomm=trade.pnlcomm, commission=trade.commission)
+        for name in self.TRADE_COLUMNS:
+            self.trades[name].append(row[name])
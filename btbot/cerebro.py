@@ -1,10 +1,15 @@
+import os
+
 import backtrader as bt
 
+from .analyzers import ResultRecorder, StreamingDrawDown, StreamingSharpe
+from .plotting import plot_strategy
+
 
 class Cerebro(bt.Cerebro):
     def plot(self, plotter=None, numfigs=1, iplot=True, start=None, end=None,
          width=16, height=9, dpi=300, tight=True, use=None, path=None,
-         **kwargs):
+         decimate=False, **kwargs):
         '''
         Plots the strategies inside cerebro
 
@@ -35,10 +40,19 @@ class Cerebro(bt.Cerebro):
         ``dpi``: quality in dots per inches of the saved figure
 
         ``tight``: only save actual content and not the frame of the figure
+
+        ``decimate``: if ``True`` render each strategy straight to ``path``
+        without a GUI, keeping the minimum and maximum of every line per
+        pixel. Only the ``start``/``end`` window is read. With several
+        strategies their index is appended to the file name
         '''
         if self._exactbars > 0:
             return
 
+        if decimate:
+            return self._plot_decimated(path, start=start, end=end,
+                                        width=width, height=height, dpi=dpi)
+
         if not plotter:
             from backtrader import plot
             if self.p.oldsync:
@@ -68,13 +82,80 @@ class Cerebro(bt.Cerebro):
             fig.savefig(path, dpi=dpi)
         return figs
 
+    def _plot_decimated(self, path, **kwargs):
+        if path is None:
+            raise ValueError('path is required to plot with decimate')
+        strats = [strat for stratlist in self.runstrats
+                  for strat in stratlist]
+        root, ext = os.path.splitext(path)
+        figs = []
+        for si, strat in enumerate(strats):
+            if len(strats) > 1:
+                path = f'{root}_{si}{ext}'
+            figs.append(plot_strategy(strat, path, **kwargs))
+        return figs
+
 
-def get_cerebro(startcash=10000):
-    cerebro = Cerebro()
+# Analyzers by name for each profile
+ANALYZERS = {
+    'full': {
+        'drawdown': (bt.analyzers.DrawDown, dict()),
+        'sharpe': (bt.analyzers.SharpeRatio_A,
+                   dict(timeframe=bt.analyzers.TimeFrame.Days)),
+        'pyfolio': (bt.analyzers.PyFolio, dict()),
+        'recorder': (ResultRecorder, dict()),
+    },
+    'lean': {
+        'drawdown': (StreamingDrawDown, dict()),
+        'sharpe': (StreamingSharpe,
+                   dict(timeframe=bt.analyzers.TimeFrame.Days)),
+        'pyfolio': (bt.analyzers.PyFolio, dict()),
+        'recorder': (ResultRecorder, dict()),
+    },
+}
+
+DEFAULT_ANALYZERS = {
+    'full': ('drawdown', 'sharpe', 'pyfolio'),
+    'lean': ('drawdown', 'sharpe'),
+}
+
+
+def get_cerebro(startcash=10000, profile='full', analyzers=None, **kwargs):
+    """Build Cerebro with analyzers
+
+    Parameters
+    ----------
+    startcash: float, (default 10000)
+    profile: str, (default 'full')
+        'full' adds the standard and DrawDown observers with DrawDown,
+        SharpeRatio_A and PyFolio analyzers. 'lean' is for headless runs
+        such as sweeps: no observers, preloaded runonce execution and
+        streaming drawdown and Sharpe analyzers
+    analyzers: list(str), optional
+        Names among 'drawdown', 'sharpe', 'pyfolio' and 'recorder'. The
+        default of the profile if None. 'recorder' is needed by
+        ``btbot.export``
+    kwargs:
+        Passed to Cerebro, e.g., exactbars. Note that exactbars disables
+        runonce
+
+    Returns
+    -------
+    Cerebro
+    """
+    if profile not in ANALYZERS:
+        raise ValueError(f'Invalid profile: {profile}')
+    if analyzers is None:
+        analyzers = DEFAULT_ANALYZERS[profile]
+    if profile == 'lean':
+        kwargs.setdefault('stdstats', False)
+        kwargs.setdefault('preload', True)
+        kwargs.setdefault('runonce', True)
+    cerebro = Cerebro(**kwargs)
     cerebro.broker.setcash(startcash)
-    cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
-    cerebro.addanalyzer(bt.analyzers.SharpeRatio_A, _name='sharpe',
-                        timeframe=bt.analyzers.TimeFrame.Days)
-    cerebro.addobserver(bt.observers.DrawDown)
-    cerebro.addanalyzer(bt.analyzers.PyFolio, _name='pyfolio')
-    return cerebro
\ No newline at end of file
+    for name in analyzers:
+        analyzer, params = ANALYZERS[profile][name]
+        cerebro.addanalyzer(analyzer, _name=name, **params)
+    if profile == 'full':
+        cerebro.addobserver(bt.observers.DrawDown)
+    return cerebro
@@ -1,2 +1,5 @@
 from .utils import get_symbols, get_data, get_info_SP500
 from .fetch import fetch_data
+from .cache import OHLCVCache
+from .engine import get_engine, get_session, dispose_engines
+from .feed import DBData
@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import shutil
+from urllib.parse import quote
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from .config import CACHE_DIR
+from .fetch import fetch_data, OHLCV
+from .sql_declarative import Base
+from .utils import date2datetime, date2str
+
+
+COLUMNS = ['date'] + OHLCV
+DTYPES = dict(date=np.int64, **{col: np.float64 for col in OHLCV})
+META = 'meta.json'
+
+
+class OHLCVCache(object):
+    """On-disk cache of OHLCV in front of the price database
+
+    Each (table, ticker) is a directory with a raw file per column, int64
+    nanoseconds for date and float64 for OHLCV, read with np.memmap. Newer
+    bars are appended to the files and only the date range not covered
+    yet is fetched from the database. The least recently used entries are
+    removed when the cache grows beyond ``max_bytes``.
+
+    Parameters
+    ----------
+    cache_dir: str, optional
+        config.CACHE_DIR if None
+    max_bytes: int, optional
+        Size limit of the cache. No limit if None
+    url: str, optional
+        Database URL passed to fetch_data
+    """
+    def __init__(self, cache_dir=None, max_bytes=None, url=None):
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.max_bytes = max_bytes
+        self.url = url
+
+    def get_dir(self, table, ticker):
+        return os.path.join(self.cache_dir, quote(table, safe=''),
+                            quote(ticker, safe=''))
+
+    def read_meta(self, table, ticker):
+        path = os.path.join(self.get_dir(table, ticker), META)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_meta(self, dirname, meta):
+        meta['access'] = time.time()
+        tmp_path = os.path.join(dirname, META + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(dirname, META))
+
+    def read(self, table, ticker):
+        """Memory-mapped columns of an entry
+
+        Returns
+        -------
+        dict(str, np.ndarray): Empty arrays if nothing is cached
+        """
+        dirname = self.get_dir(table, ticker)
+        path = os.path.join(dirname, 'date')
+        num_data = 0
+        if os.path.exists(path):
+            # Date is written last, so its length is the committed length
+            num_data = os.path.getsize(path) // 8
+        if num_data == 0:
+            return {col: np.empty(0, dtype=DTYPES[col]) for col in COLUMNS}
+        return {col: np.memmap(os.path.join(dirname, col), mode='r',
+                               dtype=DTYPES[col], shape=(num_data,))
+                for col in COLUMNS}
+
+    def _write(self, dirname, df, mode):
+        os.makedirs(dirname, exist_ok=True)
+        values = dict(date=df.index.values.astype('datetime64[ns]')
+                      .astype(np.int64))
+        for col in OHLCV:
+            values[col] = df[col].values.astype(np.float64)
+        for col in OHLCV + ['date']:
+            with open(os.path.join(dirname, col), mode) as f:
+                f.write(values[col].tobytes())
+
+    def _truncate(self, dirname):
+        # Drop bytes of an interrupted append beyond the date file
+        num_bytes = os.path.getsize(os.path.join(dirname, 'date'))
+        for col in OHLCV:
+            path = os.path.join(dirname, col)
+            if os.path.getsize(path) > num_bytes:
+                os.truncate(path, num_bytes)
+
+    def get_missing(self, table, ticker, start, end=None):
+        """Date range to fetch for (start, end]
+
+        Returns
+        -------
+        (start, end, append): Range in datetime and whether it is appended
+        to the entry. None if the entry covers the range
+        """
+        start = date2datetime(start)
+        end = None if end is None else date2datetime(end)
+        meta = self.read_meta(table, ticker)
+        if meta is None:
+            return start, end, False
+        covered_start = date2datetime(meta['start'])
+        covered_end = date2datetime(meta['end'])
+        if start < covered_start:
+            # Older bars can not be appended, fetch the whole range again
+            end = covered_end if end is None else max(end, covered_end)
+            return start, end, False
+        if end is None or end > covered_end:
+            return covered_end, end, True
+        return None
+
+    def update(self, table, ticker, df, start, end, append):
+        """Write bars fetched for (start, end]"""
+        dirname = self.get_dir(table, ticker)
+        meta = self.read_meta(table, ticker)
+        # Bars after the last fetched one may still be ingested, so the
+        # coverage ends at it even if a later end is requested
+        last = start if len(df) == 0 else df.index[-1].to_pydatetime()
+        end = last if end is None else min(end, last)
+        if meta is not None and append:
+            end = max(end, date2datetime(meta['end']))
+        if append:
+            self._truncate(dirname)
+            self._write(dirname, df, 'ab')
+            meta['end'] = date2str(end)
+        else:
+            if os.path.exists(dirname):
+                shutil.rmtree(dirname)
+            self._write(dirname, df, 'wb')
+            meta = dict(start=date2str(start), end=date2str(end))
+        self._write_meta(dirname, meta)
+
+    def load(self, table, ticker, start, end=None):
+        """Cached bars in (start, end] as DataFrame"""
+        columns = self.read(table, ticker)
+        dates = columns['date']
+        lo = np.searchsorted(dates, pd.Timestamp(start).value, side='right')
+        hi = len(dates)
+        if end is not None:
+            hi = np.searchsorted(dates, pd.Timestamp(end).value,
+                                 side='right')
+        df = pd.DataFrame({col: columns[col][lo:hi] for col in OHLCV},
+                          index=pd.DatetimeIndex(dates[lo:hi]))
+        dirname = self.get_dir(table, ticker)
+        meta = self.read_meta(table, ticker)
+        if meta is not None:
+            self._write_meta(dirname, meta)
+        return df
+
+    def fetch(self, start, end, tickers, table='price30m', offline=False):
+        """Fetch OHLCV through the cache
+
+        Parameters
+        ----------
+        start: '%Y-%m-%d %H:%M:%S'
+            Exclusive start
+        end: '%Y-%m-%d %H:%M:%S', optional
+            Inclusive end. Newer bars are fetched every call if None
+        tickers: list(str)
+        table: str, (default 'price30m')
+        offline: bool, (default False)
+            Use only cached bars without connecting to the database
+
+        Returns
+        -------
+        dict(str, pd.DataFrame): OHLCV indexed by date for each ticker
+        """
+        if not offline:
+            # Tickers missing the same range share a query
+            missing = defaultdict(list)
+            for ticker in tickers:
+                x = self.get_missing(table, ticker, start, end)
+                if x is not None:
+                    missing[x].append(ticker)
+            for (_start, _end, append), _tickers in missing.items():
+                data = fetch_data(
+                    date2str(_start), None if _end is None else date2str(_end),
+                    _tickers, url=self.url, table=Base.metadata.tables[table],
+                    warn=False)
+                for ticker in _tickers:
+                    self.update(table, ticker, data[ticker], _start, _end,
+                                append)
+            self.evict(keep=[(table, ticker) for ticker in tickers])
+        return {ticker: self.load(table, ticker, date2datetime(start),
+                                  None if end is None else date2datetime(end))
+                for ticker in tickers}
+
+    def get_entries(self):
+        """Cached entries with their size and last access time
+
+        Returns
+        -------
+        list((dirname, num_bytes, access))
+        """
+        entries = []
+        if not os.path.exists(self.cache_dir):
+            return entries
+        for table in os.listdir(self.cache_dir):
+            table_dir = os.path.join(self.cache_dir, table)
+            for ticker in os.listdir(table_dir):
+                dirname = os.path.join(table_dir, ticker)
+                num_bytes = sum(entry.stat().st_size
+                                for entry in os.scandir(dirname))
+                path = os.path.join(dirname, META)
+                access = 0.
+                if os.path.exists(path):
+                    with open(path) as f:
+                        access = json.load(f).get('access', 0.)
+                entries.append((dirname, num_bytes, access))
+        return entries
+
+    def evict(self, keep=()):
+        """Remove the least recently used entries beyond max_bytes
+
+        Parameters
+        ----------
+        keep: list((table, ticker))
+            Entries not to remove
+        """
+        if self.max_bytes is None:
+            return
+        keep = set(self.get_dir(table, ticker) for table, ticker in keep)
+        entries = sorted(self.get_entries(), key=lambda x: x[2])
+        total = sum(x[1] for x in entries)
+        for dirname, num_bytes, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if dirname in keep:
+                continue
+            shutil.rmtree(dirname)
+            total -= num_bytes
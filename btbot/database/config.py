@@ -1,8 +1,24 @@
-# Define your data base address here
+import os
+
+# Define your data base address here, or set the environment variables
 PASSWORD = 'happycrypto'
 HOST = 'localhost'
 USER = 'tom'
 PORT = 3306
 
-URL = f'mysql://{USER}:{PASSWORD}@{HOST}:{PORT}/poloDB'
-QUANDL_URL = f'mysql://{USER}:{PASSWORD}@{HOST}:{PORT}/quandlDB'
+URL = os.environ.get('BTBOT_DB_URL',
+                     f'mysql://{USER}:{PASSWORD}@{HOST}:{PORT}/poloDB')
+QUANDL_URL = os.environ.get(
+    'BTBOT_QUANDL_DB_URL', f'mysql://{USER}:{PASSWORD}@{HOST}:{PORT}/quandlDB')
+
+# Connection pool of each engine, see engine.py
+POOL_SIZE = int(os.environ.get('BTBOT_DB_POOL_SIZE', 5))
+MAX_OVERFLOW = int(os.environ.get('BTBOT_DB_MAX_OVERFLOW', 10))
+# Recycle connections before MySQL wait_timeout closes them
+POOL_RECYCLE = int(os.environ.get('BTBOT_DB_POOL_RECYCLE', 3600))
+
+# Local OHLCV cache, see cache.py
+CACHE_DIR = os.path.expanduser('~/.btbot/cache')
+
+# Last completed timestamps of backfills, see updater.Checkpoint
+CHECKPOINT_DIR = os.path.expanduser('~/.btbot/checkpoints')
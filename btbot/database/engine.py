@@ -0,0 +1,82 @@
+import os
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+
+from .config import URL, POOL_SIZE, MAX_OVERFLOW, POOL_RECYCLE
+
+
+# Engines and session factories by (url, pid). Forked processes such as
+# sweep workers get their own engine instead of sharing sockets.
+_engines = dict()
+_sessions = dict()
+_lock = threading.Lock()
+
+
+def get_engine(url=None, pool_size=None, max_overflow=None,
+               pool_pre_ping=True, **kwargs):
+    """Shared engine of the process
+
+    The first call for a URL creates the engine, later calls return it
+    and ignore the pool arguments.
+
+    Parameters
+    ----------
+    url: str, optional
+        Database URL. config.URL, i.e., BTBOT_DB_URL if set, if None
+    pool_size, max_overflow: int, optional
+        config.POOL_SIZE and config.MAX_OVERFLOW if None. Not used for
+        SQLite
+    pool_pre_ping: bool, (default True)
+        Test connections before use, so dropped connections are replaced
+    kwargs:
+        Passed to create_engine
+
+    Returns
+    -------
+    sqlalchemy.engine.Engine
+    """
+    url = url or URL
+    key = (url, os.getpid())
+    with _lock:
+        engine = _engines.get(key)
+        if engine is None:
+            if make_url(url).get_backend_name() != 'sqlite':
+                kwargs.setdefault('pool_size', pool_size or POOL_SIZE)
+                kwargs.setdefault('max_overflow', max_overflow
+                                  if max_overflow is not None
+                                  else MAX_OVERFLOW)
+                kwargs.setdefault('pool_recycle', POOL_RECYCLE)
+            engine = create_engine(url, pool_pre_ping=pool_pre_ping,
+                                   **kwargs)
+            _engines[key] = engine
+    return engine
+
+
+def get_session(url=None):
+    """New session from the shared session factory of the URL
+
+    Returns
+    -------
+    sqlalchemy.orm.Session
+    """
+    url = url or URL
+    key = (url, os.getpid())
+    with _lock:
+        factory = _sessions.get(key)
+    if factory is None:
+        engine = get_engine(url)
+        with _lock:
+            factory = _sessions.setdefault(key, sessionmaker(bind=engine))
+    return factory()
+
+
+def dispose_engines():
+    """Close pooled connections of the engines of this process"""
+    pid = os.getpid()
+    with _lock:
+        for key in [key for key in _engines if key[1] == pid]:
+            _engines.pop(key).dispose()
+            _sessions.pop(key, None)
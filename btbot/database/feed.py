@@ -0,0 +1,180 @@
+import warnings
+from time import monotonic, sleep
+
+import numpy as np
+import pandas as pd
+import backtrader as bt
+
+from ..feeds import to_num
+from .engine import get_engine
+from .fetch import (get_price_query, get_table, get_rolled_up, needs_dedupe,
+                    resample_source, OHLCV)
+from .sql_declarative import Price30M
+from .utils import date2str
+
+
+class DBData(bt.feed.DataBase):
+    """Data feed streaming bars of a ticker from the price database
+
+    Rows are read through a server-side cursor (``stream_results``) in
+    batches of ``batch_size`` as Cerebro advances, and each batch is
+    converted to columns at once. Only the current batch is held besides
+    the lines, so with ``exactbars`` the memory does not grow with the
+    range. The connection is kept open while the stored bars are read.
+
+    With ``live=True`` the feed is live for Cerebro, which turns off
+    preload and runonce. Once the stored bars are consumed, the table is
+    polled every ``poll_interval`` seconds for bars newer than the last
+    one, each poll on a new connection.
+
+    Parameters
+    ----------
+    dataname: str
+        Ticker
+    table: sqlalchemy.Table, (default Price30M.__table__)
+    bar_timeframe: str, optional
+        Bars of another timeframe from price_rollup, see fetch_data. A
+        ticker not rolled up is resampled from table with a warning, and
+        its bars are read at once. ``timeframe`` is the backtrader
+        parameter
+    url: str, optional
+        Database URL, config.URL if None
+    start: '%Y-%m-%d %H:%M:%S', (default '1970-01-01 00:00:00')
+        Exclusive start
+    end: '%Y-%m-%d %H:%M:%S', optional
+        Inclusive end. A live feed stops after it
+    batch_size: int, (default 10000)
+        The number of rows per fetch
+    dedupe: bool, optional
+        Remove duplicated (ticker, date) in SQL, see fetch_data
+    live: bool, (default False)
+        Poll for new bars after the stored ones
+    poll_interval: float, (default 60)
+        Seconds between polls
+    """
+    params = (
+        ('table', Price30M.__table__),
+        ('bar_timeframe', None),
+        ('url', None),
+        ('start', '1970-01-01 00:00:00'),
+        ('end', None),
+        ('batch_size', 10000),
+        ('dedupe', None),
+        ('live', False),
+        ('poll_interval', 60.),
+    )
+
+    def islive(self):
+        return self.p.live
+
+    def start(self):
+        super(DBData, self).start()
+        self._conn = None
+        self._result = None
+        self._batch = dict()
+        self._num_rows = 0
+        self._pos = 0
+        self._last_date = None
+        self._next_poll = 0.
+        # _timeframe is taken by backtrader
+        self._bar_table, self._bar_timeframe = get_table(
+            self.p.table, self.p.bar_timeframe)
+        self._frame = None
+        self._resample = False
+        if self._bar_timeframe is not None:
+            with get_engine(self.p.url).connect() as conn:
+                rolled_up = get_rolled_up(conn, [self.p.dataname],
+                                          self._bar_timeframe)
+            if len(rolled_up) == 0:
+                warnings.warn(f'{self.p.dataname} is not rolled up to '
+                              f'{self._bar_timeframe}, resampling '
+                              f'{self.p.table.name}')
+                self._resample = True
+        self._execute(self.p.start)
+
+    def stop(self):
+        self._close()
+
+    def _execute(self, start):
+        ticker = self.p.dataname
+        if self._resample:
+            self._frame = resample_source(
+                start, self.p.end, [ticker], self.p.url, self.p.table,
+                self.p.dedupe, self._bar_timeframe)[ticker]
+            return
+        table, timeframe = self._bar_table, self._bar_timeframe
+        engine = get_engine(self.p.url)
+        dedupe = self.p.dedupe
+        if dedupe is None:
+            dedupe = needs_dedupe(engine, table)
+        query = get_price_query(table, [ticker], start, self.p.end, dedupe,
+                                timeframe)
+        self._conn = engine.connect()
+        self._result = self._conn.execution_options(
+            stream_results=True, yield_per=self.p.batch_size).execute(query)
+
+    def _close(self):
+        if self._result is not None:
+            self._result.close()
+            self._result = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _fetch(self):
+        """Read the next batch, False when the cursor is exhausted"""
+        if self._frame is not None:
+            # Resampled bars are a single batch
+            df, self._frame = self._frame, None
+            if len(df) == 0:
+                return False
+            dates = df.index.values
+            self._batch = dict(datetime=to_num(dates))
+            for col in OHLCV:
+                self._batch[col] = df[col].values.astype(np.float64)
+        else:
+            rows = []
+            if self._result is not None:
+                rows = self._result.fetchmany(self.p.batch_size)
+            if len(rows) == 0:
+                self._close()
+                return False
+            # (ticker, date, open, high, low, close, volume)
+            values = np.array(rows, dtype=object)
+            dates = pd.to_datetime(values[:, 1]).values
+            self._batch = dict(datetime=to_num(dates))
+            for i, col in enumerate(OHLCV):
+                self._batch[col] = values[:, i + 2].astype(np.float64)
+        self._num_rows = len(dates)
+        self._pos = 0
+        self._last_date = pd.Timestamp(dates[-1])
+        return True
+
+    def _poll(self):
+        """Query bars after the last one when poll_interval has passed"""
+        if self.p.end is not None and self._last_date is not None and \
+                self._last_date >= pd.Timestamp(self.p.end):
+            return False
+        now = monotonic()
+        if now < self._next_poll:
+            # Wait no longer than Cerebro asks, other datas may have bars
+            sleep(min(self._next_poll - now, self._qcheck))
+            return None
+        self._next_poll = now + self.p.poll_interval
+        start = self.p.start
+        if self._last_date is not None:
+            start = date2str(self._last_date)
+        self._execute(start)
+        return self._fetch() or None
+
+    def _load(self):
+        if self._pos >= self._num_rows and not self._fetch():
+            if not self.p.live:
+                return False
+            ret = self._poll()
+            if not ret:
+                return ret
+        for alias, values in self._batch.items():
+            getattr(self.lines, alias)[0] = values[self._pos]
+        self._pos += 1
+        return True
@@ -1,34 +1,217 @@
+import warnings
+from datetime import timedelta
+
 import pandas as pd
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select, func, type_coerce, String
 
-from .config import URL
-from .sql_declarative import Price30M, Base
-from .utils import date2datetime
+from .engine import get_engine
+from .migrate import get_unique_index, has_index
+from .sql_declarative import Price30M, PriceRollup
+from .utils import date2datetime, date2str
 
 
-def fetch_data(start, end, tickers):
-    engine = create_engine(URL)
-    Base.metadata.bind = engine
-    DBSession = sessionmaker(bind=engine)
-    session = DBSession()
-    start = date2datetime(start)
-    base_query = session.query(Price30M).filter(Price30M.date > start)
+OHLCV = ['open', 'high', 'low', 'close', 'volume']
+# Bar length in seconds of timeframes, longer ones are in price_rollup
+TIMEFRAMES = {'30M': 1800, '1H': 3600, '2H': 7200, '4H': 14400,
+              '6H': 21600, '12H': 43200, '1D': 86400}
+# (url, name) of tables found with their unique index
+_unique_tables = set()
+
+
+def get_timeframe(table):
+    """Timeframe of bars stored in a table, '30M' if it has no default"""
+    if 'timeframe' in table.c and table.c.timeframe.default is not None:
+        return table.c.timeframe.default.arg
+    return '30M'
+
+
+def get_table(table, timeframe=None):
+    """Table storing bars of timeframe
+
+    Returns
+    -------
+    (sqlalchemy.Table, str): The table and the timeframe to select, None
+    if the table has only bars of timeframe
+    """
+    if timeframe is None or timeframe == get_timeframe(table):
+        return table, None
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f'Unsupported timeframe: {timeframe}, '
+                         f'choose from {list(TIMEFRAMES)}')
+    return PriceRollup.__table__, timeframe
+
+
+def needs_dedupe(engine, table):
+    """Whether table may have rows duplicated on (ticker, date)
+
+    Tables without id are keyed by (ticker, date), and tables with id
+    have no duplicates once their unique index is created, see
+    migrate.migrate_price_table. The index is looked up in the database
+    until it is found.
+    """
+    if 'id' not in table.c:
+        return False
+    index = get_unique_index(table)
+    if index is None:
+        return True
+    key = (str(engine.url), table.name)
+    if key not in _unique_tables and has_index(engine, table.name,
+                                               index.name):
+        _unique_tables.add(key)
+    return key not in _unique_tables
+
+
+def get_price_query(table, tickers, start, end=None, dedupe=False,
+                    timeframe=None):
+    """Build a SELECT of OHLCV for tickers in (start, end]
+
+    Rows are ordered by (ticker, date).
+
+    Parameters
+    ----------
+    table: sqlalchemy.Table
+    tickers: list(str)
+    start, end: '%Y-%m-%d %H:%M:%S'
+    dedupe: bool, (default False)
+        Remove rows duplicated on (ticker, date) in SQL by keeping the
+        first inserted one, see needs_dedupe. Ignored for tables without
+        id
+    timeframe: str, optional
+        Select only bars of timeframe, e.g., in price_rollup
+
+    Returns
+    -------
+    sqlalchemy.Select
+    """
+    conds = [table.c.ticker.in_(list(tickers)),
+             table.c.date > date2datetime(start)]
     if end is not None:
-        end = date2datetime(end)
-        base_query = base_query.filter(Price30M.date <= end)
+        conds.append(table.c.date <= date2datetime(end))
+    if timeframe is not None:
+        conds.append(table.c.timeframe == timeframe)
+    # Skip per row datetime processing of the driver result, dates are
+    # parsed at once by pandas
+    columns = [table.c.ticker, type_coerce(table.c.date, String).label('date')]
+    columns += [table.c[x] for x in OHLCV]
+    query = select(*columns)
+    if dedupe and 'id' in table.c:
+        first = select(func.min(table.c.id).label('id')).where(*conds)\
+            .group_by(table.c.ticker, table.c.date).subquery()
+        query = query.join(first, table.c.id == first.c.id)
+    else:
+        query = query.where(*conds)
+    return query.order_by(table.c.ticker, table.c.date)
+
+
+def split_by_ticker(df, tickers, warn=False):
+    """Split rows ordered by (ticker, date) into DataFrame of each ticker
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        With ticker, date and OHLCV columns
+    tickers: list(str)
+        Tickers without rows get empty DataFrame
+    warn: bool, (default False)
+        Warn about tickers without rows
+
+    Returns
+    -------
+    dict(str, pd.DataFrame): OHLCV indexed by date
+    """
     data = {}
-    for ticker in tickers:
-        x = base_query.filter(Price30M.ticker == ticker).all()
-        timeidx = [x_i.date for x_i in x]
-        dict_val = dict(
-            open=[x_i.open for x_i in x],
-            high=[x_i.high for x_i in x],
-            low=[x_i.low for x_i in x],
-            close=[x_i.close for x_i in x],
-            volume=[x_i.volume for x_i in x])
-        df = pd.DataFrame(dict_val, index=timeidx)
-        df = df.loc[~df.index.duplicated(keep='first')]
-        df.sort_index(inplace=True)
-        data[ticker] = df
+    df.index = pd.DatetimeIndex(pd.to_datetime(df['date'].values))
+    for ticker, group in df.groupby('ticker', sort=False):
+        data[ticker] = group[OHLCV]
+    missing = [ticker for ticker in tickers if ticker not in data]
+    if warn and len(missing) > 0:
+        warnings.warn(f'No bars of {missing}')
+    # A new empty frame each, so that callers can modify them
+    for ticker in missing:
+        data[ticker] = pd.DataFrame(columns=OHLCV,
+                                    index=pd.DatetimeIndex([]), dtype=float)
+    return {ticker: data[ticker] for ticker in tickers}
+
+
+def get_rolled_up(conn, tickers, timeframe):
+    """Tickers with bars of timeframe in price_rollup"""
+    table = PriceRollup.__table__
+    query = select(table.c.ticker).distinct()\
+        .where(table.c.ticker.in_(list(tickers)),
+               table.c.timeframe == timeframe)
+    return set(x[0] for x in conn.execute(query))
+
+
+def resample_source(start, end, tickers, url, table, dedupe, timeframe):
+    """Bars of timeframe resampled from table, as price_rollup holds them
+
+    A bar is in (start, end] by its start, so the source is read until the
+    end of the bar containing end.
+    """
+    # rollup imports this module
+    from .rollup import resample_ohlcv
+    source_end = None
+    if end is not None:
+        period = pd.Timedelta(seconds=TIMEFRAMES[timeframe])
+        last = pd.Timestamp(date2datetime(end)).floor(period)
+        source_end = date2str(last + period - timedelta(seconds=1))
+    data = fetch_data(start, source_end, tickers, url=url, table=table,
+                      dedupe=dedupe, warn=False)
+    start = date2datetime(start)
+    result = dict()
+    for ticker, df in data.items():
+        bars = resample_ohlcv(df, timeframe)
+        result[ticker] = bars.loc[bars.index > start]
+    return result
+
+
+def fetch_data(start, end, tickers, url=None, table=Price30M.__table__,
+               dedupe=None, timeframe=None, warn=True):
+    """Fetch OHLCV of tickers with a single query
+
+    Parameters
+    ----------
+    start: '%Y-%m-%d %H:%M:%S'
+        Exclusive start
+    end: '%Y-%m-%d %H:%M:%S', optional
+        Inclusive end
+    tickers: list(str)
+    url: str, optional
+        Database URL, e.g., 'sqlite:///price.db'. config.URL if None. The
+        engine is shared in the process
+    table: sqlalchemy.Table, (default Price30M.__table__)
+    dedupe: bool, optional
+        Remove duplicated (ticker, date) in SQL. If None, only when the
+        table lacks its unique index in the database, see needs_dedupe
+    timeframe: str, optional
+        One of TIMEFRAMES. Bars of other timeframes than the table are
+        read from price_rollup, see rollup.update_rollups. Tickers not
+        rolled up to timeframe are resampled from the table
+    warn: bool, (default True)
+        Warn about tickers without bars
+
+    Returns
+    -------
+    dict(str, pd.DataFrame): OHLCV indexed by date for each ticker
+    """
+    source = table
+    table, timeframe = get_table(table, timeframe)
+    engine = get_engine(url)
+    if dedupe is None:
+        dedupe = needs_dedupe(engine, table)
+    query = get_price_query(table, tickers, start, end, dedupe, timeframe)
+    with engine.connect() as conn:
+        df = pd.read_sql(query, conn)
+        if timeframe is not None:
+            rolled_up = get_rolled_up(conn, tickers, timeframe)
+    if timeframe is None:
+        return split_by_ticker(df, tickers, warn=warn)
+    data = split_by_ticker(df, tickers)
+    missing = [ticker for ticker in tickers if ticker not in rolled_up]
+    if len(missing) > 0:
+        data.update(resample_source(start, end, missing, url, source, dedupe,
+                                    timeframe))
+    empty = [ticker for ticker in tickers if len(data[ticker]) == 0]
+    if warn and len(empty) > 0:
+        warnings.warn(f'No bars of {empty}')
     return data
@@ -0,0 +1,197 @@
+import argparse
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import inspect, select, insert, update, delete, func, text
+
+from .engine import get_engine
+from .sql_declarative import Base, Price30M, NarrowPrice30M
+
+
+def get_unique_index(table):
+    for index in table.indexes:
+        if index.unique:
+            return index
+    return None
+
+
+def has_index(engine, table_name, index_name):
+    indexes = inspect(engine).get_indexes(table_name)
+    return any(index['name'] == index_name for index in indexes)
+
+
+def migrate_price_table(engine, table):
+    """Add the unique (ticker, timeframe, date) index to an existing table
+
+    Missing timeframes are filled with the default of the table and
+    duplicated bars are deleted keeping the first inserted one. Each step
+    is skipped once done, so it can be run again after an interruption.
+
+    Parameters
+    ----------
+    engine: sqlalchemy.engine.Engine
+    table: sqlalchemy.Table
+        Table with PriceMixin
+
+    Returns
+    -------
+    int: The number of deleted duplicates
+    """
+    index = get_unique_index(table)
+    if has_index(engine, table.name, index.name):
+        return 0
+    c = table.c
+    with engine.begin() as conn:
+        conn.execute(update(table).where(c.timeframe.is_(None))
+                     .values(timeframe=c.timeframe.default.arg))
+    # Nested derived table, MySQL does not allow the target table in
+    # a subquery of DELETE
+    first = select(func.min(c.id).label('id'))\
+        .group_by(c.ticker, c.timeframe, c.date).subquery('first')
+    keep = select(first.c.id).subquery('keep')
+    with engine.begin() as conn:
+        result = conn.execute(delete(table).where(
+            c.id.not_in(select(keep.c.id))))
+    index.create(engine)
+    return result.rowcount
+
+
+def copy_to_narrow(engine, src=Price30M.__table__,
+                   dst=NarrowPrice30M.__table__):
+    """Copy bars into a narrow table ticker by ticker
+
+    Bars already in ``dst`` are not copied, so it can be resumed.
+
+    Returns
+    -------
+    int: The number of copied rows
+    """
+    with engine.connect() as conn:
+        tickers = [x[0] for x in conn.execute(
+            select(src.c.ticker).distinct())]
+    columns = [c.name for c in dst.c]
+    num_rows = 0
+    for ticker in tickers:
+        with engine.begin() as conn:
+            last = conn.execute(select(func.max(dst.c.date))
+                                .where(dst.c.ticker == ticker)).scalar()
+            conds = [src.c.ticker == ticker]
+            if last is not None:
+                conds.append(src.c.date > last)
+            first = select(func.min(src.c.id).label('id')).where(*conds)\
+                .group_by(src.c.date).subquery()
+            query = select(*[src.c[x] for x in columns])\
+                .join(first, src.c.id == first.c.id)
+            result = conn.execute(insert(dst).from_select(columns, query))
+            num_rows += result.rowcount
+    return num_rows
+
+
+def _month_partitions(start, end):
+    months = pd.date_range(pd.Timestamp(start).to_period('M').start_time,
+                           end, freq='MS')
+    return [(f'p{month:%Y%m}',
+             (month + pd.offsets.MonthBegin(1)).strftime('%Y-%m-%d'))
+            for month in months]
+
+
+def partition_by_month(engine, table=NarrowPrice30M.__table__, start=None,
+                       end=None):
+    """Partition a table by month of date on MySQL
+
+    A partition is created for each month in [start, end] plus one for
+    later dates, which ``add_month_partitions`` splits as time goes on.
+    MySQL requires date in every unique key, so only tables with
+    NarrowPriceMixin can be partitioned.
+
+    Parameters
+    ----------
+    engine: sqlalchemy.engine.Engine
+    table: sqlalchemy.Table
+    start, end: datetime, optional
+        The first date in the table and now if None
+    """
+    if engine.dialect.name != 'mysql':
+        raise NotImplementedError('Partitioning is supported on MySQL')
+    if start is None:
+        with engine.connect() as conn:
+            start = conn.execute(select(func.min(table.c.date))).scalar()
+        start = start or datetime.utcnow()
+    end = end or datetime.utcnow()
+    parts = [f"PARTITION {name} VALUES LESS THAN ('{until}')"
+             for name, until in _month_partitions(start, end)]
+    parts.append('PARTITION pmax VALUES LESS THAN (MAXVALUE)')
+    with engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE {table.name} PARTITION BY RANGE '
+                          f'COLUMNS(date) ({", ".join(parts)})'))
+
+
+def add_month_partitions(engine, table=NarrowPrice30M.__table__, end=None):
+    """Split the last partition up to the month of end on MySQL
+
+    Without month partitions, pmax is split from the month of end, so the
+    first partition takes the earlier rows.
+    """
+    if engine.dialect.name != 'mysql':
+        raise NotImplementedError('Partitioning is supported on MySQL')
+    query = text('SELECT partition_name FROM information_schema.partitions '
+                 'WHERE table_schema = DATABASE() AND table_name = :name')
+    with engine.connect() as conn:
+        names = [x[0] for x in conn.execute(query, dict(name=table.name))]
+    if 'pmax' not in names:
+        raise ValueError(f'{table.name} is not partitioned, see '
+                         f'partition_by_month')
+    end = end or datetime.utcnow()
+    months = sorted(x for x in names if x != 'pmax')
+    start = end
+    if len(months) > 0:
+        start = datetime.strptime(months[-1], 'p%Y%m') + \
+            pd.offsets.MonthBegin(1)
+    parts = [f"PARTITION {name} VALUES LESS THAN ('{until}')"
+             for name, until in _month_partitions(start, end)]
+    if len(parts) == 0:
+        return
+    parts.append('PARTITION pmax VALUES LESS THAN (MAXVALUE)')
+    with engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE {table.name} REORGANIZE PARTITION '
+                          f'pmax INTO ({", ".join(parts)})'))
+
+
+def migrate(url=None, narrow=False, partition=False):
+    """Bring a database to the current schema
+
+    Parameters
+    ----------
+    url: str, optional
+        Database URL, config.URL if None
+    narrow: bool, (default False)
+        Copy price30m into price30m_narrow
+    partition: bool, (default False)
+        Partition price30m_narrow by month, MySQL only
+    """
+    engine = get_engine(url)
+    existing = set(inspect(engine).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name in existing and 'id' in table.c:
+            num_deleted = migrate_price_table(engine, table)
+            print(f'{table.name}: indexed, {num_deleted} duplicates deleted')
+    Base.metadata.create_all(engine)
+    if partition and NarrowPrice30M.__tablename__ not in existing:
+        start = None
+        if Price30M.__tablename__ in existing:
+            with engine.connect() as conn:
+                start = conn.execute(
+                    select(func.min(Price30M.__table__.c.date))).scalar()
+        partition_by_month(engine, start=start)
+    if narrow:
+        num_rows = copy_to_narrow(engine)
+        print(f'{NarrowPrice30M.__tablename__}: {num_rows} rows copied')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', type=str, default=None)
+    parser.add_argument('--narrow', action='store_true')
+    parser.add_argument('--partition', action='store_true')
+    args = parser.parse_args()
+    migrate(args.url, args.narrow, args.partition)
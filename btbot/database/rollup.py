@@ -0,0 +1,198 @@
+import argparse
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, insert, delete, func
+
+from .engine import get_engine
+from .fetch import fetch_data, get_timeframe, TIMEFRAMES, OHLCV
+from .sql_declarative import Price30M, PriceRollup
+from .store import to_records
+from .utils import date2str
+
+
+ROLLUP_TIMEFRAMES = ('1H', '4H', '1D')
+
+
+def aggregate_ohlcv(df, ids, label='first'):
+    """OHLCV of runs of consecutive rows with the same id
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        OHLCV indexed by date in ascending order
+    ids: np.ndarray
+        Non-decreasing group id of each row
+    label: str, (default 'first')
+        Date of a bar is the first or the last date of its rows
+
+    Returns
+    -------
+    pd.DataFrame: OHLCV of each group indexed by date. High, low and
+    volume skip nan as pandas does
+    """
+    if len(df) == 0:
+        return pd.DataFrame(columns=OHLCV, index=pd.DatetimeIndex([]),
+                            dtype=float)
+    ids = np.asarray(ids)
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], len(ids)] - 1
+    dates = df.index.values[starts if label == 'first' else ends]
+    return pd.DataFrame(dict(
+        open=df['open'].values[starts],
+        high=np.fmax.reduceat(df['high'].values, starts),
+        low=np.fmin.reduceat(df['low'].values, starts),
+        close=df['close'].values[ends],
+        volume=np.add.reduceat(np.nan_to_num(df['volume'].values), starts),
+    ), index=pd.DatetimeIndex(dates))
+
+
+def resample_ohlcv(df, timeframe):
+    """Time bars of timeframe, aligned to 1970-01-01 00:00 UTC
+
+    A bar is labeled with its start as 30 minute bars are. Periods
+    without rows produce no bar.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        OHLCV indexed by date in ascending order
+    timeframe: str
+        One of TIMEFRAMES
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    period = TIMEFRAMES[timeframe] * 10 ** 9
+    ids = pd.DatetimeIndex(df.index).asi8 // period
+    bars = aggregate_ohlcv(df, ids)
+    bars.index = pd.DatetimeIndex(np.unique(ids) * period)
+    return bars
+
+
+def _information_bars(df, size, threshold):
+    # A bar closes at the row where the cumulative size reaches the next
+    # multiple of threshold. Size beyond it is carried over
+    cumsum = np.cumsum(np.nan_to_num(size))
+    ids = np.floor(np.r_[0., cumsum[:-1]] / threshold)
+    if len(df) > 0 and cumsum[-1] < (ids[-1] + 1) * threshold:
+        # Rows of the last bar not closed yet
+        num_rows = np.searchsorted(ids, ids[-1], side='left')
+        df, ids = df.iloc[:num_rows], ids[:num_rows]
+    return aggregate_ohlcv(df, ids, label='last')
+
+
+def volume_bars(df, threshold):
+    """Bars closed every threshold of traded volume
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        OHLCV indexed by date in ascending order, e.g., 30 minute bars
+    threshold: float
+        Volume per bar
+
+    Returns
+    -------
+    pd.DataFrame: OHLCV of closed bars labeled with their last date
+    """
+    return _information_bars(df, df['volume'].values, threshold)
+
+
+def dollar_bars(df, threshold):
+    """Bars closed every threshold of traded value, close times volume
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        OHLCV indexed by date in ascending order, e.g., 30 minute bars
+    threshold: float
+        Value per bar
+
+    Returns
+    -------
+    pd.DataFrame: OHLCV of closed bars labeled with their last date
+    """
+    size = df['close'].values * df['volume'].values
+    return _information_bars(df, size, threshold)
+
+
+def get_last_rollups(conn, dst, ticker, timeframes):
+    """The latest rollup date of each timeframe, None if not rolled up"""
+    query = select(dst.c.timeframe, func.max(dst.c.date))\
+        .where(dst.c.ticker == ticker, dst.c.timeframe.in_(timeframes))\
+        .group_by(dst.c.timeframe)
+    last_dates = dict(conn.execute(query).all())
+    return {timeframe: last_dates.get(timeframe) for timeframe in timeframes}
+
+
+def update_rollups(tickers, timeframes=ROLLUP_TIMEFRAMES, url=None,
+                   src=Price30M.__table__, dst=PriceRollup.__table__,
+                   dedupe=None):
+    """Aggregate new bars of src into rollup bars of each timeframe
+
+    The latest rollup bar of a ticker may be partial, so it is aggregated
+    again with the bars after it. Source bars from its start are read
+    once per ticker, and the bars of each timeframe from that date are
+    replaced in a single transaction. Run it after storing new bars.
+
+    Parameters
+    ----------
+    tickers: list(str)
+    timeframes: list(str), (default ROLLUP_TIMEFRAMES)
+        Timeframes in TIMEFRAMES longer than that of src
+    url: str, optional
+        Database URL, config.URL if None
+    src: sqlalchemy.Table, (default Price30M.__table__)
+    dst: sqlalchemy.Table, (default PriceRollup.__table__)
+    dedupe: bool, optional
+        Remove duplicated (ticker, date) of src in SQL, see fetch_data
+
+    Returns
+    -------
+    dict(str, int): The number of written bars of each ticker
+    """
+    src_period = TIMEFRAMES[get_timeframe(src)]
+    for timeframe in timeframes:
+        if TIMEFRAMES[timeframe] <= src_period:
+            raise ValueError(f'{timeframe} is not longer than the source')
+    engine = get_engine(url)
+    num_bars = dict()
+    for ticker in tickers:
+        with engine.connect() as conn:
+            last_dates = get_last_rollups(conn, dst, ticker, timeframes)
+        start = '1970-01-01 00:00:00'
+        if all(x is not None for x in last_dates.values()):
+            # The start of the source is exclusive
+            start = date2str(min(last_dates.values()) - timedelta(seconds=1))
+        df = fetch_data(start, None, [ticker], url=url, table=src,
+                        dedupe=dedupe)[ticker]
+        num_bars[ticker] = 0
+        for timeframe in timeframes:
+            bars = resample_ohlcv(df, timeframe)
+            last = last_dates[timeframe]
+            if last is not None:
+                bars = bars.loc[bars.index >= last]
+            if len(bars) == 0:
+                continue
+            records = to_records(ticker, bars)
+            for record in records:
+                record['timeframe'] = timeframe
+            with engine.begin() as conn:
+                conn.execute(delete(dst).where(
+                    dst.c.ticker == ticker, dst.c.timeframe == timeframe,
+                    dst.c.date >= bars.index[0].to_pydatetime()))
+                conn.execute(insert(dst), records)
+            num_bars[ticker] += len(bars)
+    return num_bars
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('tickers', nargs='+')
+    parser.add_argument('--url', type=str, default=None)
+    parser.add_argument('--timeframes', nargs='+', default=ROLLUP_TIMEFRAMES)
+    args = parser.parse_args()
+    print(update_rollups(args.tickers, args.timeframes, args.url))
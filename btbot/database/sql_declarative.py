@@ -1,8 +1,8 @@
-from sqlalchemy import create_engine
-from sqlalchemy import Column, Integer, String, Float, DateTime, func
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index, func
+from sqlalchemy.ext.declarative import declarative_base, declared_attr
 
 from .config import URL
+from .engine import get_engine
 
 
 Base = declarative_base()
@@ -19,6 +19,28 @@ class PriceMixin(object):
     low = Column(Float, nullable=True)
     volume = Column(Float, nullable=True)
 
+    @declared_attr
+    def __table_args__(cls):
+        # Range queries by ticker and no duplicated bars
+        return (Index(f'ix_{cls.__tablename__}_ticker_timeframe_date',
+                      'ticker', 'timeframe', 'date', unique=True),)
+
+
+class NarrowPriceMixin(object):
+    """Price table of a single timeframe keyed by (ticker, date)
+
+    Without id and create_date, rows are smaller and the primary key is
+    the range query index. The date in the primary key also allows
+    partitioning by month, see migrate.partition_by_month.
+    """
+    ticker = Column(String(10), primary_key=True)
+    date = Column(DateTime, primary_key=True)
+    close = Column(Float, nullable=True)
+    open = Column(Float, nullable=True)
+    high = Column(Float, nullable=True)
+    low = Column(Float, nullable=True)
+    volume = Column(Float, nullable=True)
+
 
 class Price30M(Base, PriceMixin):
     __tablename__ = 'price30m'
@@ -30,7 +52,17 @@ class StockPriceDay(Base, PriceMixin):
     timeframe = Column(String(10), default='1D')
 
 
+class NarrowPrice30M(Base, NarrowPriceMixin):
+    __tablename__ = 'price30m_narrow'
+
+
+class PriceRollup(Base, PriceMixin):
+    """Bars of longer timeframes aggregated from price30m, see rollup.py"""
+    __tablename__ = 'price_rollup'
+    timeframe = Column(String(10), nullable=False)
+
+
 if __name__ == '__main__':
-    engine = create_engine(URL)
-    # engine = create_engine(QUANDL_URL)
+    engine = get_engine(URL)
+    # engine = get_engine(QUANDL_URL)
     Base.metadata.create_all(engine)
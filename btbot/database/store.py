@@ -1,11 +1,17 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from tqdm import tqdm
-from time import sleep
+from sqlalchemy import select, insert
+from time import perf_counter
+import pandas as pd
 
-from config import URL, QUANDL_URL
-from sql_declarative import Price30M, Base, StockPriceDay
-from utils import get_data, get_symbols
+from .config import URL, QUANDL_URL
+from .engine import get_engine
+from .sql_declarative import Price30M, StockPriceDay, NarrowPrice30M
+from .utils import get_data, get_symbols
+
+
+OHLCV = ['open', 'high', 'low', 'close', 'volume']
+TABLES = {'price30m': Price30M.__table__,
+          'stock_price_daily': StockPriceDay.__table__,
+          'price30m_narrow': NarrowPrice30M.__table__}
 
 
 def store(session, ticker, date, open, high, low,
@@ -32,6 +38,87 @@ def store(session, ticker, date, open, high, low,
     session.commit()
 
 
+def _get_url(table):
+    if table == "stock_price_daily":
+        return QUANDL_URL
+    return URL
+
+
+def to_records(ticker, df):
+    """Rows of an OHLCV DataFrame as dicts for executemany inserts
+
+    Parameters
+    ----------
+    ticker: str
+    df: pd.DataFrame
+        OHLCV indexed by date. NaN become NULL
+
+    Returns
+    -------
+    list(dict): Columns of the price tables
+    """
+    values = df[OHLCV].astype(object)
+    values = values.where(df[OHLCV].notna(), None).values.tolist()
+    dates = df.index.to_pydatetime()
+    return [dict(zip(OHLCV, row), ticker=ticker, date=date)
+            for date, row in zip(dates, values)]
+
+
+def store_bulk(ticker, df, table="price30m", url=None, chunk_size=10000,
+               verbose=True):
+    """Insert DataFrame in chunks skipping stored (ticker, date)
+
+    Each chunk is checked against the stored dates in its date range and
+    inserted with a single executemany in its own transaction, so an
+    interrupted run keeps the finished chunks and can be run again.
+
+    Parameters
+    ----------
+    ticker: str
+        Symbol
+    df: pd.DataFrame
+        OHLCV with a date column or DatetimeIndex
+    table: str
+        The name of table
+    url: str, optional
+        Database URL. Defined by table in config if None
+    chunk_size: int, (default 10000)
+        The number of rows per transaction
+    verbose: bool, (default True)
+        Print the number of rows and rows/s
+
+    Returns
+    -------
+    int: The number of inserted rows
+    """
+    start_time = perf_counter()
+    if 'date' in df.columns:
+        df = df.set_index('date')
+    # set_axis returns a new frame, the caller's one is left as is
+    df = df.set_axis(pd.DatetimeIndex(df.index))
+    df = df.loc[~df.index.duplicated(keep='first')].sort_index()
+    sql_table = TABLES[table]
+    engine = get_engine(url or _get_url(table))
+    num_inserted = 0
+    for i in range(0, len(df), chunk_size):
+        chunk = df.iloc[i:i + chunk_size]
+        with engine.begin() as conn:
+            query = select(sql_table.c.date).where(
+                sql_table.c.ticker == ticker,
+                sql_table.c.date >= chunk.index[0].to_pydatetime(),
+                sql_table.c.date <= chunk.index[-1].to_pydatetime())
+            stored = pd.DatetimeIndex([x[0] for x in conn.execute(query)])
+            chunk = chunk.loc[~chunk.index.isin(stored)]
+            if len(chunk) > 0:
+                conn.execute(insert(sql_table), to_records(ticker, chunk))
+        num_inserted += len(chunk)
+    elapsed = perf_counter() - start_time
+    if verbose:
+        print(f'{ticker}: inserted {num_inserted} of {len(df)} rows, '
+              f'{len(df) / max(elapsed, 1e-9):.0f} rows/s')
+    return num_inserted
+
+
 def store_df(ticker, df, table="price30m"):
     """Store DataFrame into database
 
@@ -43,21 +130,7 @@ def store_df(ticker, df, table="price30m"):
     table: str
         The name of table
     """
-    # Establish connection
-    if table == "stock_price_daily":
-        engine = create_engine(QUANDL_URL)
-    else:
-        engine = create_engine(URL)
-    Base.metadata.bind = engine
-    DBSession = sessionmaker(bind=engine)
-    session = DBSession()
-    df_val = df.values
-    for val in tqdm(df_val):
-        data = dict(session=session, ticker=ticker)
-        for i, col in enumerate(df.columns):
-            data[col] = val[i]
-        store(**data, table=table)
-    session.close()
+    store_bulk(ticker, df, table=table)
 
 
 def update(ticker, end=None, period="30", exchange="polo"):
@@ -86,7 +159,8 @@ def update(ticker, end=None, period="30", exchange="polo"):
 
 
 if __name__ == '__main__':
+    from .rollup import update_rollups
+    from .updater import Updater
     pairs = get_symbols()
-    for pair in tqdm(pairs):
-        update(pair, period=1800, exchange="polo")
-        sleep(3)
+    Updater(exchange="polo", period=1800).update(pairs)
+    update_rollups(pairs)
@@ -0,0 +1,427 @@
+import os
+import json
+import random
+import warnings
+import threading
+from time import sleep, monotonic
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+from sqlalchemy import select, func
+
+from .config import CHECKPOINT_DIR
+from .engine import get_engine
+from .store import TABLES, store_bulk, _get_url
+from .utils import (date2seconds, seconds2date, get_time_now,
+                    _preprocess_bitfx, _preprocess_kraken)
+
+
+BASE_URLS = {
+    'polo': 'https://poloniex.com/public',
+    'bitfx': 'https://api.bitfinex.com/v2',
+    'kraken': 'https://api.kraken.com/0/public',
+}
+
+# (requests per second, burst) of public endpoints
+RATE_LIMITS = {
+    'polo': (6., 6),
+    'bitfx': (20. / 60., 1),
+    'kraken': (1., 1),
+}
+
+BITFX_TIMEFRAMES = {60: '1m', 300: '5m', 900: '15m', 1800: '30m',
+                    3600: '1h', 10800: '3h', 21600: '6h', 43200: '12h',
+                    86400: '1D'}
+# The number of candles per Bitfinex request
+BITFX_LIMIT = 120
+# The number of bars per backfill request. Kraken returns at most 720
+PAGE_SIZES = {'polo': 1000, 'bitfx': BITFX_LIMIT, 'kraken': 720}
+
+OHLCV = ['open', 'high', 'low', 'close', 'volume']
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket rate limiter
+
+    Parameters
+    ----------
+    rate: float
+        Tokens added per second
+    capacity: int
+        The maximum number of tokens, i.e., the burst size
+    """
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it"""
+        while True:
+            with self._lock:
+                now = monotonic()
+                self._tokens = min(self.capacity,
+                                   self._tokens + (now - self._last) *
+                                   self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            sleep(wait)
+
+
+class RetryError(Exception):
+    """Request failed after all retries"""
+
+
+class Checkpoint(object):
+    """Last completed timestamp of each (exchange, ticker) in a JSON file
+
+    The file is replaced atomically on every update, so it holds a
+    consistent state whenever a backfill is interrupted.
+
+    Parameters
+    ----------
+    path: str
+    """
+    def __init__(self, path):
+        self.path = path
+        self._data = dict()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                self._data = json.load(f)
+
+    def get(self, exchange, ticker):
+        """Unix seconds, None if no page is completed"""
+        return self._data.get(exchange, dict()).get(ticker)
+
+    def set(self, exchange, ticker, seconds):
+        with self._lock:
+            self._data.setdefault(exchange, dict())[ticker] = int(seconds)
+            dirname = os.path.dirname(self.path)
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self._data, f)
+            os.replace(tmp_path, self.path)
+
+
+def get_json(url, limiter=None, max_retries=5, backoff=1., max_backoff=60.,
+             timeout=30.):
+    """GET JSON with rate limiting and exponential backoff
+
+    Rate limit (429), server errors and connection errors are retried
+    after ``backoff * 2 ** attempt`` seconds with jitter, or Retry-After
+    if given. Other HTTP errors are raised at once.
+
+    Parameters
+    ----------
+    url: str
+    limiter: TokenBucket, optional
+        A token is taken before every attempt
+    max_retries: int, (default 5)
+    backoff, max_backoff: float
+        The first and the longest wait in seconds
+    timeout: float, (default 30)
+
+    Returns
+    -------
+    Parsed JSON
+    """
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        wait = None
+        try:
+            with urlopen(url, timeout=timeout) as res:
+                return json.loads(res.read())
+        except HTTPError as e:
+            if e.code != 429 and e.code < 500:
+                raise
+            error = e
+            retry_after = e.headers.get('Retry-After') if e.headers else None
+            if retry_after is not None and retry_after.isdigit():
+                wait = float(retry_after)
+        except (URLError, TimeoutError, ConnectionError) as e:
+            error = e
+        if attempt == max_retries:
+            break
+        if wait is None:
+            wait = backoff * 2 ** attempt * (0.5 + random.random())
+        sleep(min(wait, max_backoff))
+    raise RetryError(f'{url}: {error}')
+
+
+def parse_polo(data):
+    df = pd.DataFrame(data)
+    if len(df) == 0 or 'date' not in df.columns:
+        return pd.DataFrame(columns=OHLCV, index=pd.DatetimeIndex([]))
+    df.index = pd.to_datetime(df['date'].values, unit='s')
+    # Poloniex returns a single zero row when there is no data
+    df = df.loc[df['date'].values > 0]
+    return df[OHLCV].astype(float)
+
+
+def parse_bitfx(data):
+    df = _preprocess_bitfx(data).set_index('date')
+    return df[OHLCV].sort_index()
+
+
+def parse_kraken(data):
+    return _preprocess_kraken(data).set_index('date')[OHLCV]
+
+
+class Updater(object):
+    """Download many symbols concurrently and store them in bulk
+
+    Downloads run in a thread pool and share a token bucket per
+    exchange. Each finished download is written by the calling thread
+    with store_bulk, so there is a single writer to the database.
+
+    Parameters
+    ----------
+    exchange: str, (default 'polo')
+        'polo', 'bitfx' or 'kraken'
+    period: int, (default 1800)
+        Bar length in seconds
+    table: str, (default 'price30m')
+    url: str, optional
+        Database URL
+    num_workers: int, (default 8)
+    rate, capacity: float, optional
+        Token bucket of the exchange. RATE_LIMITS if None
+    max_retries: int, (default 5)
+    backoff: float, (default 1)
+        The first wait in seconds before a retry
+    base_url: str, optional
+        API endpoint, e.g., a local stub server. BASE_URLS if None
+    """
+    def __init__(self, exchange='polo', period=1800, table='price30m',
+                 url=None, num_workers=8, rate=None, capacity=None,
+                 max_retries=5, backoff=1., base_url=None):
+        self.exchange = exchange
+        self.period = period
+        self.table = table
+        self.url = url
+        self.num_workers = num_workers
+        default_rate, default_capacity = RATE_LIMITS[exchange]
+        self.limiter = TokenBucket(rate or default_rate,
+                                   capacity or default_capacity)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.base_url = base_url or BASE_URLS[exchange]
+        # A single writer to the database at a time
+        self._store_lock = threading.Lock()
+
+    def get_json(self, path, **params):
+        url = f'{self.base_url}{path}?{urlencode(params)}'
+        return get_json(url, self.limiter, max_retries=self.max_retries,
+                        backoff=self.backoff)
+
+    def get_last_dates(self, tickers):
+        """The latest stored date of each ticker, None if not stored"""
+        table = TABLES[self.table]
+        query = select(table.c.ticker, func.max(table.c.date))\
+            .where(table.c.ticker.in_(list(tickers)))\
+            .group_by(table.c.ticker)
+        with get_engine(self.url or _get_url(self.table)).connect() as conn:
+            last_dates = dict(conn.execute(query).all())
+        return {ticker: last_dates.get(ticker) for ticker in tickers}
+
+    def download(self, ticker, start_sc, end_sc):
+        """OHLCV in (start_sc, end_sc] in unix seconds
+
+        The pages of iter_pages are concatenated, so a range longer than
+        a single response is downloaded in full.
+        """
+        pages = [df for df, _ in self.iter_pages(ticker, start_sc, end_sc)]
+        if len(pages) == 0:
+            return parse_polo([])
+        return pd.concat(pages)
+
+    def update(self, tickers, start='1970-01-01 00:00:00', end=None):
+        """Download bars newer than the stored ones and store them
+
+        Parameters
+        ----------
+        tickers: list(str)
+        start: '%Y-%m-%d %H:%M:%S'
+            Start of tickers not stored yet
+        end: '%Y-%m-%d %H:%M:%S', optional
+            Now if None
+
+        Returns
+        -------
+        dict(str, int or Exception): Inserted rows or the error of each
+        ticker
+        """
+        end_sc = int(date2seconds(end or get_time_now()))
+        default_sc = int(date2seconds(start))
+        last_dates = self.get_last_dates(tickers)
+        results = dict()
+        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            futures = dict()
+            for ticker in tickers:
+                last = last_dates[ticker]
+                start_sc = default_sc if last is None else \
+                    int(date2seconds(last))
+                futures[executor.submit(self.download, ticker, start_sc,
+                                        end_sc)] = ticker
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    df = future.result()
+                    results[ticker] = store_bulk(ticker, df, table=self.table,
+                                                 url=self.url, verbose=False)
+                except Exception as e:
+                    print(f'{ticker}: {e}')
+                    results[ticker] = e
+        return results
+
+    def iter_pages(self, ticker, start_sc, end_sc, page_size=None):
+        """Pages of OHLCV in (start_sc, end_sc] from the oldest
+
+        Poloniex is requested by windows of ``page_size`` bars. An empty
+        window is followed by a daily request of the rest of the range,
+        which skips to the first day with bars instead of paging through
+        the time before the listing or after the last bar. Bitfinex
+        and Kraken are requested from the last received bar until a page
+        is empty, so gaps in the history cost no requests.
+
+        Kraken serves only its latest 720 bars and the last one is not
+        committed yet, so it is dropped. When a full page starts after
+        the bar following the cursor, the older bars are not available
+        and the iteration stops with a warning, leaving the cursor before
+        the hole.
+
+        Parameters
+        ----------
+        ticker: str
+        start_sc, end_sc: int
+            Unix seconds
+        page_size: int, optional
+            PAGE_SIZES if None
+
+        Yields
+        ------
+        (pd.DataFrame, int): Bars of a page and unix seconds up to which
+        all bars are downloaded
+        """
+        page_size = page_size or PAGE_SIZES[self.exchange]
+        cursor = start_sc
+        while cursor < end_sc:
+            if self.exchange == 'polo':
+                page_end = min(end_sc, cursor + self.period * page_size)
+                df = self.get_polo(ticker, cursor, page_end)
+                if len(df) == 0:
+                    day_sc = cursor - cursor % 86400
+                    days = self.get_polo(ticker, day_sc - 1, end_sc, 86400)
+                    first_sc = end_sc if len(days) == 0 else \
+                        days.index[0].value // 10 ** 9 - 1
+                    page_end = max(page_end, first_sc)
+                yield df, page_end
+                cursor = page_end
+                continue
+            if self.exchange == 'bitfx':
+                timeframe = BITFX_TIMEFRAMES[self.period]
+                path = f'/candles/trade:{timeframe}:{ticker}/hist'
+                data = self.get_json(path, start=(cursor + 1) * 1000,
+                                     end=end_sc * 1000, limit=page_size,
+                                     sort=1)
+                df = parse_bitfx(data)
+            elif self.exchange == 'kraken':
+                data = self.get_json('/OHLC', pair=ticker,
+                                     interval=self.period // 60, since=cursor)
+                data = data['result'][ticker]
+                df = parse_kraken(data[:-1])
+                if len(data) >= PAGE_SIZES['kraken'] and df.index[0] > \
+                        pd.to_datetime(cursor + self.period, unit='s'):
+                    warnings.warn(f'{ticker}: Kraken serves the latest '
+                                  f'{len(data)} bars, bars after '
+                                  f'{seconds2date(cursor)} before '
+                                  f'{df.index[0]} are not available')
+                    return
+            else:
+                raise NotImplementedError()
+            df = df.loc[(df.index > pd.to_datetime(cursor, unit='s')) &
+                        (df.index <= pd.to_datetime(end_sc, unit='s'))]
+            if len(df) == 0:
+                return
+            cursor = df.index[-1].value // 10 ** 9
+            yield df, cursor
+
+    def get_polo(self, ticker, start_sc, end_sc, period=None):
+        """Poloniex OHLCV in (start_sc, end_sc]"""
+        data = self.get_json('', command='returnChartData',
+                             currencyPair=ticker, start=start_sc + 1,
+                             end=end_sc, period=period or self.period)
+        return parse_polo(data)
+
+    def _backfill(self, ticker, start_sc, end_sc, checkpoint, page_size):
+        num_rows = 0
+        for df, cursor in self.iter_pages(ticker, start_sc, end_sc,
+                                          page_size):
+            with self._store_lock:
+                num_rows += store_bulk(ticker, df, table=self.table,
+                                       url=self.url, verbose=False)
+            checkpoint.set(self.exchange, ticker, cursor)
+        return num_rows
+
+    def backfill(self, tickers, start='1970-01-01 00:00:00', end=None,
+                 checkpoint=None, page_size=None):
+        """Download history page by page, storing each page at once
+
+        The timestamp up to which a ticker is stored is saved in the
+        checkpoint after every page and a later call resumes from it, so
+        an interrupted backfill loses at most a page. Memory use is
+        bounded by the page size regardless of the range.
+
+        Parameters
+        ----------
+        tickers: list(str)
+        start: '%Y-%m-%d %H:%M:%S'
+            Start of tickers without checkpoint
+        end: '%Y-%m-%d %H:%M:%S', optional
+            Now if None
+        checkpoint: str or Checkpoint, optional
+            ``{CHECKPOINT_DIR}/{table}.json`` if None
+        page_size: int, optional
+            The number of bars per request, PAGE_SIZES if None
+
+        Returns
+        -------
+        dict(str, int or Exception): Inserted rows or the error of each
+        ticker
+        """
+        if checkpoint is None:
+            checkpoint = os.path.join(CHECKPOINT_DIR, f'{self.table}.json')
+        if isinstance(checkpoint, str):
+            checkpoint = Checkpoint(checkpoint)
+        end_sc = int(date2seconds(end or get_time_now()))
+        default_sc = int(date2seconds(start))
+        results = dict()
+        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            futures = dict()
+            for ticker in tickers:
+                start_sc = checkpoint.get(self.exchange, ticker)
+                if start_sc is None:
+                    start_sc = default_sc
+                futures[executor.submit(self._backfill, ticker, start_sc,
+                                        end_sc, checkpoint,
+                                        page_size)] = ticker
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    results[ticker] = future.result()
+                except Exception as e:
+                    print(f'{ticker}: {e}')
+                    results[ticker] = e
+        return results
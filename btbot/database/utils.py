@@ -9,13 +9,18 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timezone
 from dateutil import tz
-from copy import deepcopy
 from bs4 import BeautifulSoup
 
 
 # Start date for calculating seconds
 UNIX_START = datetime(1970, 1, 1)
 
+KRAKEN_COLUMNS = ["date", "open", "high", "low", "close",
+                  "vwap", "volume", "count"]
+# Quandl WIKI column names
+stock_columns_map = {"Date": "date", "Open": "open", "High": "high",
+                     "Low": "low", "Close": "close", "Volume": "volume"}
+
 
 def date2daily(str_time):
     x = datetime.strptime(str_time, '%Y-%m-%d %H:%M:%S')
@@ -91,8 +96,8 @@ def get_data(ticker, start, end=None, period=30, exchange="polo"):
         The start point for fetching data
     end: '%Y-%m-%d %H:%M:%S', optional
         The end point for fetching data
-    period: int
-        The frequency of bar (sec)
+    period: int or str
+        The frequency of bar (sec), a timeframe such as '30m' for bitfx
     exchange: str, (default 'polo')
         THe name of exchange to use
 
@@ -113,35 +118,29 @@ def get_data(ticker, start, end=None, period=30, exchange="polo"):
         url = base_url % (ticker, start_sc, end_sc, period)
         df = pd.read_json(url)
     elif exchange == "bitfx":
-        base_url = "https://api.bitfinex.com/v2/candles/trade:%s:%s/hist?start=%d&end=%d"
-        limit = 120
-        period_sc = Time2Seconds[period]
-        step = period_sc * limit
+        # updater imports this module
+        from .updater import (get_json, TokenBucket, RATE_LIMITS,
+                              BITFX_TIMEFRAMES, BITFX_LIMIT)
+        base_url = "https://api.bitfinex.com/v2/candles/trade:%s:%s/hist" \
+            "?start=%d&end=%d&limit=%d"
+        period_sc = {v: k for k, v in BITFX_TIMEFRAMES.items()}[period]
+        step = period_sc * BITFX_LIMIT
+        limiter = TokenBucket(*RATE_LIMITS["bitfx"])
         ends_sc = np.arange(end_sc, start_sc, -step)
         dfs = []
         for _end_sc in tqdm(ends_sc):
             _start_sc = max(start_sc, _end_sc - step)
-            url = base_url % (period, ticker, int(_start_sc * 1000), int(_end_sc * 1000))
-            while True:
-                try:
-                    df = pd.read_json(url)
-                    break
-                except Exception as e:
-                    print(e)
-                    if int(e.status) == 429:
-                        print('hit rate limit, sleeping for a minute...')
-                        sleep(60)
-            if len(df) == 0:
+            url = base_url % (period, ticker, int(_start_sc * 1000),
+                              int(_end_sc * 1000), BITFX_LIMIT)
+            # Rate limited with backoff, RetryError after the retries
+            data = get_json(url, limiter)
+            if len(data) == 0:
                 break
-            else:
-                df = _preprocess_bitfx(df)
-                dfs.append(df)
-                # You can hit ~ 20 time each minute
-                sleep(3)
+            dfs.append(_preprocess_bitfx(data))
         if dfs:
             df = pd.concat(dfs)
         else:
-            df = pd.DataFrame(dfs)
+            df = _preprocess_bitfx([])
     elif exchange == "kraken":
         base_url = "https://api.kraken.com/0/public/OHLC?pair=%s&interval=%d&since=%s"
         url = base_url % (ticker, period, start_sc)
@@ -192,48 +191,54 @@ def get_data(ticker, start, end=None, period=30, exchange="polo"):
             url += "start_date=%s" % end
         res = urlopen(url)
         res = json.loads(res.read())
-        cols = res['dataset_data']['column_names']
-        data = res['dataset_data']['data']
-        data_dict = defaultdict(list)
-        for x in data:
-            for i, col in enumerate(cols):
-                if col in stock_columns_map:
-                    col = stock_columns_map[col]
-                data_dict[col].append(x[i])
-        df = pd.DataFrame(data_dict)
+        df = _preprocess_quandl(res['dataset_data']['column_names'],
+                                res['dataset_data']['data'])
     else:
         raise NotImplementedError()
     return df
 
 
-def _preprocess_bitfx(df):
-    date = [seconds2datetime(x / 1000) for x in df[0].values]
-    df_dict = dict(date=date,
-                   open=df[1].values,
-                   close=df[2].values,
-                   high=df[3].values,
-                   low=df[4].values,
-                   volume=df[5].values)
-    df = pd.DataFrame(df_dict)
+def _preprocess_bitfx(data):
+    """Bitfinex candles [MTS, OPEN, CLOSE, HIGH, LOW, VOLUME] to columns"""
+    values = np.asarray(data, dtype=np.float64).reshape(-1, 6)
+    date = pd.to_datetime(values[:, 0].astype(np.int64), unit='ms')
+    df = pd.DataFrame(dict(date=date.floor('s'),
+                           open=values[:, 1],
+                           close=values[:, 2],
+                           high=values[:, 3],
+                           low=values[:, 4],
+                           volume=values[:, 5]))
     return df
 
 
 def _preprocess_kraken(data):
-    columns = ["date", "open", "high", "low", "close",
-               "vwap", "volume", "count"]
-    new_data = defaultdict(list)
-    data = deepcopy(data)
-    for x in data:
-        for i, col in enumerate(columns):
-            if i == 0:
-                x[i] = seconds2datetime(x[i])
-            else:
-                x[i] = float(x[i])
-            new_data[col].append(x[i])
-    df = pd.DataFrame(new_data)
+    """Kraken OHLC [time, open, high, low, close, vwap, volume, count]
+
+    Prices and volumes are strings in the response, they are cast to
+    float column by column.
+    """
+    values = np.array(data, dtype=object).reshape(-1, len(KRAKEN_COLUMNS))
+    df = pd.DataFrame(values[:, 1:].astype(np.float64),
+                      columns=KRAKEN_COLUMNS[1:])
+    df.insert(0, 'date',
+              pd.to_datetime(values[:, 0].astype(np.int64), unit='s'))
     return df
 
 
+def _preprocess_quandl(columns, data):
+    """Quandl dataset rows to columns, the date column is parsed"""
+    columns = [stock_columns_map.get(col, col) for col in columns]
+    values = np.array(data, dtype=object).reshape(-1, len(columns))
+    df_dict = dict()
+    for i, col in enumerate(columns):
+        if col == 'date':
+            df_dict[col] = pd.to_datetime(values[:, i].astype(str))
+        else:
+            # None of missing values becomes NaN
+            df_dict[col] = values[:, i].astype(np.float64)
+    return pd.DataFrame(df_dict, columns=columns)
+
+
 def get_symbols(exchange="polo", APIKEY=None):
     """Get symbols traded on each exchange
 
@@ -0,0 +1,175 @@
+import os
+import numbers
+
+import numpy as np
+import backtrader as bt
+
+from .analyzers import ResultRecorder
+from .plotting import num2datetime64
+
+
+TABLES = ('equity', 'positions', 'orders', 'trades', 'analyzers')
+# Columns holding backtrader float dates
+DATE_COLUMNS = ('datetime', 'created', 'executed', 'dtopen', 'dtclose')
+
+
+def _has_parquet():
+    try:
+        import pyarrow
+    except ImportError:
+        return False
+    return True
+
+
+def _import_parquet():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError('pyarrow is required for parquet files, '
+                          "install it or use fmt='npz'") from e
+    return pa, pq
+
+
+def _to_datetime(nums):
+    nums = np.asarray(nums, dtype=float)
+    is_nan = np.isnan(nums)
+    dates = num2datetime64(np.where(is_nan, 0.0, nums))
+    dates[is_nan] = np.datetime64('NaT')
+    return dates
+
+
+def _to_columns(table):
+    columns = dict()
+    for name, values in table.items():
+        if name in DATE_COLUMNS:
+            columns[name] = _to_datetime(values)
+        elif len(values) > 0 and isinstance(values[0], str):
+            columns[name] = np.array(values, dtype=str)
+        else:
+            columns[name] = np.array(values)
+    return columns
+
+
+def flatten_analysis(analysis, prefix=''):
+    """Flatten nested analysis into scalar values
+
+    Only string keys and numeric, boolean or None values are kept, so
+    per-period returns keyed by dates are dropped.
+
+    Returns
+    -------
+    dict(str, float)
+    """
+    values = dict()
+    for key, value in analysis.items():
+        if not isinstance(key, str) or key.startswith('_'):
+            continue
+        name = f'{prefix}{key}'
+        if hasattr(value, 'items'):
+            values.update(flatten_analysis(value, name + '.'))
+        elif value is None:
+            values[name] = np.nan
+        elif isinstance(value, (numbers.Number, np.number)):
+            values[name] = float(value)
+    return values
+
+
+def get_columns(strategy):
+    """Columns of a finished strategy
+
+    Equity, positions, orders and trades are taken from ResultRecorder,
+    which has to be added to Cerebro, e.g.,
+    ``get_cerebro(analyzers=['drawdown', 'sharpe', 'recorder'])``.
+    Analyzer summaries are a single row with one column per value.
+
+    Returns
+    -------
+    dict(str, dict(str, np.ndarray)): Columns by table
+    """
+    recorder = None
+    summary = dict()
+    for name, analyzer in strategy.analyzers.getitems():
+        if isinstance(analyzer, ResultRecorder):
+            recorder = analyzer
+            continue
+        if isinstance(analyzer, bt.analyzers.PyFolio):
+            continue
+        analysis = flatten_analysis(analyzer.get_analysis(), name + '.')
+        summary.update({key: np.array([value])
+                        for key, value in analysis.items()})
+    if recorder is None:
+        raise ValueError('ResultRecorder is not added to Cerebro')
+    return dict(equity=_to_columns(recorder.equity),
+                positions=_to_columns(recorder.positions),
+                orders=_to_columns(recorder.orders),
+                trades=_to_columns(recorder.trades),
+                analyzers=summary)
+
+
+def export_results(strategy, path, fmt=None):
+    """Write the columns of a finished strategy
+
+    Parameters
+    ----------
+    strategy: bt.Strategy
+    path: str
+        A '.npz' file, or a directory with a parquet file per table
+    fmt: str, optional
+        'npz' or 'parquet'. Parquet if pyarrow is available, otherwise npz
+
+    Returns
+    -------
+    str: Written path
+    """
+    if fmt is None:
+        fmt = 'parquet' if _has_parquet() else 'npz'
+    tables = get_columns(strategy)
+    if fmt == 'npz':
+        if not path.endswith('.npz'):
+            path += '.npz'
+        arrays = {f'{table}/{name}': values
+                  for table, columns in tables.items()
+                  for name, values in columns.items()}
+        # Uncompressed, so each column is read on its own
+        np.savez(path, **arrays)
+    elif fmt == 'parquet':
+        pa, pq = _import_parquet()
+        os.makedirs(path, exist_ok=True)
+        for table, columns in tables.items():
+            pq.write_table(pa.table(columns),
+                           os.path.join(path, f'{table}.parquet'))
+    else:
+        raise ValueError(f'Invalid format: {fmt}')
+    return path
+
+
+def load_columns(path, table, columns=None):
+    """Read columns of a table written by ``export_results``
+
+    Only the requested columns are read from the file.
+
+    Parameters
+    ----------
+    path: str
+    table: str
+        One of TABLES
+    columns: list(str), optional
+        All columns if None
+
+    Returns
+    -------
+    dict(str, np.ndarray)
+    """
+    if path.endswith('.npz'):
+        with np.load(path) as npz:
+            prefix = f'{table}/'
+            names = [key[len(prefix):] for key in npz.files
+                     if key.startswith(prefix)]
+            if columns is not None:
+                names = [name for name in names if name in columns]
+            return {name: npz[prefix + name] for name in names}
+    _, pq = _import_parquet()
+    data = pq.read_table(os.path.join(path, f'{table}.parquet'),
+                         columns=columns)
+    return {name: data.column(name).to_numpy() for name in data.column_names}
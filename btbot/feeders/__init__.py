@@ -1 +1 @@
-from .price_volume import PriceVolumeFeeder
\ No newline at end of file
+from .price_volume import PriceVolumeFeeder, price_volume_features
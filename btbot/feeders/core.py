@@ -6,6 +6,13 @@ class BaseFeeder(ABC):
     def get_feed(self, idx=0):
         """Implement the method to get feed at idx"""
 
+    def get_feeds(self):
+        """Feeds of all bars as 2D array, nan rows where there is no feed
+
+        Only available when the whole history is loaded
+        """
+        raise NotImplementedError()
+
     @property
     def current_feed(self):
         return self.get_feed(0)
\ No newline at end of file
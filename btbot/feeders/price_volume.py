@@ -1,8 +1,35 @@
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 from .core import BaseFeeder
 
 
+def price_volume_features(close, volume, period):
+    """Vectorized PriceVolumeFeeder feeds of every bar
+
+    Parameters
+    ----------
+    close, volume: array-like
+        Price and volume history
+    period: int
+        The number of bars in each feed
+
+    Returns
+    -------
+    np.ndarray: (len(close), 2 * period), nan for bars without full window
+    """
+    close = np.asarray(close, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    features = np.full((len(close), 2 * period), np.nan)
+    if len(close) < period:
+        return features
+    features[period - 1:, :period] = \
+        sliding_window_view(close, period) / close[period - 1:, None]
+    features[period - 1:, period:] = \
+        sliding_window_view(volume, period) / volume[period - 1:, None]
+    return features
+
+
 class PriceVolumeFeeder(BaseFeeder):
     def __init__(self, price, period):
         self.price = price
@@ -19,4 +46,10 @@ class PriceVolumeFeeder(BaseFeeder):
         if len(features) == 0:
             return None
         else:
-            return np.hstack(features)
\ No newline at end of file
+            return np.hstack(features)
+
+    def get_feeds(self):
+        num_bars = self.price.buflen()
+        return price_volume_features(self.price.close.array[:num_bars],
+                                     self.price.volume.array[:num_bars],
+                                     self.period)
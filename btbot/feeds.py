@@ -0,0 +1,145 @@
+import os
+from array import array
+
+import numpy as np
+import backtrader as bt
+
+
+# backtrader float date of 1970-01-01
+EPOCH_NUM = 719163.
+NS_PER_DAY = 86400e9
+
+
+def to_num(dates):
+    """Dates to backtrader float days
+
+    Parameters
+    ----------
+    dates: np.ndarray
+        datetime64, int64 nanoseconds or float days, which are returned
+        without copy
+    """
+    dates = np.asarray(dates)
+    if dates.dtype.kind == 'f':
+        return dates
+    if dates.dtype.kind == 'M':
+        dates = dates.astype('datetime64[ns]').view(np.int64)
+    return dates / NS_PER_DAY + EPOCH_NUM
+
+
+def read_columns(dirname):
+    """Memory-mapped columns of a directory
+
+    Each column is ``{name}.npy`` or a raw file ``{name}`` as written by
+    database.OHLCVCache, int64 nanoseconds for date and float64 otherwise.
+
+    Returns
+    -------
+    dict(str, np.ndarray)
+    """
+    columns = dict()
+    for filename in os.listdir(dirname):
+        path = os.path.join(dirname, filename)
+        name, ext = os.path.splitext(filename)
+        if ext == '.npy':
+            columns[name] = np.load(path, mmap_mode='r')
+        elif ext == '' and os.path.getsize(path) > 0:
+            dtype = np.int64 if name == 'date' else np.float64
+            columns[name] = np.memmap(path, mode='r', dtype=dtype)
+    return columns
+
+
+def _to_array(values, tail=()):
+    """Copy a column into an array('d') of a line with a single memcpy"""
+    line_array = array('d')
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    line_array.frombytes(memoryview(values).cast('B'))
+    line_array.extend(tail)
+    return line_array
+
+
+class NumpyData(bt.feed.DataBase):
+    """Data feed of OHLCV columns in numpy arrays
+
+    Columns are loaded into lines at once in ``preload``. By default lines
+    reference the arrays without copy, so memory-mapped columns are read
+    from disk on demand and a long history loads in near-constant memory.
+    With ``copy=True`` each column is copied with a single memcpy into the
+    line, which is faster to access in ``next``. Bars are loaded one by one
+    when preload is off, e.g., with exactbars.
+
+    Parameters
+    ----------
+    dataname: dict(str, np.ndarray) or str
+        Columns by name or a directory read with ``read_columns``. Dates
+        are ``datetime`` or ``date`` as datetime64, int64 nanoseconds or
+        backtrader float days and sorted. Missing lines are nan
+    copy: bool, (default False)
+        Copy columns into lines in ``preload``
+    """
+    params = (('copy', False),)
+
+    def start(self):
+        super(NumpyData, self).start()
+        columns = self.p.dataname
+        if isinstance(columns, str):
+            columns = read_columns(columns)
+        dates = to_num(columns.get('datetime', columns.get('date')))
+        self._columns = dict(datetime=dates)
+        for alias in self.getlinealiases():
+            if alias == 'datetime':
+                continue
+            if alias in columns:
+                self._columns[alias] = np.asarray(columns[alias],
+                                                  dtype=np.float64)
+            else:
+                # Zero-stride view, no memory for missing lines
+                self._columns[alias] = np.broadcast_to(np.nan, dates.shape)
+        self._idx = 0
+        self._is_preloaded = False
+        self._is_copied = True
+
+    def _copy_lines(self):
+        for alias in self._columns:
+            line = getattr(self.lines, alias)
+            line.array = _to_array(line.array)
+        self._is_copied = True
+
+    def preload(self):
+        # fromdate and todate are known once started
+        dates = self._columns['datetime']
+        lo = np.searchsorted(dates, self.fromdate, side='left')
+        hi = np.searchsorted(dates, self.todate, side='right')
+        extension = self.lines.datetime.extension
+        for alias, values in self._columns.items():
+            line = getattr(self.lines, alias)
+            values = values[lo:hi]
+            if self.p.copy or extension > 0:
+                # Lookahead positions stay after the copied values
+                values = _to_array(values, line.array)
+            line.array = values
+        self._is_copied = self.p.copy or extension > 0
+        self._is_preloaded = True
+        self._last()
+        self.home()
+
+    def advance(self, size=1, datamaster=None, ticks=True):
+        # Datas shorter than the master are padded past their end
+        if not self._is_copied and len(self) + size > self.buflen():
+            self._copy_lines()
+        super(NumpyData, self).advance(size=size, datamaster=datamaster,
+                                       ticks=ticks)
+
+    def load(self):
+        # All bars are in lines, appending a bar to check it is not needed
+        if self._is_preloaded:
+            return False
+        return super(NumpyData, self).load()
+
+    def _load(self):
+        if self._idx >= len(self._columns['datetime']):
+            return False
+        for alias, values in self._columns.items():
+            getattr(self.lines, alias)[0] = float(values[self._idx])
+        self._idx += 1
+        return True
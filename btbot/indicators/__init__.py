@@ -1 +1 @@
-from .vol import EMAVolatility
\ No newline at end of file
+from .vol import EMAVolatility, ema_volatility
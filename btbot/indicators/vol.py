@@ -1,17 +1,104 @@
-import pandas as pd
+from array import array
+
+import numpy as np
 import backtrader as bt
 
 
+def _ewm_weights(period):
+    """Weights of ``ewm(span=period - 1)`` over a window of returns
+
+    The first element is the weight of the most recent return.
+    """
+    num_ret = period - 1
+    decay = 1. - 2. / (num_ret + 1.)
+    return decay ** np.arange(num_ret)
+
+
+def _ewm_std(sum_x, sum_xx, weights):
+    """Bias corrected weighted std as computed by ``pd.Series.ewm().std()``"""
+    sum_w = weights.sum()
+    denom = sum_w ** 2 - (weights ** 2).sum()
+    if denom <= 0:
+        return np.full(np.shape(sum_x), np.nan)
+    mean = sum_x / sum_w
+    var = (sum_xx / sum_w - mean ** 2) * sum_w ** 2 / denom
+    return np.sqrt(np.maximum(var, 0.))
+
+
+def ema_volatility(close, period=100, scale=1):
+    """Vectorized EMAVolatility over a whole price history
+
+    Parameters
+    ----------
+    close: array-like
+        Price history
+    period: int, (default 100)
+        The number of prices in the rolling window
+    scale: float, (default 1)
+        Scale applied to returns
+
+    Returns
+    -------
+    np.ndarray: volatility at each bar, 0 until the first full window and
+        everywhere when period < 2 as windows hold no returns
+    """
+    close = np.asarray(close, dtype=float)
+    vol = np.zeros(len(close))
+    if len(close) < period or period < 2:
+        return vol
+    ret = (close[1:] / close[:-1] - 1.) * scale
+    weights = _ewm_weights(period)
+    sum_x = np.convolve(ret, weights, mode='valid')
+    sum_xx = np.convolve(ret ** 2, weights, mode='valid')
+    vol[period - 1:] = _ewm_std(sum_x, sum_xx, weights)
+    return vol
+
+
 class EMAVolatility(bt.Indicator):
+    """Exponentially weighted volatility of returns
+
+    At each bar this is the last value of
+    ``pd.Series(prices).pct_change().ewm(span=period - 1).std()`` over the
+    latest ``period`` prices. Weighted sums are updated recursively in
+    ``next`` and computed with a single convolution in ``once``. ``vol``
+    is 0 until ``period`` prices are available, and always 0 with a
+    ``period`` below 2.
+    """
     lines = ('vol',)
     params = (('period', 100),
               ('scale', 1))
 
+    def __init__(self):
+        self._weights = _ewm_weights(self.p.period)
+        self._decay = self._weights[1] if len(self._weights) > 1 else 0.
+        # Weight of the return leaving the window, no returns below period 2
+        if len(self._weights) > 0:
+            self._tail = self._weights[-1] * self._decay
+        else:
+            self._tail = 0.
+        self._sum_x = 0.
+        self._sum_xx = 0.
+
+    def _ret(self, ago):
+        return (self.data[ago] / self.data[ago - 1] - 1.) * self.p.scale
+
     def next(self):
-        data = pd.Series(self.data.get(size=self.p.period))
-        ret = data.pct_change().dropna() * self.p.scale
-        vol = ret.ewm(span=self.p.period - 1).std().values
-        if len(vol) == 0:
+        num_bars = len(self.data)
+        if num_bars >= 2:
+            ret = self._ret(0)
+            self._sum_x = self._decay * self._sum_x + ret
+            self._sum_xx = self._decay * self._sum_xx + ret ** 2
+            if num_bars > self.p.period:
+                old_ret = self._ret(1 - self.p.period)
+                self._sum_x -= self._tail * old_ret
+                self._sum_xx -= self._tail * old_ret ** 2
+        if num_bars < self.p.period or self.p.period < 2:
             self.lines.vol[0] = 0
         else:
-            self.lines.vol[0] = vol[-1]
\ No newline at end of file
+            self.lines.vol[0] = float(
+                _ewm_std(self._sum_x, self._sum_xx, self._weights))
+
+    def once(self, start, end):
+        close = np.asarray(self.data.array[:end])
+        vol = ema_volatility(close, period=self.p.period, scale=self.p.scale)
+        self.lines.vol.array[start:end] = array('d', vol[start:end])
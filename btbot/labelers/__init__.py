@@ -1 +1,2 @@
-from .sltp import SLTPLabeler
\ No newline at end of file
+from .sltp import (SLTPLabeler, triple_barrier_labels, triple_barrier_grid,
+                   sltp_label_grid)
@@ -1,5 +1,6 @@
 from abc import abstractmethod
 
+import numpy as np
 import backtrader as bt
 
 
@@ -32,6 +33,36 @@ class BaseLabeler(bt.Indicator):
         else:
             return int(self.lines.side[i])
 
+    def get_arrays(self, size):
+        """Get label, time_diff and side of the latest bars
+
+        Parameters
+        ----------
+        size: int
+            The number of the latest bars, clipped to the processed bars
+
+        Returns
+        -------
+        label, time_diff: np.ndarray
+            Values from the oldest to the latest bar
+        side: np.ndarray or None
+            None if there is no sider
+        """
+        size = min(size, len(self))
+        label = self._get_array(self.lines.label, size)
+        time_diff = self._get_array(self.lines.time_diff, size)
+        if self.p.sider is None:
+            side = None
+        else:
+            side = self._get_array(self.lines.side, size)
+        return label, time_diff, side
+
+    @staticmethod
+    def _get_array(line, size):
+        if size <= 0:
+            return np.empty(0)
+        return np.asarray(line.get(size=size), dtype=float)
+
     @property
     def is_metalabeling(self):
         if self.p.sider is None:
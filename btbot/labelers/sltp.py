@@ -1,9 +1,151 @@
-from ..indicators import EMAVolatility
+from array import array
+from collections import deque
+
+import numpy as np
+
+from ..indicators import EMAVolatility, ema_volatility
 from ..constants import LONG, SHORT, HOLD, NONE
 from ..utils import get_data_by_name
 from .core import BaseLabeler
 
 
+def triple_barrier_labels(close, vol, horizon=10, stls=1, tkpf=1, side=None):
+    """Label every bar with stop loss, take profit and horizontal barriers
+
+    Offline counterpart of ``SLTPLabeler.next``. Barriers are checked for
+    all open events at once, one future offset at a time.
+
+    Parameters
+    ----------
+    close: array-like
+        Price history
+    vol: array-like
+        Volatility at each bar, used to scale the barriers
+    horizon: int, (default 10)
+        Horizontal threshold for labeling
+    stls, tkpf: float, (default 1)
+        Stop Loss and Take Profit scale. Non-positive values disable
+        the barrier
+    side: array-like, optional
+        Side at each bar for metalabeling
+
+    Returns
+    -------
+    label: np.ndarray
+        Label of each bar, NONE if not resolved within the history
+    time_diff: np.ndarray
+        The number of bars until the label is resolved, nan if not resolved
+    """
+    label, time_diff = triple_barrier_grid(close, vol, [(stls, tkpf, horizon)],
+                                           side=side)
+    return label[0].astype(float), time_diff[0].astype(float)
+
+
+def triple_barrier_grid(close, vol, grid, side=None, chunk_size=2 ** 22):
+    """Triple barrier labels for several barrier parameters in one pass
+
+    Price moves are computed once per future offset and shared by the grid
+    points of a chunk.
+
+    Parameters
+    ----------
+    close: array-like
+        Price history
+    vol: array-like
+        Volatility at each bar, used to scale the barriers
+    grid: list of tuple
+        (stls, tkpf, horizon) for each grid point
+    side: array-like, optional
+        Side at each bar for metalabeling
+    chunk_size: int, (default 2 ** 22)
+        Maximum number of (grid point, bar) pairs labeled at once. Grid
+        points are processed in chunks of ``chunk_size // len(close)``,
+        at least one, which bounds the memory of the pair indices
+
+    Returns
+    -------
+    label: np.ndarray, (len(grid), len(close))
+        Labels as int16, NONE if not resolved within the history
+    time_diff: np.ndarray, (len(grid), len(close))
+        The number of bars until the label is resolved as float32, nan if
+        not resolved
+    """
+    close = np.asarray(close, dtype=float)
+    vol = np.asarray(vol, dtype=float)
+    num_bars = len(close)
+    label = np.full((len(grid), num_bars), NONE, dtype=np.int16)
+    time_diff = np.full((len(grid), num_bars), np.nan, dtype=np.float32)
+    if len(grid) == 0 or num_bars == 0:
+        return label, time_diff
+    stls, tkpf, horizon = (np.array(x) for x in zip(*grid))
+    stls = stls.astype(float)
+    tkpf = tkpf.astype(float)
+    horizon = horizon.astype(int)
+    if side is not None:
+        side = np.asarray(side, dtype=float)
+    num_grid = max(1, chunk_size // num_bars)
+    for lo in range(0, len(grid), num_grid):
+        hi = lo + num_grid
+        _label_chunk(close, vol, stls[lo:hi], tkpf[lo:hi], horizon[lo:hi],
+                     side, label[lo:hi], time_diff[lo:hi])
+    return label, time_diff
+
+
+def _label_chunk(close, vol, stls, tkpf, horizon, side, label, time_diff):
+    """Fill label and time_diff of a chunk of grid points in place"""
+    num_bars = len(close)
+    stls_label = 0 if side is not None else -1
+    # Unresolved pairs of grid point and event
+    grid_idx, idx = np.divmod(
+        np.arange(len(stls) * num_bars, dtype=np.int32), np.int32(num_bars))
+    for i in range(1, min(horizon.max(), num_bars - 1) + 1):
+        # Events without future bars can not be resolved any more
+        is_open = idx < num_bars - i
+        grid_idx, idx = grid_idx[is_open], idx[is_open]
+        diff = (close[i:] - close[:-i]) / close[:-i]
+        diff = diff[idx]
+        upper = vol[idx] * tkpf[grid_idx]
+        lower = -vol[idx] * stls[grid_idx]
+        if side is not None:
+            diff *= side[idx]
+            upper *= side[idx]
+            lower *= side[idx]
+        is_tkpf = (tkpf[grid_idx] > 0) & (diff > upper)
+        is_stls = ~is_tkpf & (stls[grid_idx] > 0) & (diff < lower)
+        is_done = is_tkpf | is_stls | (horizon[grid_idx] == i)
+        label[grid_idx[is_done], idx[is_done]] = 0
+        label[grid_idx[is_tkpf], idx[is_tkpf]] = 1
+        label[grid_idx[is_stls], idx[is_stls]] = stls_label
+        time_diff[grid_idx[is_done], idx[is_done]] = i
+        grid_idx, idx = grid_idx[~is_done], idx[~is_done]
+
+
+def sltp_label_grid(close, grid, period=10, side=None):
+    """Label a price history for a grid of SLTPLabeler parameters
+
+    Volatility is computed once as in ``SLTPLabeler`` and shared by all
+    grid points.
+
+    Parameters
+    ----------
+    close: array-like
+        Price history
+    grid: list of tuple
+        (stls, tkpf, horizon) for each grid point
+    period: int, (default 10)
+        Period to take average for estimating volatility
+    side: array-like, optional
+        Side at each bar for metalabeling
+
+    Returns
+    -------
+    label, time_diff: np.ndarray, (len(grid), len(close))
+        See ``triple_barrier_grid``
+    """
+    vol = ema_volatility(close, period=period)
+    return triple_barrier_grid(close, vol, grid, side=side)
+
+
 class SLTPLabeler(BaseLabeler):
     """Abstract class for labeler
 
@@ -43,40 +185,78 @@ class SLTPLabeler(BaseLabeler):
         self.price = get_data_by_name(self, 'price')
         self.lines.vol = EMAVolatility(self.price,
                                        period=self.p.period)
+        # Unresolved events in the order of their bars
+        self._events = deque()
 
     def next(self):
         self.lines.label[0] = NONE
         self.lines.stop_loss[0] = self.p.stls * self.vol[0]
         self.lines.take_profit[0] = self.p.tkpf * self.vol[0]
-        for i in range(1, self.p.horizon + 1):
-            idx = -i
-            if self.lines.label[idx] == NONE:
-                diff = (self.price[0] - self.price[idx]) / self.price[idx]
-                if self.p.tkpf > 0:
-                    tkpf = self.vol[idx] * self.p.tkpf
-                else:
-                    tkpf = None
-                if self.p.stls > 0:
-                    stls = -self.vol[idx] * self.p.stls
-                else:
-                    stls = None
-                # Set threashold depending on the side
-                if self.is_metalabeling:
-                    side = self.lines.side[idx]
-                    diff *= side
-                    if tkpf is not None:
-                        tkpf *= side
-                    if stls is not None:
-                        stls *= side
-                if tkpf is not None and diff > tkpf:
-                    self.lines.label[idx] = self.tkpf_label
-                    self.lines.time_diff[idx] = i
-                elif stls is not None and diff < stls:
-                    self.lines.label[idx] = self.stls_label
-                    self.lines.time_diff[idx] = i
-                elif i == self.p.horizon:
-                    self.lines.label[idx] = self.hold_label
-                    self.lines.time_diff[idx] = i
+        num_bars = len(self)
+        # Check only events whose barriers have not been touched yet
+        for _ in range(len(self._events)):
+            event = self._events.popleft()
+            bar, price, tkpf, stls, side = event
+            i = num_bars - bar
+            diff = (self.price[0] - price) / price
+            if side is not None:
+                diff *= side
+            if tkpf is not None and diff > tkpf:
+                self.lines.label[-i] = self.tkpf_label
+            elif stls is not None and diff < stls:
+                self.lines.label[-i] = self.stls_label
+            elif i == self.p.horizon:
+                self.lines.label[-i] = self.hold_label
+            else:
+                self._events.append(event)
+                continue
+            self.lines.time_diff[-i] = i
+        if self.p.horizon > 0:
+            self._events.append(self._new_event(num_bars))
+
+    def _new_event(self, bar):
+        """Fix barriers of the current bar for the following bars"""
+        if self.p.tkpf > 0:
+            tkpf = self.vol[0] * self.p.tkpf
+        else:
+            tkpf = None
+        if self.p.stls > 0:
+            stls = -self.vol[0] * self.p.stls
+        else:
+            stls = None
+        # Set threashold depending on the side
+        if self.is_metalabeling:
+            side = self.lines.side[0]
+            if tkpf is not None:
+                tkpf *= side
+            if stls is not None:
+                stls *= side
+        else:
+            side = None
+        return bar, self.price[0], tkpf, stls, side
+
+    def oncestart(self, start, end):
+        self.once(start, end)
+
+    def once(self, start, end):
+        # Bars in [start, end) only need prices up to horizon bars ahead
+        stop = min(end + self.p.horizon, self.buflen())
+        vol = np.asarray(self.vol.array[start:stop])
+        if self.is_metalabeling:
+            side = np.asarray(self.side.array[start:stop])
+        else:
+            side = None
+        label, time_diff = triple_barrier_labels(
+            self.price.array[start:stop], vol, horizon=self.p.horizon,
+            stls=self.p.stls, tkpf=self.p.tkpf, side=side)
+        num_bars = end - start
+        self.lines.label.array[start:end] = array('d', label[:num_bars])
+        self.lines.time_diff.array[start:end] = array(
+            'd', time_diff[:num_bars])
+        self.lines.stop_loss.array[start:end] = array(
+            'd', self.p.stls * vol[:num_bars])
+        self.lines.take_profit.array[start:end] = array(
+            'd', self.p.tkpf * vol[:num_bars])
 
     def get_label(self, idx=0, side=None):
         label = self.lines.label[idx]
@@ -89,6 +269,48 @@ class SLTPLabeler(BaseLabeler):
         else:
             return None
 
+    def get_labels(self, size, side=None, resolved_within=None):
+        """Vectorized ``get_label`` over the latest bars
+
+        Parameters
+        ----------
+        size: int
+            The number of the latest bars
+        side: int, optional
+            Side to match for metalabeling
+        resolved_within: int, optional
+            Keep only labels resolved within the latest bars
+
+        Returns
+        -------
+        label: np.ndarray
+            Labels from the oldest to the latest bar
+        is_valid: np.ndarray
+            Whether ``get_label`` would return the label
+        """
+        label, time_diff, sides = self.get_arrays(size)
+        is_valid = self._is_resolved(label, time_diff, resolved_within)
+        if self.is_metalabeling:
+            if side is None:
+                is_valid[:] = False
+            else:
+                is_valid &= sides == side
+        return label, is_valid
+
+    def count_resolved(self, num_bars):
+        """The number of labels resolved within the latest ``num_bars`` bars"""
+        label, time_diff, _ = self.get_arrays(num_bars + self.p.horizon)
+        return np.count_nonzero(
+            self._is_resolved(label, time_diff, num_bars))
+
+    @staticmethod
+    def _is_resolved(label, time_diff, resolved_within=None):
+        age = np.arange(len(label))[::-1]
+        is_resolved = (label != NONE) & (time_diff <= age)
+        if resolved_within is not None:
+            is_resolved &= age - time_diff < resolved_within
+        return is_resolved
+
     @property
     def current_take_profit(self):
         return self.take_profit[0]
@@ -0,0 +1,194 @@
+import datetime
+
+import numpy as np
+import backtrader as bt
+from backtrader.metabase import AutoInfoClass
+
+
+# backtrader's float date of 1970-01-01
+EPOCH_NUM = bt.date2num(datetime.datetime(1970, 1, 1))
+
+
+def minmax_decimate(x, y, num_bins):
+    """Downsample a line keeping the minimum and maximum of each bin
+
+    Parameters
+    ----------
+    x, y: np.ndarray
+        Coordinates of the line
+    num_bins: int
+        The number of bins, e.g., the width of the plot in pixels
+
+    Returns
+    -------
+    x, y: np.ndarray
+        At most ``2 * num_bins`` points in the original order. NaN are
+        ignored unless a whole bin is NaN
+    """
+    num_data = len(y)
+    if num_data <= 2 * num_bins:
+        return x, y
+    bin_size = -(-num_data // num_bins)
+    num_bins = -(-num_data // bin_size)
+    pad = np.full(num_bins * bin_size - num_data, np.nan)
+    values = np.concatenate([y, pad]).reshape(num_bins, bin_size)
+    is_nan = np.isnan(values)
+    idx_min = np.where(is_nan, np.inf, values).argmin(axis=1)
+    idx_max = np.where(is_nan, -np.inf, values).argmax(axis=1)
+    idx = np.sort(np.stack([idx_min, idx_max], axis=1), axis=1)
+    idx = (idx + bin_size * np.arange(num_bins)[:, None]).ravel()
+    return x[idx], y[idx]
+
+
+def num2datetime64(num):
+    """Convert backtrader float dates to datetime64
+
+    Float dates are precise to about 10 microseconds, so they are rounded
+    to milliseconds
+    """
+    millis = np.round((np.asarray(num) - EPOCH_NUM) * 86400e3)
+    return millis.astype('int64').astype('datetime64[ms]')
+
+
+def _get_line_plotinfo(obj, idx):
+    alias = obj.lines._getlinealias(idx)
+    plotinfo = getattr(obj.plotlines, '_%d' % idx, None)
+    if not plotinfo:
+        plotinfo = getattr(obj.plotlines, alias, None)
+    if not plotinfo:
+        plotinfo = AutoInfoClass()
+    return alias, plotinfo
+
+
+def _is_data(obj, strategy):
+    # Lines objects overload ==, so compare identities
+    return any(obj is data for data in strategy.datas)
+
+
+def _get_owner(obj, strategy):
+    owner = getattr(obj._clock, 'owner', obj._clock)
+    while owner is not strategy and not _is_data(owner, strategy):
+        owner = getattr(owner, '_clock', strategy)
+    if owner is strategy:
+        owner = strategy.data
+    return owner
+
+
+def get_panels(strategy):
+    """Sort what backtrader would plot into panels
+
+    Returns
+    -------
+    list((obj, list(obj))): Objects with their own axis and objects plotted
+    over it. Observers with subplots come first, then each data followed
+    by its indicators with subplots
+    """
+    panels = []
+    overs = {data: [] for data in strategy.datas}
+    subs = {data: [] for data in strategy.datas}
+    for obs in strategy.getobservers():
+        if not obs.plotinfo.plot or obs.plotinfo.plotskip:
+            continue
+        if obs.plotinfo.subplot:
+            panels.append((obs, []))
+        else:
+            overs[_get_owner(obs, strategy)].append(obs)
+    for ind in strategy.getindicators():
+        if not hasattr(ind, 'plotinfo'):
+            continue
+        if not ind.plotinfo.plot or ind.plotinfo.plotskip:
+            continue
+        owner = _get_owner(ind, strategy)
+        if ind.plotinfo.subplot:
+            subs[owner].append(ind)
+        else:
+            overs[owner].append(ind)
+    for data in strategy.datas:
+        if not data.plotinfo.plot:
+            continue
+        panels.append((data, overs[data]))
+        panels.extend((ind, []) for ind in subs[data])
+    return panels
+
+
+def _get_window(dates, start, end):
+    lo, hi = 0, len(dates)
+    if isinstance(start, int):
+        lo = start
+    elif start is not None:
+        lo = np.searchsorted(dates, bt.date2num(start), side='left')
+    if isinstance(end, int):
+        hi = end
+    elif end is not None:
+        hi = np.searchsorted(dates, bt.date2num(end), side='right')
+    return lo, hi
+
+
+def _plot_lines(ax, obj, dates, start, end, num_bins, is_data=False):
+    lo, hi = _get_window(dates, start, end)
+    if is_data:
+        # Close price only
+        items = [(obj._name or 'data', obj.lines.close, dict())]
+    else:
+        items = []
+        label = obj.plotlabel()
+        for idx in range(obj.size()):
+            alias, plotinfo = _get_line_plotinfo(obj, idx)
+            if plotinfo._get('_plotskip', False):
+                continue
+            name = plotinfo._get('_name', '') or alias
+            items.append((f'{label} {name}', obj.lines[idx],
+                          plotinfo._getkwargs(skip_=True)))
+    for label, line, kwargs in items:
+        num_data = min(len(line.array), len(dates))
+        x = dates[lo:min(hi, num_data)]
+        y = np.asarray(line.array[lo:min(hi, num_data)], dtype=float)
+        x, y = minmax_decimate(x, y, num_bins)
+        ax.plot(num2datetime64(x), y, label=label, **kwargs)
+
+
+def plot_strategy(strategy, path, start=None, end=None, width=16, height=9,
+                  dpi=100):
+    """Render a strategy to a file with decimated lines
+
+    The figure is drawn with the Agg canvas, so neither a GUI nor pyplot
+    state is involved. Only the date window is read from the line buffers
+    and every line is reduced to two points per pixel.
+
+    Parameters
+    ----------
+    strategy: bt.Strategy
+        Strategy after the run
+    path: str
+        Output file. The format is inferred from the extension
+    start, end: datetime.date or int, optional
+        The date window, or indices of the datetime line
+    width, height: float
+        Figure size in inches
+    dpi: int, (default 100)
+
+    Returns
+    -------
+    matplotlib.figure.Figure
+    """
+    from matplotlib.figure import Figure
+
+    panels = get_panels(strategy)
+    ratios = [3 if _is_data(obj, strategy) else 1 for obj, _ in panels]
+    fig = Figure(figsize=(width, height), dpi=dpi)
+    axes = fig.subplots(len(panels), 1, sharex=True, squeeze=False,
+                        gridspec_kw=dict(height_ratios=ratios))[:, 0]
+    num_bins = int(width * dpi)
+    for ax, (obj, overs) in zip(axes, panels):
+        is_data = _is_data(obj, strategy)
+        if is_data:
+            dates = np.asarray(obj.datetime.array)
+        else:
+            dates = np.asarray(_get_owner(obj, strategy).datetime.array)
+        _plot_lines(ax, obj, dates, start, end, num_bins, is_data)
+        for over in overs:
+            _plot_lines(ax, over, dates, start, end, num_bins)
+        ax.grid(True)
+        ax.legend(loc='upper left', fontsize='small')
+    fig.savefig(path, dpi=dpi)
+    return fig
@@ -1,4 +1,5 @@
 from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 import backtrader as bt
 import numpy as np
@@ -15,6 +16,14 @@ class BaseStrategy(bt.Strategy):
     predict(): Return list of orders
     observe(): Optional, store observed data to update models
     process(): Optional, Process observed data before training
+    should_fit(): Optional, Decide whether to train at the current bar
+
+    ``fit`` can hand the training to ``submit_fit``. If the strategy has
+    ``fit_executor`` param set to 'thread' or 'process', the training runs
+    in the background while the last model keeps predicting. The new model
+    is passed to ``set_model`` ``fit_delay`` bars after the submission,
+    waiting for the training if necessary, or as soon as it is ready if
+    ``fit_delay`` is None. Only one training runs at a time.
     """
     def __init__(self):
         self.frame_count = 0
@@ -23,6 +32,8 @@ class BaseStrategy(bt.Strategy):
         self.order_dict = dict()
         self.order_info = dict()
         self.price = None
+        self._executor = None
+        self._fit_job = None
 
     def observe(self):
         """Store data"""
@@ -31,6 +42,52 @@ class BaseStrategy(bt.Strategy):
     def process(self):
         pass
 
+    def should_fit(self):
+        return self.train_count >= self.p.train_freq
+
+    def set_model(self, model):
+        self.model = model
+
+    def submit_fit(self, func, *args):
+        """Train by ``func(*args)`` and pass the result to ``set_model``"""
+        executor = self.fit_executor
+        if executor is None:
+            self.set_model(func(*args))
+        else:
+            fit_delay = getattr(self.p, 'fit_delay', None)
+            if fit_delay is None:
+                ready_frame = None
+            else:
+                ready_frame = self.frame_count + fit_delay
+            self._fit_job = (ready_frame, executor.submit(func, *args))
+
+    def collect_fit(self):
+        """Swap in the model trained in the background when it is due"""
+        if self._fit_job is None:
+            return None
+        ready_frame, future = self._fit_job
+        if ready_frame is None:
+            if not future.done():
+                return None
+        elif self.frame_count < ready_frame:
+            return None
+        self._fit_job = None
+        self.set_model(future.result())
+
+    @property
+    def fit_executor(self):
+        kind = getattr(self.p, 'fit_executor', None)
+        if kind is None:
+            return None
+        if self._executor is None:
+            if kind == 'thread':
+                self._executor = ThreadPoolExecutor(max_workers=1)
+            elif kind == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=1)
+            else:
+                raise ValueError(f'Unknown fit executor {kind}')
+        return self._executor
+
     @abstractmethod
     def fit(self):
         raise NotImplementedError()
@@ -68,17 +125,23 @@ class BaseStrategy(bt.Strategy):
         self.init_value = self.broker.get_value()
         self.cash_value = self.init_value
 
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
     def next(self):
         self.observe()
         self.frame_count += 1
         self.train_count += 1
         if self.warmup:
             return None
-        if self.train_count >= self.p.train_freq:
+        if self._fit_job is None and self.should_fit():
             # Start training and prediction
             self.process()
             self.fit()
             self.train_count = 0
+        self.collect_fit()
         if self.model is not None:
             orders = self.predict()
             self.execute(orders)
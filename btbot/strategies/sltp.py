@@ -1,3 +1,5 @@
+from time import perf_counter
+
 import xgboost as xgb
 import pyfolio as pf
 from sklearn.preprocessing import StandardScaler
@@ -13,9 +15,119 @@ from ..samplers import BasicSampler
 from ..labelers import SLTPLabeler
 from ..constants import SELL, BUY, SHORT, LONG, HOLD
 from ..configs import xgb_params
+from ..walkforward import fit_bars, training_index, run_windows
+
+
+# Labels to the classes of xgboost and vice versa
+LABEL2CLASS = {SHORT: 0, HOLD: 1, LONG: 2}
+CLASS2LABEL = {0: SHORT, 1: HOLD, 2: LONG}
+
+
+def train_model(model_params, features, labels, num_round, scaler,
+                xgb_model=None):
+    """Train the scaler and the booster of SLTPStrategy
+
+    Defined at module level so that it can run in a process pool.
+
+    Parameters
+    ----------
+    model_params: dict
+        Parameters of xgboost
+    features, labels: np.ndarray
+        Training data
+    num_round: int
+        The number of boosting rounds
+    scaler: StandardScaler
+        Fitted on features unless xgb_model is given
+    xgb_model: xgb.Booster, optional
+        Booster to continue boosting from
+
+    Returns
+    -------
+    model: xgb.Booster
+    scaler: StandardScaler
+    time: float
+        Training time in seconds
+    """
+    start = perf_counter()
+    if xgb_model is None:
+        features = scaler.fit_transform(features)
+    else:
+        features = scaler.transform(features)
+    dtrain = xgb.DMatrix(features, label=labels)
+    model = xgb.train(model_params, dtrain, num_round, xgb_model=xgb_model)
+    return model, scaler, perf_counter() - start
+
+
+def fit_predict(model_params, features, labels, num_round, pred_features):
+    """Train on one walk-forward window and predict the following bars
+
+    Returns
+    -------
+    np.ndarray: Predicted classes of pred_features
+    """
+    model, scaler, _ = train_model(model_params, features, labels, num_round,
+                                   StandardScaler())
+    pred_features = (pred_features - scaler.mean_) / scaler.scale_
+    return model.inplace_predict(pred_features).astype(int)
+
+
+class RowPredictor(object):
+    """Predict the class of a single feature row with few allocations
+
+    The scaling is applied in place on a preallocated row, which is passed
+    to ``Booster.inplace_predict`` without building a DMatrix. Results are
+    the same as ``model.predict(xgb.DMatrix(scaler.transform([feed])))``.
+
+    Parameters
+    ----------
+    model: xgb.Booster
+    scaler: StandardScaler
+        Fitted scaler
+    """
+    def __init__(self, model, scaler):
+        self.model = model
+        self.mean = scaler.mean_
+        self.scale = scaler.scale_
+        self.row = np.empty((1, scaler.n_features_in_))
+
+    def __call__(self, feed):
+        row = self.row[0]
+        np.subtract(feed, self.mean, out=row)
+        np.divide(row, self.scale, out=row)
+        return int(self.model.inplace_predict(self.row)[0])
 
 
 class SLTPStrategy(BaseStrategy):
+    """Strategy trading on Stop Loss and Take Profit labels with XGBoost
+
+    Retraining is controlled by ``retrain``:
+
+    'bars': Train every ``train_freq`` bars
+    'labels': Train when ``retrain_labels`` labels have been resolved since
+        the last training
+    'drift': Check every ``train_freq`` bars and train when the mean of the
+        latest ``drift_window`` features moves more than ``drift_threshold``
+        training standard deviations
+
+    With ``warm_start``, the model keeps boosting ``warm_num_round`` rounds
+    from the previous booster on the newly resolved samples only. The
+    booster grows with every warm start, so prediction and further
+    boosting slow down, and the scaler stays the one of the last full
+    training while the features drift. A full training with a new scaler
+    is run instead after ``warm_refit`` warm starts, or when the booster
+    would exceed ``warm_max_rounds`` rounds. Smaller values keep the model
+    fresh at the cost of more full trainings. Each training is recorded in
+    ``fit_log``.
+
+    ``fit_executor`` and ``fit_delay`` run the training in the background,
+    see ``BaseStrategy``.
+
+    With ``precompute``, the whole walk-forward is computed at the first bar
+    from the indicator lines of runonce mode, training independent windows
+    in ``precompute_workers`` processes, and the bars only replay the
+    signals. Signals are the same as online with the 'bars' policy.
+    """
     params = (
         ('warmup', 200),
         ('train_freq', 1),
@@ -25,6 +137,18 @@ class SLTPStrategy(BaseStrategy):
         ('max_data', 100000),
         ('timelag', 10),
         ('num_round', 50),
+        ('retrain', 'bars'),
+        ('retrain_labels', 100),
+        ('drift_window', 100),
+        ('drift_threshold', 1.),
+        ('warm_start', False),
+        ('warm_num_round', 10),
+        ('warm_refit', 10),
+        ('warm_max_rounds', None),
+        ('fit_executor', None),
+        ('fit_delay', None),
+        ('precompute', False),
+        ('precompute_workers', None),
         ('sider', None),
         ('sider_params', dict()),
         ('sampler', BasicSampler),
@@ -47,30 +171,149 @@ class SLTPStrategy(BaseStrategy):
         self.p.labeler_params['stls'] = self.p.stls
         self.p.labeler_params['tkpf'] = self.p.tkpf
         self.labeler = self.p.labeler(**self.p.labeler_params)
-        self.trainer = Trainer(self.feeder, self.labeler)
+        self.trainer = Trainer(self.feeder, self.labeler,
+                               max_data=self.p.max_data)
         self.vol_lines = EMAVolatility().lines.vol
         self.scaler = StandardScaler()
+        self.fit_log = []
+        self.signals = None
+        # Warm starts since the last full training
+        self.warm_count = 0
+
+    def next(self):
+        if not self.p.precompute:
+            return super(SLTPStrategy, self).next()
+        if self.signals is None:
+            self.signals = self.precompute_signals()
+        self.frame_count += 1
+        signal = self.signals[len(self) - 1]
+        if not np.isnan(signal):
+            self.execute(self.get_orders(int(signal)))
+
+    def precompute_signals(self):
+        """Walk-forward signals of all bars, nan before the first model"""
+        if self.p.retrain != 'bars' or self.p.warm_start:
+            raise ValueError('precompute supports only the bars policy '
+                             'without warm start')
+        num_bars = self.price.buflen()
+        if self.labeler.buflen() < num_bars:
+            raise ValueError('precompute needs runonce mode')
+        first_bar = len(self) - 1
+        features = self.feeder.get_feeds()
+        signals = np.full(num_bars, np.nan)
+        has_feed = ~np.isnan(features[first_bar:]).all(axis=1)
+        if not has_feed.any():
+            # The history is shorter than a feed
+            return signals
+        first_feed = first_bar + np.flatnonzero(has_feed)[0]
+        label = np.asarray(self.labeler.lines.label.array[:num_bars])
+        time_diff = np.asarray(self.labeler.lines.time_diff.array[:num_bars])
+        if self.is_metalabeling:
+            side = np.asarray(self.labeler.lines.side.array[:num_bars])
+        else:
+            side = None
+
+        def get_windows():
+            # A training without samples keeps the previous model, so each
+            # window predicts until the next training with samples
+            window = None
+            for bar in fit_bars(first_bar, num_bars, self.p.warmup,
+                                self.p.train_freq):
+                index = training_index(bar, first_feed, label, time_diff,
+                                       side=side, max_data=self.p.max_data)
+                if len(index) == 0:
+                    continue
+                if window is not None:
+                    yield get_window(*window, bar)
+                window = (index, bar)
+            if window is not None:
+                yield get_window(*window, num_bars)
+
+        def get_window(index, start, end):
+            labels = np.array(self.transform_labels(label[index]))
+            args = (self.p.model_params, features[index], labels,
+                    self.p.num_round, features[start:end])
+            return (start, end), args
+
+        for (start, end), classes in run_windows(
+                fit_predict, get_windows(), self.p.precompute_workers):
+            signals[start:end] = self.inverse_transform_labels(classes)
+        return signals
+
+    def should_fit(self):
+        if self.model is None or self.p.retrain == 'bars':
+            return super(SLTPStrategy, self).should_fit()
+        elif self.p.retrain == 'labels':
+            num_labels = self.labeler.count_resolved(self.train_count)
+            return num_labels >= self.p.retrain_labels
+        elif self.p.retrain == 'drift':
+            return super(SLTPStrategy, self).should_fit() and \
+                self.feature_drift > self.p.drift_threshold
+        else:
+            raise ValueError(f'Unknown retrain policy {self.p.retrain}')
+
+    @property
+    def feature_drift(self):
+        """Largest shift of the latest feature means in training std units"""
+        features = self.trainer.store_feed.values[-self.p.drift_window:]
+        if len(features) == 0:
+            return 0.
+        shift = (features.mean(axis=0) - self.scaler.mean_) / self.scaler.scale_
+        return np.max(np.abs(shift))
 
     def fit(self):
         if self.is_metalabeling:
             side = self.labeler.current_side
         else:
             side = None
-        features, labels = self.trainer.get_data(side=side)
+        warm_start = self.can_warm_start()
+        # Indexed copies, safe to train on in the background
+        if warm_start:
+            # Samples resolved since the last training
+            features, labels = self.trainer.get_data(
+                side=side, resolved_within=self.train_count)
+        else:
+            features, labels = self.trainer.get_data(side=side)
         if len(features) == 0:
             return None
-        features = self.scaler.fit_transform(features)
         labels = np.array(self.transform_labels(labels))
-        dtrain = xgb.DMatrix(features, label=labels)
-        self.model = xgb.train(self.p.model_params, dtrain, self.p.num_round)
+        self._fit_info = dict(frame=self.frame_count,
+                              num_data=len(labels),
+                              warm_start=warm_start)
+        self.warm_count = self.warm_count + 1 if warm_start else 0
+        if warm_start:
+            self.submit_fit(train_model, self.p.model_params, features, labels,
+                            self.p.warm_num_round, self.scaler, self.model)
+        else:
+            self.submit_fit(train_model, self.p.model_params, features, labels,
+                            self.p.num_round, StandardScaler())
+
+    def can_warm_start(self):
+        """Whether the next training continues boosting the current model"""
+        if not self.p.warm_start or self.model is None:
+            return False
+        if self.p.warm_refit is not None and \
+                self.warm_count >= self.p.warm_refit:
+            return False
+        if self.p.warm_max_rounds is not None:
+            num_rounds = self.model.num_boosted_rounds()
+            return num_rounds + self.p.warm_num_round <= \
+                self.p.warm_max_rounds
+        return True
+
+    def set_model(self, model):
+        self.model, self.scaler, fit_time = model
+        self.predictor = RowPredictor(self.model, self.scaler)
+        self.fit_log.append(dict(self._fit_info,
+                                 ready_frame=self.frame_count,
+                                 time=fit_time))
 
     def predict(self):
-        # Prediction
-        pred_features = np.array([self.feeder.current_feed])
-        pred_features = self.scaler.transform(pred_features)
-        dtest = xgb.DMatrix(pred_features)
-        signal = self.model.predict(dtest)
-        signal = self.inverse_transform_labels(signal)[0]
+        # Prediction on the feed stored at this bar
+        signal = CLASS2LABEL[self.predictor(self.trainer.last_feed)]
+        return self.get_orders(signal)
+
+    def get_orders(self, signal):
         self.current_signal = signal
         info = dict()
         info['take_profit'] = self.labeler.current_take_profit
@@ -97,12 +340,10 @@ class SLTPStrategy(BaseStrategy):
         return self.labeler.is_metalabeling
 
     def transform_labels(self, labels):
-        map_dict = {SHORT: 0, HOLD: 1, LONG: 2}
-        return [map_dict[int(x)] for x in labels]
+        return [LABEL2CLASS[int(x)] for x in labels]
 
     def inverse_transform_labels(self, labels):
-        map_dict = {0: SHORT, 1: HOLD, 2: LONG}
-        return [map_dict[int(x)] for x in labels]
+        return [CLASS2LABEL[int(x)] for x in labels]
 
     def print_result(self):
         pnl = self.broker.get_value() - self.init_value
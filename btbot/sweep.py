@@ -0,0 +1,185 @@
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .cerebro import get_cerebro
+from .feeds import NumpyData
+
+
+OHLCV = ('open', 'high', 'low', 'close', 'volume')
+
+# Data attached by each worker process
+_worker_data = dict()
+
+
+class SharedOHLCV(object):
+    """OHLCV history in shared memory
+
+    Dates are stored as int64 nanoseconds followed by float64 OHLCV columns
+    in a single block, so that worker processes attach to it by name
+    instead of receiving pickled DataFrames.
+
+    Parameters
+    ----------
+    df: pd.DataFrame
+        DataFrame indexed by date with open, high, low, close and volume
+    """
+    def __init__(self, df):
+        num_bars = len(df)
+        self.spec = dict(num_bars=num_bars)
+        size = max(8 * num_bars * (1 + len(OHLCV)), 1)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.spec['name'] = self.shm.name
+        dates, values = self.get_arrays(self.shm, num_bars)
+        dates[:] = pd.DatetimeIndex(df.index).asi8
+        values[:] = df[list(OHLCV)].values
+
+    @staticmethod
+    def get_arrays(shm, num_bars):
+        dates = np.ndarray((num_bars,), dtype=np.int64, buffer=shm.buf)
+        values = np.ndarray((num_bars, len(OHLCV)), dtype=np.float64,
+                            buffer=shm.buf, offset=8 * num_bars)
+        return dates, values
+
+    @classmethod
+    def attach(cls, spec):
+        """Attach to the block and return it with a DataFrame view"""
+        try:
+            shm = shared_memory.SharedMemory(name=spec['name'], track=False)
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=spec['name'])
+        dates, values = cls.get_arrays(shm, spec['num_bars'])
+        df = pd.DataFrame(values, columns=list(OHLCV),
+                          index=pd.DatetimeIndex(dates), copy=False)
+        return shm, df
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _init_worker(specs):
+    for name, spec in specs.items():
+        _worker_data[name] = SharedOHLCV.attach(spec)
+
+
+def _run_config(strategy, config, startcash):
+    cerebro = get_cerebro(startcash, profile='lean')
+    for name, (_, df) in _worker_data.items():
+        # Lines reference the shared block without copy
+        columns = dict(date=df.index.values,
+                       **{col: df[col].values for col in OHLCV})
+        cerebro.adddata(NumpyData(dataname=columns), name=name)
+    cerebro.addstrategy(strategy, **config)
+    strat = cerebro.run()[0]
+    return get_metrics(strat, startcash)
+
+
+def get_metrics(strategy, startcash):
+    """Compact metrics of a finished strategy
+
+    Returns
+    -------
+    dict: sharpe, max_drawdown (%), max_moneydown, pnl and value
+    """
+    sharpe = strategy.analyzers.getbyname('sharpe').get_analysis()
+    drawdown = strategy.analyzers.getbyname('drawdown').get_analysis()
+    value = strategy.broker.get_value()
+    return dict(sharpe=sharpe['sharperatio'],
+                max_drawdown=drawdown.max.drawdown,
+                max_moneydown=drawdown.max.moneydown,
+                pnl=value - startcash,
+                value=value)
+
+
+def _encode(value):
+    """JSON value of numpy scalars and arrays, repr of other objects"""
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    return repr(value)
+
+
+def config_key(config):
+    """Key identifying a configuration in the results file
+
+    Canonical JSON with sorted keys, so equal configurations have the
+    same key whatever the order of their items and numpy scalars match
+    the Python numbers.
+    """
+    return json.dumps(config, sort_keys=True, default=_encode)
+
+
+def load_results(path):
+    """Load results written by ``run_sweep``, one JSON object per line"""
+    results = []
+    if path is None or not os.path.exists(path):
+        return results
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                results.append(json.loads(line))
+    return results
+
+
+def run_sweep(data, configs, strategy, results_path=None, num_workers=None,
+              startcash=10000):
+    """Run a strategy for every configuration in a process pool
+
+    Parameters
+    ----------
+    data: dict(str, pd.DataFrame)
+        OHLCV data by name. Data are put into shared memory once and
+        attached by every worker
+    configs: list(dict)
+        Strategy parameters of each run
+    strategy: bt.Strategy
+        Strategy class importable at module level
+    results_path: str, optional
+        JSON lines file. Each result is appended as soon as it is done and
+        configurations already in the file are skipped. A configuration
+        that raises is recorded with ``error`` and run again next time
+    num_workers: int, optional
+        The number of processes, ``os.cpu_count()`` if None
+    startcash: float, (default 10000)
+
+    Returns
+    -------
+    list(dict): Results of all configurations with ``key`` and ``config``,
+    and ``error`` instead of metrics if the run raised
+    """
+    # Failed configurations are run again
+    results = [result for result in load_results(results_path)
+               if 'error' not in result]
+    done = set(result['key'] for result in results)
+    todo = [config for config in configs if config_key(config) not in done]
+    if len(todo) == 0:
+        return results
+    shared = {name: SharedOHLCV(df) for name, df in data.items()}
+    specs = {name: x.spec for name, x in shared.items()}
+    try:
+        with ProcessPoolExecutor(max_workers=num_workers,
+                                 initializer=_init_worker,
+                                 initargs=(specs,)) as executor:
+            futures = {executor.submit(_run_config, strategy, config,
+                                       startcash): config
+                       for config in todo}
+            for future in as_completed(futures):
+                config = futures[future]
+                result = dict(key=config_key(config), config=config)
+                try:
+                    result.update(future.result())
+                except Exception as e:
+                    result['error'] = f'{type(e).__name__}: {e}'
+                results.append(result)
+                if results_path is not None:
+                    with open(results_path, 'a') as f:
+                        f.write(json.dumps(result, default=_encode) + '\n')
+    finally:
+        for x in shared.values():
+            x.close()
+    return results
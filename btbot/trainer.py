@@ -1,32 +1,128 @@
 import numpy as np
 
 
+class RollingBuffer(object):
+    """Contiguous 2D float buffer keeping the latest rows
+
+    Rows are written into a preallocated array, which doubles when full
+    until it holds twice ``max_size`` rows. After that the latest
+    ``max_size`` rows are moved to the front, so appending is amortized
+    O(1) and the stored rows are always a contiguous view.
+
+    Parameters
+    ----------
+    max_size: int, optional
+        The number of latest rows to keep, at least 1. Keep all rows if
+        None
+    init_size: int, (default 1024)
+        Initial capacity in rows
+    """
+    def __init__(self, max_size=None, init_size=1024):
+        if max_size is not None and max_size < 1:
+            raise ValueError(f'max_size must be at least 1: {max_size}')
+        if init_size < 1:
+            raise ValueError(f'init_size must be at least 1: {init_size}')
+        self.max_size = max_size
+        self.init_size = init_size
+        self._array = None
+        self._start = 0
+        self._end = 0
+
+    def append(self, row):
+        row = np.asarray(row, dtype=float)
+        if self._array is None:
+            size = self.init_size
+            if self.max_size is not None:
+                size = min(size, 2 * self.max_size)
+            self._array = np.empty((size, len(row)))
+        if self._end == len(self._array):
+            self._reserve()
+        self._array[self._end] = row
+        self._end += 1
+        if self.max_size is not None and len(self) > self.max_size:
+            self._start += 1
+
+    def _reserve(self):
+        num_rows = len(self)
+        size = len(self._array)
+        if self.max_size is None or size < 2 * self.max_size:
+            size *= 2
+            if self.max_size is not None:
+                size = min(size, 2 * self.max_size)
+            array = np.empty((size, self._array.shape[1]))
+        else:
+            array = self._array
+        array[:num_rows] = self._array[self._start:self._end]
+        self._array = array
+        self._start = 0
+        self._end = num_rows
+
+    @property
+    def values(self):
+        """View of the stored rows from the oldest to the latest"""
+        if self._array is None:
+            return np.empty((0, 0))
+        return self._array[self._start:self._end]
+
+    def __getitem__(self, idx):
+        return self.values[idx]
+
+    def __len__(self):
+        return self._end - self._start
+
+
 class Trainer(object):
-    def __init__(self, feeder, labeler):
+    """Store features and build training data with labels
+
+    Parameters
+    ----------
+    feeder: BaseFeeder
+    labeler: BaseLabeler
+    max_data: int, optional
+        The number of latest features to keep
+    """
+    def __init__(self, feeder, labeler, max_data=None):
         self.feeder = feeder
         self.labeler = labeler
         # Note that we store only feed not label
-        self.store_feed = []
+        self.store_feed = RollingBuffer(max_data)
+        # Feed of the latest bar
+        self.last_feed = None
 
     def store(self):
         feed = self.feeder.current_feed
+        self.last_feed = feed
         if feed is not None and len(feed) > 0:
             self.store_feed.append(feed)
 
-    def get_data(self, num_data=None, side=None):
+    def get_data(self, num_data=None, side=None, resolved_within=None):
+        """Get stored features with their labels, the latest first
+
+        Features are a C-contiguous copy made by the fancy index. A
+        reversed view of the buffer would be overwritten by later
+        ``store`` calls while a model trains on it in the background, and
+        the scaler and DMatrix would copy its negative strides anyway.
+
+        Parameters
+        ----------
+        num_data: int, optional
+            The number of the latest samples to look at
+        side: int, optional
+            Side to match for metalabeling
+        resolved_within: int, optional
+            Keep only samples whose labels were resolved within the latest
+            bars
+        """
         if num_data is None:
             num_data = self.num_data
         num_data = min(self.num_data, num_data)
-        feeds = []
-        labels = []
-        for i in range(num_data):
-            label = self.labeler.get_label(-i, side)
-            if label is None:
-                continue
-            feeds.append(self.store_feed[-(i + 1)])
-            labels.append(label)
-        return np.array(feeds), np.array(labels).astype(int)
+        feeds = self.store_feed.values[self.num_data - num_data:]
+        labels, is_valid = self.labeler.get_labels(
+            num_data, side, resolved_within=resolved_within)
+        # The latest first
+        idx = np.flatnonzero(is_valid[::-1])
+        return feeds[::-1][idx], labels[::-1][idx].astype(int)
 
     @property
     def num_data(self):
-        return len(self.store_feed)
\ No newline at end of file
+        return len(self.store_feed)
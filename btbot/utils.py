@@ -1,9 +1,8 @@
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.preprocessing import StandardScaler
 import pandas as pd
-import backtrader as bt
 
-from .cerebro import Cerebro
+from .cerebro import Cerebro, get_cerebro
 
 
 def get_data_by_name(obj, name):
@@ -59,13 +58,3 @@ def print_trade_analysis(strategy):
     print(f'Maximum MoneyDown: {round(dd_analyzer.max.moneydown, 2)}')
     print(f'Maximum Drawdown Length: {dd_analyzer.max.len}')
 
-
-def get_cerebro(startcash=10000):
-    cerebro = Cerebro()
-    cerebro.broker.setcash(startcash)
-    cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
-    cerebro.addanalyzer(bt.analyzers.SharpeRatio_A, _name='sharpe',
-                        timeframe=bt.analyzers.TimeFrame.Days)
-    cerebro.addobserver(bt.observers.DrawDown)
-    cerebro.addanalyzer(bt.analyzers.PyFolio, _name='pyfolio')
-    return cerebro
\ No newline at end of file
@@ -0,0 +1,106 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .constants import NONE
+
+
+def fit_bars(first_bar, num_bars, warmup=0, train_freq=1):
+    """Bars where BaseStrategy.next trains on the ``train_freq`` schedule
+
+    Parameters
+    ----------
+    first_bar: int
+        The first bar the strategy processes
+    num_bars: int
+        The number of bars in the history
+    warmup: int, (default 0)
+        The number of bars without training and prediction
+    train_freq: int, (default 1)
+        Train every ``train_freq`` bars
+
+    Returns
+    -------
+    list(int): Bars in ascending order
+    """
+    bars = []
+    train_count = 0
+    for frame_count, bar in enumerate(range(first_bar, num_bars), 1):
+        train_count += 1
+        if frame_count < warmup:
+            continue
+        if train_count >= train_freq:
+            bars.append(bar)
+            train_count = 0
+    return bars
+
+
+def training_index(bar, first_bar, label, time_diff, side=None,
+                   max_data=None):
+    """Bars of the samples Trainer.get_data returns at ``bar``
+
+    Parameters
+    ----------
+    bar: int
+        The bar of training
+    first_bar: int
+        The first bar with a stored feed
+    label, time_diff: np.ndarray
+        Label lines of the whole history
+    side: np.ndarray, optional
+        Side line of the whole history for metalabeling
+    max_data: int, optional
+        The number of the latest feeds kept by Trainer
+
+    Returns
+    -------
+    np.ndarray: Bars with labels known at ``bar``, the latest first
+    """
+    num_data = bar - first_bar + 1
+    if max_data is not None:
+        num_data = min(num_data, max_data)
+    if num_data <= 0:
+        return np.empty(0, dtype=int)
+    bars = np.arange(bar, bar - num_data, -1)
+    is_valid = (label[bars] != NONE) & (time_diff[bars] <= bar - bars)
+    if side is not None:
+        is_valid &= side[bars] == int(side[bar])
+    return bars[is_valid]
+
+
+def run_windows(func, windows, num_workers=None):
+    """Apply func to independent walk-forward windows in a process pool
+
+    Parameters
+    ----------
+    func: callable
+        Module level function
+    windows: iterable of (key, args)
+        Windows are generated lazily and at most twice ``num_workers`` of
+        them are in flight, which bounds the memory use
+    num_workers: int, optional
+        The number of processes, ``os.cpu_count()`` if None. Run in this
+        process if 1
+
+    Yields
+    ------
+    (key, func(*args)) in the order of windows
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count()
+    if num_workers == 1:
+        for key, args in windows:
+            yield key, func(*args)
+        return
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        pending = deque()
+        for key, args in windows:
+            pending.append((key, executor.submit(func, *args)))
+            if len(pending) >= 2 * num_workers:
+                key, future = pending.popleft()
+                yield key, future.result()
+        while pending:
+            key, future = pending.popleft()
+            yield key, future.result()
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_ohlcv(num_bars, start='2018-01-01', seed=0):
+    """Random walk 30 minute OHLCV indexed by date"""
+    rng = np.random.RandomState(seed)
+    close = 100 * np.exp(np.cumsum(rng.randn(num_bars) * 0.01))
+    index = pd.date_range(start, periods=num_bars, freq='30min')
+    return pd.DataFrame(dict(open=close * (1 + rng.randn(num_bars) * 1e-3),
+                             high=close * 1.005, low=close * 0.995,
+                             close=close,
+                             volume=rng.rand(num_bars) * 100 + 1),
+                        index=index)
+
+
+@pytest.fixture
+def sqlite_url(tmp_path):
+    """URL of an empty SQLite database with all price tables"""
+    from btbot.database.engine import get_engine
+    from btbot.database.sql_declarative import Base
+    url = 'sqlite:///' + str(tmp_path / 'price.db')
+    Base.metadata.create_all(get_engine(url))
+    return url
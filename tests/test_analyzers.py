@@ -0,0 +1,65 @@
+import backtrader as bt
+import pytest
+
+from btbot import get_cerebro
+from btbot.analyzers import StreamingDrawDown, StreamingSharpe
+
+from conftest import make_ohlcv
+
+
+class SMAStrategy(bt.Strategy):
+    def __init__(self):
+        self.sma = bt.indicators.SMA(self.data.close, period=20)
+
+    def next(self):
+        if not self.position and self.data.close[0] > self.sma[0]:
+            self.buy(size=10)
+        elif self.position and self.data.close[0] < self.sma[0]:
+            self.close()
+
+
+SHARPE_PARAMS = [
+    dict(timeframe=bt.TimeFrame.Days),
+    dict(timeframe=bt.TimeFrame.Days, stddev_sample=True),
+    dict(timeframe=bt.TimeFrame.Days, convertrate=False),
+    dict(timeframe=bt.TimeFrame.Minutes, compression=240),
+]
+
+
+def run_analyzers(runonce=True):
+    cerebro = bt.Cerebro(stdstats=False, runonce=runonce)
+    cerebro.adddata(bt.feeds.PandasData(dataname=make_ohlcv(3000)))
+    cerebro.addstrategy(SMAStrategy)
+    cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
+    cerebro.addanalyzer(StreamingDrawDown, _name='streaming_drawdown')
+    for i, params in enumerate(SHARPE_PARAMS):
+        cerebro.addanalyzer(bt.analyzers.SharpeRatio_A, _name=f'sharpe{i}',
+                            **params)
+        cerebro.addanalyzer(StreamingSharpe, _name=f'streaming_sharpe{i}',
+                            **params)
+    return cerebro.run()[0].analyzers
+
+
+@pytest.mark.parametrize('runonce', [True, False])
+def test_streaming_matches_backtrader(runonce):
+    analyzers = run_analyzers(runonce)
+    expected = analyzers.drawdown.get_analysis()
+    result = analyzers.streaming_drawdown.get_analysis()
+    assert expected.max.drawdown > 0
+    for key in ('len', 'drawdown', 'moneydown'):
+        assert result[key] == pytest.approx(expected[key])
+        assert result.max[key] == pytest.approx(expected.max[key])
+    for i in range(len(SHARPE_PARAMS)):
+        expected = analyzers.getbyname(f'sharpe{i}').get_analysis()
+        result = analyzers.getbyname(f'streaming_sharpe{i}').get_analysis()
+        assert expected['sharperatio'] is not None
+        assert result['sharperatio'] == \
+            pytest.approx(expected['sharperatio'], rel=1e-9)
+
+
+def test_get_cerebro_profiles():
+    for profile in ('full', 'lean'):
+        cerebro = get_cerebro(profile=profile, analyzers=['recorder'])
+        assert len(cerebro.analyzers) == 1
+    with pytest.raises(ValueError, match='Invalid profile'):
+        get_cerebro(profile='fast')
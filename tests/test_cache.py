@@ -0,0 +1,47 @@
+import pandas as pd
+
+from btbot.database import OHLCVCache, fetch_data
+from btbot.database.store import store_bulk
+
+from conftest import make_ohlcv
+
+
+START = '2017-12-31 23:00:00'
+
+
+def test_fetch_after_ingest(tmp_path, sqlite_url):
+    df = make_ohlcv(200)
+    store_bulk('X', df.iloc[:100], url=sqlite_url, verbose=False)
+    cache = OHLCVCache(cache_dir=str(tmp_path / 'cache'), url=sqlite_url)
+    # end is after the newest stored bar
+    end = '2018-01-10 00:00:00'
+    data = cache.fetch(START, end, ['X'])['X']
+    assert len(data) == 100
+    assert cache.read_meta('price30m', 'X')['end'] == \
+        str(df.index[99])
+
+    store_bulk('X', df.iloc[100:], url=sqlite_url, verbose=False)
+    data = cache.fetch(START, end, ['X'])['X']
+    expected = fetch_data(START, end, ['X'], url=sqlite_url)['X']
+    pd.testing.assert_frame_equal(data, expected, check_freq=False,
+                                  check_names=False)
+    assert len(data) == 200
+
+
+def test_fetch_open_end_after_ingest(tmp_path, sqlite_url):
+    df = make_ohlcv(200)
+    store_bulk('X', df.iloc[:150], url=sqlite_url, verbose=False)
+    cache = OHLCVCache(cache_dir=str(tmp_path / 'cache'), url=sqlite_url)
+    assert len(cache.fetch(START, None, ['X'])['X']) == 150
+    store_bulk('X', df.iloc[150:], url=sqlite_url, verbose=False)
+    data = cache.fetch(START, None, ['X'])['X']
+    assert len(data) == 200
+    assert data.index.is_unique
+
+
+def test_offline(tmp_path, sqlite_url):
+    store_bulk('X', make_ohlcv(50), url=sqlite_url, verbose=False)
+    cache = OHLCVCache(cache_dir=str(tmp_path / 'cache'), url=sqlite_url)
+    cache.fetch(START, None, ['X'])
+    cache.url = 'sqlite:///' + str(tmp_path / 'missing' / 'x.db')
+    assert len(cache.fetch(START, None, ['X'], offline=True)['X']) == 50
@@ -0,0 +1,74 @@
+import importlib
+
+import pytest
+from sqlalchemy import text
+
+from btbot.database import config, engine
+from btbot.database.engine import get_engine, get_session, dispose_engines
+
+
+def test_engine_cache(tmp_path, monkeypatch):
+    url = 'sqlite:///' + str(tmp_path / 'a.db')
+    first = get_engine(url)
+    assert get_engine(url) is first
+    assert get_engine('sqlite:///' + str(tmp_path / 'b.db')) is not first
+    with get_session(url) as session:
+        assert session.get_bind() is first
+        assert session.execute(text('SELECT 1')).scalar() == 1
+    # A forked process gets its own engine and sessions
+    pid = engine.os.getpid()
+    monkeypatch.setattr(engine.os, 'getpid', lambda: pid + 1)
+    child = get_engine(url)
+    assert child is not first
+    assert get_session(url).get_bind() is child
+    monkeypatch.setattr(engine.os, 'getpid', lambda: pid)
+    assert get_engine(url) is first
+
+
+def test_dispose_engines(tmp_path):
+    url = 'sqlite:///' + str(tmp_path / 'a.db')
+    first = get_engine(url)
+    get_session(url)
+    dispose_engines()
+    assert all(key[1] != engine.os.getpid() for key in engine._engines)
+    assert all(key[1] != engine.os.getpid() for key in engine._sessions)
+    assert get_engine(url) is not first
+
+
+@pytest.fixture
+def environ(monkeypatch):
+    """Reload the config with environment variables"""
+    def reload(**variables):
+        for name, value in variables.items():
+            monkeypatch.setenv(name, value)
+        importlib.reload(config)
+        importlib.reload(engine)
+    yield reload
+    monkeypatch.undo()
+    importlib.reload(config)
+    importlib.reload(engine)
+
+
+def test_config_from_environment(environ, tmp_path, monkeypatch):
+    url = 'sqlite:///' + str(tmp_path / 'env.db')
+    environ(BTBOT_DB_URL=url, BTBOT_DB_POOL_SIZE='2',
+            BTBOT_DB_MAX_OVERFLOW='0', BTBOT_DB_POOL_RECYCLE='60')
+    assert (config.URL, config.POOL_SIZE, config.MAX_OVERFLOW,
+            config.POOL_RECYCLE) == (url, 2, 0, 60)
+    assert str(engine.get_engine().url) == url
+    # Pool settings of server databases, without connecting
+    created = []
+
+    def create_engine(url, **kwargs):
+        created.append(kwargs)
+        return object()
+
+    monkeypatch.setattr(engine, 'create_engine', create_engine)
+    engine.get_engine('mysql://user@localhost/db')
+    engine.get_engine('mysql://user@localhost/other', pool_size=7,
+                      max_overflow=3)
+    assert created == [
+        dict(pool_size=2, max_overflow=0, pool_recycle=60,
+             pool_pre_ping=True),
+        dict(pool_size=7, max_overflow=3, pool_recycle=60,
+             pool_pre_ping=True)]
@@ -0,0 +1,85 @@
+import sys
+
+import backtrader as bt
+import numpy as np
+import pytest
+
+from btbot import get_cerebro
+from btbot.export import export_results, load_columns
+from btbot.plotting import num2datetime64
+
+from conftest import make_ohlcv
+
+
+class SMAStrategy(bt.Strategy):
+    """Records completed orders, closed trades and positions"""
+    def __init__(self):
+        self.sma = bt.indicators.SMA(self.data.close, period=20)
+        self.order_log = []
+        self.trade_log = []
+        self.sizes = []
+
+    def notify_order(self, order):
+        if order.status == order.Completed:
+            self.order_log.append((order.ref, order.executed.price))
+
+    def notify_trade(self, trade):
+        if trade.isclosed:
+            self.trade_log.append((trade.ref, trade.pnlcomm))
+
+    def prenext(self):
+        self.sizes.append(self.position.size)
+
+    def next(self):
+        self.sizes.append(self.position.size)
+        if not self.position and self.data.close[0] > self.sma[0]:
+            self.buy(size=10)
+        elif self.position and self.data.close[0] < self.sma[0]:
+            self.close()
+
+
+@pytest.fixture(scope='module')
+def strat():
+    cerebro = get_cerebro(profile='lean',
+                          analyzers=['drawdown', 'sharpe', 'recorder'])
+    cerebro.broker.setcommission(commission=0.001)
+    cerebro.adddata(bt.feeds.PandasData(dataname=make_ohlcv(500)),
+                    name='price')
+    cerebro.addstrategy(SMAStrategy)
+    strat = cerebro.run()[0]
+    strat.final_value = cerebro.broker.get_value()
+    return strat
+
+
+def test_npz_round_trip(strat, tmp_path):
+    path = export_results(strat, str(tmp_path / 'run'), fmt='npz')
+    assert path.endswith('.npz')
+    equity = load_columns(path, 'equity')
+    dates = np.asarray(strat.data.datetime.array)
+    np.testing.assert_array_equal(equity['datetime'], num2datetime64(dates))
+    assert equity['value'][-1] == pytest.approx(strat.final_value)
+    positions = load_columns(path, 'positions', columns=['price_size'])
+    assert list(positions) == ['price_size']
+    np.testing.assert_array_equal(positions['price_size'], strat.sizes)
+    orders = load_columns(path, 'orders')
+    completed = orders['status'] == bt.Order.Completed
+    assert len(strat.order_log) > 2
+    assert list(zip(orders['ref'][completed],
+                    orders['exec_price'][completed])) == strat.order_log
+    assert set(orders['data']) == {'price'}
+    trades = load_columns(path, 'trades', columns=['ref', 'pnlcomm'])
+    assert list(zip(trades['ref'], trades['pnlcomm'])) == strat.trade_log
+    analyzers = load_columns(path, 'analyzers')
+    assert analyzers['drawdown.max.drawdown'][0] == \
+        strat.analyzers.drawdown.get_analysis().max.drawdown
+
+
+def test_parquet_without_pyarrow(strat, tmp_path, monkeypatch):
+    # Imports of a None module raise ImportError
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    with pytest.raises(ImportError, match='pyarrow is required'):
+        export_results(strat, str(tmp_path / 'run'), fmt='parquet')
+    with pytest.raises(ImportError, match='pyarrow is required'):
+        load_columns(str(tmp_path / 'run'), 'equity')
+    # The default falls back to npz
+    assert export_results(strat, str(tmp_path / 'run')).endswith('.npz')
@@ -0,0 +1,89 @@
+import backtrader as bt
+import numpy as np
+import pytest
+
+from btbot.database import DBData
+from btbot.database.rollup import resample_ohlcv, update_rollups
+from btbot.database.store import store_bulk
+
+from conftest import make_ohlcv
+
+OHLCV = ['open', 'high', 'low', 'close', 'volume']
+
+
+class RecordStrategy(bt.Strategy):
+    """Records bars and an SMA, stores more bars at a given bar"""
+    params = (('on_bar', None),)
+
+    def __init__(self):
+        self.sma = bt.indicators.SMA(self.data.close, period=5)
+        self.records = []
+
+    def next(self):
+        self.records.append(tuple(
+            [self.data.datetime[0], self.sma[0]] +
+            [getattr(self.data.lines, x)[0] for x in OHLCV]))
+        if self.p.on_bar is not None:
+            self.p.on_bar(len(self))
+
+
+def run(feed, on_bar=None, **kwargs):
+    cerebro = bt.Cerebro(stdstats=False, **kwargs)
+    cerebro.adddata(feed)
+    cerebro.addstrategy(RecordStrategy, on_bar=on_bar)
+    return cerebro.run()[0].records
+
+
+@pytest.mark.parametrize('kwargs', [dict(), dict(runonce=False),
+                                    dict(preload=False), dict(exactbars=1)])
+def test_matches_pandas(sqlite_url, kwargs):
+    df = make_ohlcv(300)
+    store_bulk('X', df, url=sqlite_url, verbose=False)
+    expected = run(bt.feeds.PandasData(dataname=df), **kwargs)
+    # Batches smaller than the history
+    result = run(DBData(dataname='X', url=sqlite_url, batch_size=64),
+                 **kwargs)
+    assert len(result) == 300 - 4
+    assert result == expected
+
+
+def test_start_end(sqlite_url):
+    df = make_ohlcv(300)
+    store_bulk('X', df, url=sqlite_url, verbose=False)
+    expected = run(bt.feeds.PandasData(dataname=df.iloc[10:200]))
+    result = run(DBData(dataname='X', url=sqlite_url,
+                        start=str(df.index[9]), end=str(df.index[199])))
+    assert result == expected
+
+
+def test_live_polling(sqlite_url):
+    df = make_ohlcv(200)
+    store_bulk('X', df.iloc[:120], url=sqlite_url, verbose=False)
+
+    def on_bar(num_bars):
+        # Bars arriving after the stored ones are read by polling
+        if num_bars == 100:
+            store_bulk('X', df.iloc[120:], url=sqlite_url, verbose=False)
+
+    expected = run(bt.feeds.PandasData(dataname=df))
+    result = run(DBData(dataname='X', url=sqlite_url, live=True,
+                        poll_interval=0.01, end=str(df.index[-1])),
+                 on_bar=on_bar)
+    assert result == expected
+
+
+@pytest.mark.parametrize('rolled_up', [True, False])
+def test_bar_timeframe(sqlite_url, rolled_up):
+    df = make_ohlcv(1000)
+    store_bulk('X', df, url=sqlite_url, verbose=False)
+    if rolled_up:
+        update_rollups(['X'], url=sqlite_url)
+    expected = run(bt.feeds.PandasData(dataname=resample_ohlcv(df, '4H')))
+    feed = DBData(dataname='X', url=sqlite_url, bar_timeframe='4H')
+    if rolled_up:
+        result = run(feed)
+    else:
+        with pytest.warns(UserWarning, match='not rolled up'):
+            result = run(feed)
+    assert len(result) > 0
+    assert result == expected
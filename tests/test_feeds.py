@@ -0,0 +1,82 @@
+import datetime
+
+import backtrader as bt
+import numpy as np
+import pytest
+
+from btbot.feeds import NumpyData, read_columns
+
+from conftest import make_ohlcv
+
+OHLCV = ['open', 'high', 'low', 'close', 'volume']
+
+
+class CrossStrategy(bt.Strategy):
+    """Records bars and trades on an SMA crossover of the first data"""
+    def __init__(self):
+        sma = bt.indicators.SMA(self.data.close, period=15)
+        self.cross = bt.indicators.CrossOver(self.data.close, sma)
+        self.records = []
+
+    def next(self):
+        self.records.append(tuple(
+            [self.data.datetime[0]] +
+            [getattr(self.datas[-1].lines, x)[0] for x in OHLCV] +
+            [self.cross[0], len(self.datas[-1])]))
+        if self.cross[0] > 0:
+            self.buy()
+        elif self.cross[0] < 0:
+            self.close()
+
+
+def run(feeds, **kwargs):
+    cerebro = bt.Cerebro(stdstats=False, **kwargs)
+    for feed in feeds:
+        cerebro.adddata(feed)
+    cerebro.addstrategy(CrossStrategy)
+    strat = cerebro.run()[0]
+    return strat.records, cerebro.broker.get_value()
+
+
+def columns_of(df):
+    return dict(date=df.index.values,
+                **{col: df[col].values for col in OHLCV})
+
+
+DATES = dict(fromdate=datetime.datetime(2018, 1, 2, 3),
+             todate=datetime.datetime(2018, 1, 6))
+
+
+@pytest.mark.parametrize('kwargs', [dict(), dict(runonce=False),
+                                    dict(preload=False), dict(exactbars=1)])
+@pytest.mark.parametrize('copy', [False, True])
+@pytest.mark.parametrize('dates', [dict(), DATES])
+def test_matches_pandas(kwargs, copy, dates):
+    df = make_ohlcv(500)
+    expected = run([bt.feeds.PandasData(dataname=df, **dates)], **kwargs)
+    result = run([NumpyData(dataname=columns_of(df), copy=copy, **dates)],
+                 **kwargs)
+    assert len(result[0]) > 0
+    assert result == expected
+
+
+@pytest.mark.parametrize('kwargs', [dict(), dict(runonce=False)])
+def test_shorter_data(kwargs):
+    # The second data ends before the first one and is padded
+    df = make_ohlcv(500)
+    expected = run([bt.feeds.PandasData(dataname=df),
+                    bt.feeds.PandasData(dataname=df.iloc[:300])], **kwargs)
+    result = run([NumpyData(dataname=columns_of(df)),
+                  NumpyData(dataname=columns_of(df.iloc[:300]))], **kwargs)
+    assert result == expected
+
+
+def test_memmap_columns(tmp_path):
+    df = make_ohlcv(500)
+    for name, values in columns_of(df).items():
+        if name == 'date':
+            values = values.view(np.int64)
+        np.save(str(tmp_path / f'{name}.npy'), values)
+    assert isinstance(read_columns(str(tmp_path))['close'], np.memmap)
+    expected = run([bt.feeds.PandasData(dataname=df)])
+    assert run([NumpyData(dataname=str(tmp_path))]) == expected
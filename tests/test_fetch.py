@@ -0,0 +1,42 @@
+import pandas as pd
+from sqlalchemy import insert
+
+from btbot.database import fetch_data
+from btbot.database.engine import get_engine
+from btbot.database.fetch import get_price_query, needs_dedupe
+from btbot.database.sql_declarative import Base, Price30M, NarrowPrice30M
+from btbot.database.store import store_bulk
+
+from conftest import make_ohlcv
+
+BEGIN = '1970-01-01 00:00:00'
+
+
+def test_dedupe_without_unique_index(tmp_path):
+    url = 'sqlite:///' + str(tmp_path / 'old.db')
+    engine = get_engine(url)
+    table = Price30M.__table__
+    Base.metadata.create_all(engine)
+    for index in table.indexes:
+        index.drop(engine)
+    assert needs_dedupe(engine, table)
+    df = make_ohlcv(10)
+    store_bulk('X', df, url=url, verbose=False)
+    # A second insert of the first bar with other prices
+    with engine.begin() as conn:
+        conn.execute(insert(table), [dict(
+            ticker='X', date=df.index[0].to_pydatetime(), open=0., high=0.,
+            low=0., close=0., volume=0.)])
+    data = fetch_data(BEGIN, None, ['X'], url=url)['X']
+    pd.testing.assert_frame_equal(data, df, check_freq=False,
+                                  check_names=False)
+    assert len(fetch_data(BEGIN, None, ['X'], url=url, dedupe=False)['X']) \
+        == 11
+
+
+def test_no_dedupe_with_unique_index(sqlite_url):
+    engine = get_engine(sqlite_url)
+    assert not needs_dedupe(engine, Price30M.__table__)
+    assert not needs_dedupe(engine, NarrowPrice30M.__table__)
+    query = get_price_query(Price30M.__table__, ['X'], BEGIN)
+    assert 'min' not in str(query).lower()
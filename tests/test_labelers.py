@@ -0,0 +1,109 @@
+import backtrader as bt
+import numpy as np
+import pytest
+
+from btbot.constants import NONE
+from btbot.indicators import ema_volatility
+from btbot.labelers import (SLTPLabeler, triple_barrier_labels,
+                            triple_barrier_grid, sltp_label_grid)
+from btbot.siders.crossover import CrossOverSider
+
+from conftest import make_ohlcv
+
+
+class LabelStrategy(bt.Strategy):
+    params = (('labeler_params', dict()),)
+
+    def __init__(self):
+        self.labeler = SLTPLabeler(**self.p.labeler_params)
+
+
+def run_labeler(df, runonce, **kwargs):
+    cerebro = bt.Cerebro(stdstats=False, runonce=runonce)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df), name='price')
+    cerebro.addstrategy(LabelStrategy, labeler_params=kwargs)
+    labeler = cerebro.run()[0].labeler
+    return {name: np.asarray(getattr(labeler.lines, name).array)
+            for name in ('label', 'time_diff', 'vol', 'side')}
+
+
+def naive_labels(close, vol, stls, tkpf, horizon, side=None):
+    """Check the barriers of each bar one future bar at a time"""
+    label = np.full(len(close), NONE)
+    time_diff = np.full(len(close), np.nan)
+    for t in range(len(close)):
+        sign = 1. if side is None else side[t]
+        for i in range(1, horizon + 1):
+            if t + i >= len(close):
+                break
+            diff = (close[t + i] - close[t]) / close[t] * sign
+            if tkpf > 0 and diff > vol[t] * tkpf * sign:
+                label[t] = 1
+            elif stls > 0 and diff < -vol[t] * stls * sign:
+                label[t] = -1 if side is None else 0
+            elif i == horizon:
+                label[t] = 0
+            else:
+                continue
+            time_diff[t] = i
+            break
+    return label, time_diff
+
+
+GRID = [(1, 1, 10), (2, 1, 5), (0.5, 2, 20), (0, 1, 10), (1, 0, 3),
+        (1, 1, 1)]
+
+
+@pytest.mark.parametrize('metalabeling', [False, True])
+def test_grid_matches_naive(metalabeling):
+    close = make_ohlcv(500)['close'].values
+    vol = ema_volatility(close, period=10)
+    side = None
+    if metalabeling:
+        side = np.random.RandomState(1).choice([-1., 0., 1.], len(close))
+    label, time_diff = triple_barrier_grid(close, vol, GRID, side=side)
+    for k, (stls, tkpf, horizon) in enumerate(GRID):
+        expected = naive_labels(close, vol, stls, tkpf, horizon, side)
+        np.testing.assert_array_equal(label[k], expected[0])
+        np.testing.assert_array_equal(time_diff[k], expected[1])
+        single = triple_barrier_labels(close, vol, horizon, stls, tkpf,
+                                       side=side)
+        np.testing.assert_array_equal(single[0], expected[0])
+    np.testing.assert_array_equal(
+        sltp_label_grid(close, GRID, period=10, side=side)[0], label)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 1000, 2000])
+def test_grid_chunks(chunk_size):
+    close = make_ohlcv(500)['close'].values
+    vol = ema_volatility(close, period=10)
+    expected = triple_barrier_grid(close, vol, GRID)
+    # Chunks of one, two and four grid points
+    result = triple_barrier_grid(close, vol, GRID, chunk_size=chunk_size)
+    np.testing.assert_array_equal(result[0], expected[0])
+    np.testing.assert_array_equal(result[1], expected[1])
+
+
+@pytest.mark.parametrize('params', [
+    dict(period=10, horizon=10),
+    dict(period=20, horizon=5, stls=2, tkpf=0.5),
+    dict(period=10, horizon=10, stls=0),
+    dict(period=10, horizon=8, sider=CrossOverSider,
+         sider_params=dict(fast=5, slow=20)),
+])
+def test_runonce_matches_next(params):
+    df = make_ohlcv(400)
+    once = run_labeler(df, True, **params)
+    step = run_labeler(df, False, **params)
+    for name in ('label', 'time_diff', 'vol'):
+        np.testing.assert_allclose(once[name], step[name], equal_nan=True,
+                                   err_msg=name)
+    # Labels from the minimum period of the labeler
+    start = np.flatnonzero(~np.isnan(once['label']))[0]
+    side = once['side'] if 'sider' in params else None
+    label, time_diff = naive_labels(
+        df['close'].values, once['vol'], params.get('stls', 1),
+        params.get('tkpf', 1), params['horizon'], side)
+    np.testing.assert_array_equal(once['label'][start:], label[start:])
+    np.testing.assert_array_equal(once['time_diff'][start:],
+                                  time_diff[start:])
@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from btbot.database.migrate import add_month_partitions
+
+
+class FakeMySQL(object):
+    """Engine returning partition names and recording statements"""
+    def __init__(self, partitions):
+        self.dialect = SimpleNamespace(name='mysql')
+        self.partitions = partitions
+        self.statements = []
+
+    def execute(self, query, params=None):
+        self.statements.append(str(query))
+        return [(name,) for name in self.partitions]
+
+    @contextmanager
+    def connect(self):
+        yield self
+
+    begin = connect
+
+
+@pytest.mark.parametrize('partitions, expected', [
+    (['pmax'], ['p201803']),
+    (['p201801', 'pmax'], ['p201802', 'p201803']),
+    (['p201803', 'pmax'], []),
+])
+def test_add_month_partitions(partitions, expected):
+    engine = FakeMySQL(partitions)
+    add_month_partitions(engine, end=datetime(2018, 3, 10))
+    alter = engine.statements[1:]
+    if len(expected) == 0:
+        assert alter == []
+        return
+    for name in expected:
+        assert f'PARTITION {name} ' in alter[0]
+    assert alter[0].count('PARTITION p2') == len(expected)
+    assert "pmax INTO (PARTITION p" in alter[0]
+
+
+def test_add_month_partitions_not_partitioned():
+    with pytest.raises(ValueError):
+        add_month_partitions(FakeMySQL([None]))
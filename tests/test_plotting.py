@@ -0,0 +1,73 @@
+import backtrader as bt
+import numpy as np
+import pytest
+
+from btbot import get_cerebro
+from btbot.plotting import minmax_decimate, plot_strategy
+
+from conftest import make_ohlcv
+
+
+class SMAStrategy(bt.Strategy):
+    def __init__(self):
+        self.sma = bt.indicators.SMA(self.data.close, period=20)
+        self.rsi = bt.indicators.RSI(self.data.close)
+
+    def next(self):
+        if not self.position and self.data.close[0] > self.sma[0]:
+            self.buy()
+        elif self.position and self.data.close[0] < self.sma[0]:
+            self.close()
+
+
+@pytest.fixture(scope='module')
+def cerebro():
+    cerebro = get_cerebro()
+    cerebro.adddata(bt.feeds.PandasData(dataname=make_ohlcv(20000)),
+                    name='price')
+    cerebro.addstrategy(SMAStrategy)
+    cerebro.run()
+    return cerebro
+
+
+def num_points(fig):
+    return [len(line.get_xdata()) for ax in fig.axes for line in ax.lines]
+
+
+def test_minmax_decimate():
+    rng = np.random.RandomState(0)
+    y = rng.randn(1003)
+    y[10:20] = np.nan
+    x = np.arange(len(y))
+    dx, dy = minmax_decimate(x, y, 50)
+    assert len(dx) <= 100
+    assert np.all(np.diff(dx) >= 0)
+    np.testing.assert_array_equal(dy, y[dx])
+    assert np.nanmax(dy) == np.nanmax(y) and np.nanmin(dy) == np.nanmin(y)
+    # Short lines are left as is
+    dx, dy = minmax_decimate(x[:80], y[:80], 50)
+    np.testing.assert_array_equal(dy, y[:80])
+
+
+def test_plot_decimated(cerebro, tmp_path):
+    path = tmp_path / 'run.png'
+    figs = cerebro.plot(decimate=True, path=str(path), width=4, height=3,
+                        dpi=50)
+    assert len(figs) == 1 and path.stat().st_size > 0
+    # Observers, the data, and the RSI panel
+    assert len(figs[0].axes) >= 3
+    points = num_points(figs[0])
+    assert len(points) > 0
+    assert max(points) <= 2 * 4 * 50
+    with pytest.raises(ValueError):
+        cerebro.plot(decimate=True)
+
+
+def test_plot_window(cerebro, tmp_path):
+    strat = cerebro.runstrats[0][0]
+    fig = plot_strategy(strat, str(tmp_path / 'window.svg'), start=1000,
+                        end=1100, width=8, height=4, dpi=50)
+    # The window is narrower than the plot, nothing is dropped
+    assert max(num_points(fig)) == 100
+    dates = fig.axes[0].lines[0].get_xdata()
+    assert dates[0] == bt.num2date(strat.data.datetime.array[1000])
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from btbot.database import fetch_data
+from btbot.database.rollup import (resample_ohlcv, update_rollups,
+                                   volume_bars, dollar_bars)
+from btbot.database.store import store_bulk
+
+from conftest import make_ohlcv
+
+
+AGG = dict(open='first', high='max', low='min', close='last', volume='sum')
+START = '1970-01-01 00:00:00'
+
+
+def make_gapped(num_bars=5000, seed=0):
+    df = make_ohlcv(num_bars, seed=seed)
+    rng = np.random.RandomState(seed)
+    df = df.drop(df.index[rng.choice(num_bars, num_bars // 20,
+                                     replace=False)])
+    df.loc[df.index[5], 'high'] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('timeframe, rule', [('1H', '1h'), ('4H', '4h'),
+                                             ('12H', '12h'), ('1D', '1D')])
+def test_resample_matches_pandas(timeframe, rule):
+    df = make_gapped()
+    expected = df.resample(rule).agg(AGG).dropna(subset=['open'])
+    result = resample_ohlcv(df, timeframe)
+    pd.testing.assert_frame_equal(result, expected, check_freq=False,
+                                  check_names=False)
+
+
+def test_incremental_rollups(sqlite_url):
+    df = make_gapped()
+    # The second part starts within a 1D bar, which is rolled up again
+    for part in (df.iloc[:3001], df.iloc[3001:3005], df.iloc[3005:]):
+        store_bulk('X', part, url=sqlite_url, verbose=False)
+        update_rollups(['X'], url=sqlite_url)
+    for timeframe in ('1H', '4H', '1D'):
+        result = fetch_data(START, None, ['X'], url=sqlite_url,
+                            timeframe=timeframe)['X']
+        pd.testing.assert_frame_equal(result, resample_ohlcv(df, timeframe),
+                                      check_freq=False, check_names=False)
+
+
+def test_fetch_without_rollup(sqlite_url):
+    df = make_gapped()
+    store_bulk('X', df, url=sqlite_url, verbose=False)
+    start, end = '2018-01-10 05:00:00', '2018-02-01 03:00:00'
+    result = fetch_data(start, end, ['X'], url=sqlite_url,
+                        timeframe='2H')['X']
+    expected = resample_ohlcv(df, '2H')
+    expected = expected.loc[(expected.index > start) &
+                            (expected.index <= end)]
+    assert len(result) > 0
+    pd.testing.assert_frame_equal(result, expected, check_freq=False,
+                                  check_names=False)
+
+
+def test_fetch_warns_missing_ticker(sqlite_url):
+    store_bulk('X', make_ohlcv(10), url=sqlite_url, verbose=False)
+    with pytest.warns(UserWarning, match='Y'):
+        data = fetch_data(START, None, ['X', 'Y'], url=sqlite_url)
+    assert len(data['X']) == 10 and len(data['Y']) == 0
+    with pytest.warns(UserWarning, match='Y'):
+        data = fetch_data(START, None, ['Y', 'Z'], url=sqlite_url)
+    # Missing tickers do not share a frame
+    assert data['Y'] is not data['Z']
+    data['Y']['signal'] = 1.
+    assert list(data['Z'].columns) == ['open', 'high', 'low', 'close',
+                                       'volume']
+    with pytest.raises(ValueError):
+        fetch_data(START, None, ['X'], url=sqlite_url, timeframe='3H')
+
+
+def reference_bars(df, size, threshold):
+    # Dates where the cumulative size reaches the next multiple
+    dates, k = [], 1
+    for date, total in zip(df.index, np.cumsum(size)):
+        if total >= k * threshold:
+            dates.append(date)
+            while total >= k * threshold:
+                k += 1
+    return dates
+
+
+def test_information_bars():
+    df = make_gapped()
+    bars = volume_bars(df, 500.)
+    assert list(bars.index) == reference_bars(df, df['volume'].values, 500.)
+    assert bars['volume'].sum() <= df['volume'].sum()
+    np.testing.assert_allclose(bars['high'].max(), df['high'].max())
+    size = df['close'].values * df['volume'].values
+    bars = dollar_bars(df, 1e5)
+    assert list(bars.index) == reference_bars(df, size, 1e5)
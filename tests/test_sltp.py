@@ -0,0 +1,214 @@
+import backtrader as bt
+import numpy as np
+import pytest
+import xgboost as xgb
+from sklearn.preprocessing import StandardScaler
+
+from btbot import get_cerebro
+from btbot.configs import xgb_params
+from btbot.constants import NONE
+from btbot.feeders import PriceVolumeFeeder
+from btbot.strategies import SLTPStrategy
+from btbot.strategies.sltp import RowPredictor, train_model
+from btbot.walkforward import fit_bars
+
+from conftest import make_ohlcv
+
+
+class RecordedSLTP(SLTPStrategy):
+    """Records the signal of every bar with orders"""
+    def __init__(self):
+        super(RecordedSLTP, self).__init__()
+        self.signal_log = []
+
+    def get_orders(self, signal):
+        self.signal_log.append((len(self), signal))
+        return super(RecordedSLTP, self).get_orders(signal)
+
+
+def run_sltp(df, strategy=RecordedSLTP, cerebro_kwargs=dict(), **params):
+    """Run a small SLTPStrategy, returns the strategy and the final value"""
+    params = dict(dict(train_freq=50, num_round=5, warmup=200,
+                       labeler_params=dict(period=20)), **params)
+    cerebro = get_cerebro(profile='lean', **cerebro_kwargs)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df), name='price')
+    cerebro.addstrategy(strategy, **params)
+    strat = cerebro.run()[0]
+    return strat, cerebro.broker.get_value()
+
+
+@pytest.fixture(scope='module')
+def online():
+    return run_sltp(make_ohlcv(1000))
+
+
+def test_no_runonce_matches_online(online):
+    strat, value = run_sltp(make_ohlcv(1000),
+                            cerebro_kwargs=dict(runonce=False))
+    assert len(online[0].signal_log) > 0
+    assert strat.signal_log == online[0].signal_log
+    assert value == online[1]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_precompute_matches_online(online, workers):
+    strat, value = run_sltp(make_ohlcv(1000), precompute=True,
+                            precompute_workers=workers)
+    assert strat.signal_log == online[0].signal_log
+    assert value == online[1]
+
+
+class NoFeedSLTP(RecordedSLTP):
+    def __init__(self):
+        super(NoFeedSLTP, self).__init__()
+        # Feeds longer than the history
+        self.feeder = PriceVolumeFeeder(self.price, 1000)
+
+
+def test_precompute_without_feeds():
+    strat, value = run_sltp(make_ohlcv(300), strategy=NoFeedSLTP,
+                            precompute=True, precompute_workers=1)
+    assert np.isnan(strat.signals).all()
+    assert strat.signal_log == []
+    assert value == 10000
+
+
+def fit_frames(strat):
+    return [fit['frame'] for fit in strat.fit_log]
+
+
+def test_retrain_bars(online):
+    strat, value = online
+    first_bar = len(strat) - strat.frame_count
+    frames = [bar - first_bar + 1
+              for bar in fit_bars(first_bar, len(strat), 200, 50)]
+    assert fit_frames(strat) == frames
+    # The final value before the retrain policies were added
+    assert value == pytest.approx(251395.0188120117, rel=1e-12)
+
+
+def test_retrain_labels():
+    strat, _ = run_sltp(make_ohlcv(1000), retrain='labels',
+                        retrain_labels=30)
+    first_bar = len(strat) - strat.frame_count
+    label = np.asarray(strat.labeler.lines.label.array)
+    time_diff = np.asarray(strat.labeler.lines.time_diff.array)
+    # Bar at which each label is resolved
+    resolved = (np.arange(len(label)) + time_diff)[label != NONE]
+    bars = [first_bar + frame - 1 for frame in fit_frames(strat)]
+    assert len(bars) > 2
+    for prev, bar in zip(bars[:-1], bars[1:]):
+        assert np.count_nonzero((resolved > prev) & (resolved <= bar)) >= 30
+        # Not due at the bar before
+        assert np.count_nonzero((resolved > prev) &
+                                (resolved <= bar - 1)) < 30
+
+
+class DriftSLTP(RecordedSLTP):
+    """Records (due by train_freq, drift, fit) of each check"""
+    def __init__(self):
+        super(DriftSLTP, self).__init__()
+        self.checks = []
+
+    def should_fit(self):
+        fit = super(DriftSLTP, self).should_fit()
+        if self.model is not None:
+            self.checks.append((self.train_count >= self.p.train_freq,
+                                self.feature_drift, fit))
+        return fit
+
+
+@pytest.mark.parametrize('threshold', [0.3, 1e9])
+def test_retrain_drift(threshold):
+    strat, _ = run_sltp(make_ohlcv(1000), strategy=DriftSLTP,
+                        retrain='drift', drift_threshold=threshold)
+    for due, drift, fit in strat.checks:
+        assert fit == (due and drift > threshold)
+    due_fits = [fit for due, _, fit in strat.checks if due]
+    assert not all(due_fits)
+    if threshold < 1:
+        assert any(due_fits)
+    else:
+        assert len(strat.fit_log) == 1
+
+
+class StoppedSLTP(RecordedSLTP):
+    """Keeps the executor and the pending training at stop"""
+    def stop(self):
+        self.stopped = (self._executor, self._fit_job)
+        super(StoppedSLTP, self).stop()
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_background_fit_matches_sync(online, executor):
+    strat, value = run_sltp(make_ohlcv(1000), strategy=StoppedSLTP,
+                            fit_executor=executor, fit_delay=0)
+    assert strat.signal_log == online[0].signal_log
+    assert value == online[1]
+    assert fit_frames(strat) == fit_frames(online[0])
+    assert all(fit['ready_frame'] == fit['frame'] for fit in strat.fit_log)
+    pool, _ = strat.stopped
+    assert pool is not None and strat._executor is None
+
+
+def test_stop_shuts_down_executor():
+    # Models are swapped in when ready, the last training may be pending
+    strat, _ = run_sltp(make_ohlcv(1000), strategy=StoppedSLTP,
+                        fit_executor='thread', train_freq=5)
+    pool, job = strat.stopped
+    assert len(strat.fit_log) > 0
+    assert all(fit['ready_frame'] >= fit['frame'] for fit in strat.fit_log)
+    assert pool._shutdown
+    # Nothing left queued, a running training is not waited for
+    if job is not None:
+        assert job[1].done() or job[1].running()
+    with pytest.raises(RuntimeError):
+        pool.submit(len, [])
+
+
+def test_row_predictor():
+    rng = np.random.RandomState(0)
+    features = rng.randn(300, 6) * 3 + 1
+    labels = rng.randint(0, 3, 300)
+    rows = rng.randn(20, 6) * 3 + 1
+    model, scaler, _ = train_model(xgb_params, features, labels, 10,
+                                   StandardScaler())
+    predictor = RowPredictor(model, scaler)
+    expected = model.predict(xgb.DMatrix(scaler.transform(rows)))
+    assert [predictor(row) for row in rows] == expected.astype(int).tolist()
+    # Probabilities of the same trees on the row scaled in place
+    dtrain = xgb.DMatrix(scaler.transform(features), label=labels)
+    proba_model = xgb.train(dict(xgb_params, objective='multi:softprob'),
+                            dtrain, 10)
+    expected = proba_model.predict(xgb.DMatrix(scaler.transform(rows)))
+    for row, proba in zip(rows, expected):
+        predictor(row)
+        np.testing.assert_allclose(predictor.row, scaler.transform([row]),
+                                   atol=1e-12)
+        np.testing.assert_allclose(
+            proba_model.inplace_predict(predictor.row)[0], proba, atol=1e-6)
+
+
+class RoundsSLTP(RecordedSLTP):
+    """Records the boosted rounds of each model"""
+    def __init__(self):
+        super(RoundsSLTP, self).__init__()
+        self.rounds = []
+
+    def set_model(self, model):
+        super(RoundsSLTP, self).set_model(model)
+        self.rounds.append(self.model.num_boosted_rounds())
+
+
+@pytest.mark.parametrize('refit, max_rounds, rounds', [
+    (None, 15, [5, 10, 15]), (2, None, [5, 10, 15]), (1, 100, [5, 10])])
+def test_warm_start(refit, max_rounds, rounds):
+    strat, _ = run_sltp(make_ohlcv(1000), strategy=RoundsSLTP,
+                        warm_start=True, warm_num_round=5, warm_refit=refit,
+                        warm_max_rounds=max_rounds)
+    assert len(strat.rounds) > 2 * len(rounds)
+    # Full trainings of num_round and warm starts of warm_num_round
+    expected = (rounds * len(strat.rounds))[:len(strat.rounds)]
+    assert strat.rounds == expected
+    warm = [fit['warm_start'] for fit in strat.fit_log]
+    assert warm == [r > 5 for r in expected]
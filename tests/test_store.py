@@ -0,0 +1,21 @@
+import pandas as pd
+
+from btbot.database import fetch_data
+from btbot.database.store import store_bulk
+
+from conftest import make_ohlcv
+
+
+def test_store_bulk(sqlite_url):
+    df = make_ohlcv(100)
+    # String dates, shuffled with a duplicated row
+    df = df.iloc[[*range(50, 100), *range(50), 3]]
+    df.index = df.index.astype(str)
+    df_in = df.copy()
+    assert store_bulk('X', df, url=sqlite_url, chunk_size=30,
+                      verbose=False) == 100
+    pd.testing.assert_frame_equal(df, df_in)
+    assert store_bulk('X', df, url=sqlite_url, verbose=False) == 0
+    data = fetch_data('1970-01-01 00:00:00', None, ['X'], url=sqlite_url)
+    pd.testing.assert_frame_equal(data['X'], make_ohlcv(100),
+                                  check_freq=False, check_names=False)
@@ -0,0 +1,42 @@
+import backtrader as bt
+import numpy as np
+import pytest
+
+from btbot.sweep import config_key, load_results, run_sweep
+
+from conftest import make_ohlcv
+
+
+def test_config_key():
+    key = config_key(dict(period=np.int64(20), ratio=0.5, sizes=(1, 2)))
+    assert key == config_key(dict(sizes=[1, 2], ratio=np.float64(0.5),
+                                  period=20))
+    assert key != config_key(dict(period=21, ratio=0.5, sizes=(1, 2)))
+
+
+class BuyAndHold(bt.Strategy):
+    params = (('size', 1), ('fail', False))
+
+    def next(self):
+        if self.p.fail:
+            raise RuntimeError('failed config')
+        if not self.position:
+            self.buy(size=self.p.size)
+
+
+def test_run_sweep_records_errors(tmp_path):
+    path = str(tmp_path / 'results.jsonl')
+    data = dict(X=make_ohlcv(200))
+    configs = [dict(size=1), dict(size=2, fail=True), dict(size=3)]
+    results = run_sweep(data, configs, BuyAndHold, results_path=path,
+                        num_workers=2)
+    by_size = {result['config']['size']: result for result in results}
+    assert by_size[2]['error'] == 'RuntimeError: failed config'
+    assert 'pnl' not in by_size[2]
+    assert by_size[3]['pnl'] == pytest.approx(3 * by_size[1]['pnl'])
+    assert len(load_results(path)) == 3
+    # Only the failed configuration is run again
+    results = run_sweep(data, configs, BuyAndHold, results_path=path,
+                        num_workers=1)
+    assert len(results) == 3
+    assert len(load_results(path)) == 4
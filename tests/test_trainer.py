@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from btbot.trainer import RollingBuffer, Trainer
+
+
+@pytest.mark.parametrize('max_size', [None, 1, 3, 700])
+def test_rolling_buffer(max_size):
+    buf = RollingBuffer(max_size, init_size=2)
+    rows = np.random.RandomState(0).rand(2000, 3)
+    for i, row in enumerate(rows):
+        buf.append(row)
+        start = 0 if max_size is None else max(0, i + 1 - max_size)
+        assert len(buf) == i + 1 - start
+    np.testing.assert_array_equal(buf.values, rows[start:])
+    np.testing.assert_array_equal(buf[-1], rows[-1])
+
+
+def test_rolling_buffer_size():
+    with pytest.raises(ValueError):
+        RollingBuffer(0)
+    with pytest.raises(ValueError):
+        RollingBuffer(10, init_size=0)
+
+
+def test_get_data_copy():
+    is_valid = np.array([True, False, True, True, False])
+
+    def get_labels(num_data, side, resolved_within=None):
+        return np.arange(num_data), is_valid[-num_data:]
+
+    trainer = Trainer(None, SimpleNamespace(get_labels=get_labels))
+    for i in range(5):
+        trainer.store_feed.append([i, 10 * i])
+    features, labels = trainer.get_data()
+    np.testing.assert_array_equal(features[:, 0], [3, 2, 0])
+    np.testing.assert_array_equal(labels, [3, 2, 0])
+    assert features.flags['C_CONTIGUOUS']
+    trainer.store_feed.values[:] = -1
+    np.testing.assert_array_equal(features[:, 0], [3, 2, 0])
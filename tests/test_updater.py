@@ -0,0 +1,196 @@
+import json
+import threading
+from urllib.error import HTTPError
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pytest
+
+from btbot.database import fetch_data
+from btbot.database.updater import Updater, Checkpoint, RetryError
+from btbot.database.utils import seconds2date
+
+PERIOD = 1800
+# Bars start in the middle of a day
+LISTING = 1500000000 - 1500000000 % 86400 + 5 * 3600
+BEGIN = '1970-01-01 00:00:00'
+
+
+class Stub(object):
+    """Bars of each ticker and the requests to the stub server"""
+    def __init__(self):
+        self.bars = dict()
+        self.requests = []
+        # Status codes returned before the next responses
+        self.errors = []
+        self.lock = threading.Lock()
+
+    def add(self, ticker, num_bars, start=LISTING):
+        self.bars[ticker] = start + PERIOD * np.arange(num_bars)
+
+    def rows(self, ticker, start, end, period=PERIOD):
+        """(date, close) in [start, end] with the close of the last bar"""
+        dates = self.bars[ticker]
+        keys = dates - dates % period
+        last = np.r_[keys[1:] != keys[:-1], True]
+        dates, keys = dates[last], keys[last]
+        mask = (keys >= start) & (keys <= end)
+        return list(zip(keys[mask].tolist(),
+                        ((dates[mask] - LISTING) / PERIOD).tolist()))
+
+    def respond(self, path, query):
+        if path.endswith('/public'):
+            rows = self.rows(query['currencyPair'], int(query['start']),
+                             int(query['end']), int(query['period']))
+            data = [dict(date=d, open=c, high=c + 1, low=c - 1, close=c,
+                         volume=1.) for d, c in rows]
+            # Poloniex returns a single zero row without data
+            return data or [dict(date=0, open=0, high=0, low=0, close=0,
+                                 volume=0)]
+        if path.endswith('/OHLC'):
+            ticker = query['pair']
+            rows = self.rows(ticker, int(query['since']) + 1, np.inf)
+            # The latest 720 bars, the last one is still open
+            rows = self.rows(ticker, 0, np.inf)[-720:][-len(rows) - 1:]
+            data = [[d, str(c), str(c + 1), str(c - 1), str(c), str(c),
+                     '1.0', 1] for d, c in rows]
+            return dict(error=[], result={ticker: data, 'last': 0})
+        if '/candles/' in path:
+            ticker = path.split(':')[-1].split('/')[0]
+            rows = self.rows(ticker, int(query['start']) // 1000,
+                             int(query['end']) // 1000)
+            if query.get('sort') != '1':
+                rows = rows[::-1]
+            return [[d * 1000, c, c, c + 1, c - 1, 1.]
+                    for d, c in rows[:int(query['limit'])]]
+        return None
+
+
+@pytest.fixture
+def stub():
+    state = Stub()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            with state.lock:
+                state.requests.append((url.path, query))
+                code = state.errors.pop(0) if state.errors else 200
+            data = state.respond(url.path, query) if code == 200 else None
+            if data is None:
+                self.send_response(code if code != 200 else 404)
+                if code == 429:
+                    self.send_header('Retry-After', '0')
+                self.end_headers()
+                return
+            body = json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state.url = f'http://127.0.0.1:{server.server_address[1]}'
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def make_updater(stub, exchange, url, **kwargs):
+    return Updater(exchange, url=url, base_url=stub.url + '/public',
+                   rate=1000., capacity=1000, backoff=0.01, **kwargs)
+
+
+def test_polo_skips_before_listing(stub, sqlite_url, tmp_path):
+    stub.add('A', 2500)
+    updater = make_updater(stub, 'polo', sqlite_url)
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.json'))
+    end = '2017-10-01 00:00:00'
+    assert updater.backfill(['A'], end=end, checkpoint=checkpoint) == \
+        dict(A=2500)
+    # Daily requests instead of a thousand empty pages since 1970
+    assert len(stub.requests) <= 8
+    df = fetch_data(BEGIN, None, ['A'], url=sqlite_url)['A']
+    np.testing.assert_array_equal(df['close'].values, np.arange(2500))
+    assert checkpoint.get('polo', 'A') >= stub.bars['A'][-1]
+
+
+def test_kraken_drops_open_bar(stub, sqlite_url):
+    stub.add('K', 300)
+    updater = make_updater(stub, 'kraken', sqlite_url)
+    pages = list(updater.iter_pages('K', LISTING - PERIOD, 2 * 10 ** 9))
+    assert len(pages) == 1
+    df, cursor = pages[0]
+    np.testing.assert_array_equal(df['close'].values, np.arange(299))
+    assert cursor == stub.bars['K'][-2]
+
+
+def test_kraken_stops_at_hole(stub, sqlite_url, tmp_path):
+    stub.add('K', 1000)
+    updater = make_updater(stub, 'kraken', sqlite_url)
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.json'))
+    start = '2017-07-14 00:00:00'
+    with pytest.warns(UserWarning, match='not available'):
+        results = updater.backfill(['K'], start=start,
+                                   checkpoint=checkpoint)
+    assert results == dict(K=0)
+    assert checkpoint.get('kraken', 'K') is None
+
+
+def bar_date(num_bars):
+    """Date of the last of the first num_bars bars"""
+    return seconds2date(LISTING + PERIOD * (num_bars - 1))
+
+
+@pytest.mark.parametrize('exchange', ['polo', 'bitfx', 'kraken'])
+def test_update_stitches_pages(stub, sqlite_url, exchange):
+    stub.add('A', 700)
+    stub.add('B', 650)
+    updater = make_updater(stub, exchange, sqlite_url)
+    if exchange == 'bitfx':
+        updater.base_url = stub.url + '/v2'
+    start = bar_date(0)
+    assert updater.update(['A', 'B'], start=start, end=bar_date(100)) == \
+        dict(A=100, B=100)
+    # Kraken drops the open bar
+    num_new = 599 if exchange == 'kraken' else 600
+    assert updater.update(['A', 'B'], start=start) == \
+        dict(A=num_new, B=num_new - 50)
+    data = fetch_data(BEGIN, None, ['A', 'B'], url=sqlite_url)
+    np.testing.assert_array_equal(data['A']['close'].values,
+                                  np.arange(100 + num_new))
+    np.testing.assert_array_equal(data['B']['close'].values,
+                                  np.arange(50 + num_new))
+    if exchange == 'bitfx':
+        # Pages of 120 bars from the last stored one
+        assert len(stub.requests) > 10
+
+
+def test_update_retries(stub, sqlite_url):
+    stub.add('A', 100)
+    stub.errors = [429, 500, 429]
+    updater = make_updater(stub, 'polo', sqlite_url)
+    assert updater.update(['A'], start=bar_date(0)) == dict(A=100)
+    # Three retries, a page, an empty page and a daily request
+    assert len(stub.requests) == 6
+
+
+def test_update_retry_error(stub, sqlite_url):
+    stub.add('A', 100)
+    stub.errors = [429, 500, 503]
+    updater = make_updater(stub, 'polo', sqlite_url, max_retries=2)
+    results = updater.update(['A'], start=bar_date(0))
+    assert isinstance(results['A'], RetryError)
+    assert len(stub.requests) == 3
+    # Other HTTP errors are not retried
+    stub.errors = [404]
+    assert isinstance(updater.update(['A'], start=bar_date(0))['A'],
+                      HTTPError)
+    assert len(stub.requests) == 4
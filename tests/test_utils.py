@@ -0,0 +1,41 @@
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pytest
+
+from btbot.database import updater
+from btbot.database.utils import get_data, date2seconds
+
+START = '2018-01-01 00:00:00'
+
+
+def test_get_data_bitfx(monkeypatch):
+    dates = date2seconds(START) + 1800 * np.arange(1, 301)
+    urls = []
+
+    def get_json(url, limiter=None):
+        urls.append(url)
+        query = parse_qs(urlparse(url).query)
+        query = {k: int(v[0]) for k, v in query.items()}
+        mask = (dates * 1000 >= query['start']) & \
+            (dates * 1000 <= query['end'])
+        # Bitfinex returns the latest first
+        return [[int(t) * 1000, t, t, t + 1, t - 1, 1.]
+                for t in dates[mask][::-1][:query['limit']]]
+
+    monkeypatch.setattr(updater, 'get_json', get_json)
+    df = get_data('tBTCUSD', START, '2018-01-07 06:00:00', period='30m',
+                  exchange='bitfx')
+    np.testing.assert_array_equal(np.sort(df['open'].values), dates)
+    assert df['date'].is_unique
+    assert all('limit=120' in url for url in urls)
+
+
+def test_get_data_bitfx_retry_error(monkeypatch):
+    def get_json(url, limiter=None):
+        raise updater.RetryError(url)
+
+    monkeypatch.setattr(updater, 'get_json', get_json)
+    with pytest.raises(updater.RetryError):
+        get_data('tBTCUSD', START, '2018-01-02 00:00:00', period='30m',
+                 exchange='bitfx')
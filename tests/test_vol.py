@@ -0,0 +1,64 @@
+import backtrader as bt
+import numpy as np
+import pandas as pd
+import pytest
+
+from btbot.indicators import EMAVolatility
+from btbot.indicators.vol import ema_volatility
+
+from conftest import make_ohlcv
+
+
+class VolStrategy(bt.Strategy):
+    params = (('period', 20), ('scale', 1))
+
+    def __init__(self):
+        self.vol = EMAVolatility(self.data.close, period=self.p.period,
+                                 scale=self.p.scale)
+
+
+def run_vol(df, runonce, **kwargs):
+    cerebro = bt.Cerebro(stdstats=False, runonce=runonce)
+    cerebro.adddata(bt.feeds.PandasData(dataname=df))
+    cerebro.addstrategy(VolStrategy, **kwargs)
+    strat = cerebro.run()[0]
+    return np.asarray(strat.vol.array)
+
+
+def reference_vol(close, period, scale=1):
+    """ewm std over the latest period prices at each bar"""
+    ret = pd.Series(close).pct_change() * scale
+    vol = np.zeros(len(close))
+    for i in range(period - 1, len(close)):
+        window = ret.iloc[i - period + 2:i + 1]
+        vol[i] = window.ewm(span=period - 1).std().iloc[-1]
+    return vol
+
+
+@pytest.mark.parametrize('period, scale', [(2, 1), (3, 1), (20, 1),
+                                           (50, 100)])
+def test_once_matches_next(period, scale):
+    df = make_ohlcv(300)
+    once = run_vol(df, True, period=period, scale=scale)
+    step = run_vol(df, False, period=period, scale=scale)
+    assert len(once) == len(step) == len(df)
+    np.testing.assert_allclose(once, step, rtol=1e-7, atol=1e-12)
+    expected = reference_vol(df['close'].values, period, scale)
+    np.testing.assert_allclose(once, expected, rtol=1e-7, atol=1e-12,
+                               equal_nan=True)
+
+
+def test_short_history():
+    close = make_ohlcv(10)['close'].values
+    np.testing.assert_array_equal(ema_volatility(close, period=20),
+                                  np.zeros(10))
+
+
+@pytest.mark.parametrize('runonce', [True, False])
+def test_period_one(runonce):
+    # Windows of a single price hold no returns
+    df = make_ohlcv(50)
+    np.testing.assert_array_equal(run_vol(df, runonce, period=1),
+                                  np.zeros(50))
+    np.testing.assert_array_equal(
+        ema_volatility(df['close'].values, period=1), np.zeros(50))
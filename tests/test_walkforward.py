@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from btbot.constants import NONE
+from btbot.walkforward import fit_bars, training_index, run_windows
+
+
+def schedule(first_bar, num_bars, warmup, train_freq):
+    """Bars where BaseStrategy.next trains, one bar at a time"""
+    bars, frame_count, train_count = [], 0, 0
+    for bar in range(first_bar, num_bars):
+        frame_count += 1
+        train_count += 1
+        if frame_count < warmup:
+            continue
+        if train_count >= train_freq:
+            bars.append(bar)
+            train_count = 0
+    return bars
+
+
+def test_fit_bars():
+    assert fit_bars(5, 15, warmup=3, train_freq=4) == [8, 12]
+    assert fit_bars(0, 3) == [0, 1, 2]
+    assert fit_bars(0, 10, warmup=20) == []
+    assert fit_bars(10, 10) == []
+    for warmup in (0, 1, 7, 200):
+        for train_freq in (1, 3, 50):
+            assert fit_bars(99, 1000, warmup, train_freq) == \
+                schedule(99, 1000, warmup, train_freq)
+
+
+def test_training_index():
+    label = np.array([1, NONE, 0, -1, 1, 1])
+    time_diff = np.array([1, np.nan, 2, 1, 3, 1])
+    # Bar 4 is resolved after 3 bars, bar 1 is not labeled
+    np.testing.assert_array_equal(training_index(4, 0, label, time_diff),
+                                  [3, 2, 0])
+    # Bar 2 is resolved at bar 4, after bar 2
+    np.testing.assert_array_equal(training_index(2, 0, label, time_diff),
+                                  [0])
+    np.testing.assert_array_equal(
+        training_index(4, 0, label, time_diff, max_data=2), [3])
+    assert len(training_index(4, 5, label, time_diff)) == 0
+    side = np.array([1, 1, -1, 1, 1, 1])
+    np.testing.assert_array_equal(
+        training_index(4, 0, label, time_diff, side=side), [3, 0])
+
+
+def square(x):
+    return x * x
+
+
+@pytest.mark.parametrize('num_workers', [1, 2])
+def test_run_windows(num_workers):
+    generated = []
+
+    def windows():
+        for i in range(20):
+            generated.append(i)
+            yield i, (i,)
+
+    results = []
+    for key, value in run_windows(square, windows(), num_workers):
+        if len(results) == 0:
+            # Windows are generated lazily
+            assert len(generated) <= 2 * num_workers
+        results.append((key, value))
+    assert results == [(i, i * i) for i in range(20)]